@@ -0,0 +1,157 @@
+"""
+OAuth2 bearer authentication that caches validated access tokens.
+
+Tokens are kept in an in-process LRU and, when `OAUTH2_TOKEN_CACHE["SHARED_CACHE"]`
+names a cache alias, in that shared cache too. Entries never outlive the token's
+expiry. Revoked or refreshed tokens are deleted by django-oauth-toolkit, and
+`app_user.signals` drops them from both caches. Entries carry their user, so
+saving a user (deactivating or demoting them) drops all of their tokens too.
+Other processes only see that through the shared cache, so their local entries
+are also capped at `LOCAL_TTL` seconds. Cached tokens are shared by every
+request of the process, so each request gets its own copy of the token and user.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from rest_framework import exceptions
+from rest_framework.authentication import get_authorization_header
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+def get_token_cache_settings():
+    return {
+        "MAX_SIZE": 10000,
+        "LOCAL_TTL": 60,
+        "SHARED_CACHE": None,
+        **getattr(settings, "OAUTH2_TOKEN_CACHE", {}),
+    }
+
+
+def token_checksum(token):
+    """Same digest django-oauth-toolkit stores in `AccessToken.token_checksum`."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenLRU:
+    """Thread-safe LRU of access tokens, each entry dropped at its own deadline."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, deadline = entry
+            if deadline <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, key, token, ttl):
+        with self._lock:
+            self._entries[key] = (token, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_tokens = TokenLRU(get_token_cache_settings()["MAX_SIZE"])
+
+
+def _shared_cache():
+    alias = get_token_cache_settings()["SHARED_CACHE"]
+    return caches[alias] if alias else None
+
+
+def _cache_key(checksum):
+    return f"oauth2-token:{checksum}"
+
+
+def get_cached_token(checksum):
+    token = local_tokens.get(checksum)
+    if token is None and (shared := _shared_cache()):
+        token = shared.get(_cache_key(checksum))
+        if token is not None:
+            _store_locally(checksum, token)
+    if token is not None and token.is_expired():
+        invalidate_token(checksum)
+        return None
+    return token
+
+
+def _store_locally(checksum, token):
+    ttl = min((token.expires - timezone.now()).total_seconds(), get_token_cache_settings()["LOCAL_TTL"])
+    if ttl > 0:
+        local_tokens.set(checksum, token, ttl)
+
+
+def cache_token(checksum, token):
+    _store_locally(checksum, token)
+    ttl = int((token.expires - timezone.now()).total_seconds())
+    if ttl > 0 and (shared := _shared_cache()):
+        shared.set(_cache_key(checksum), token, ttl)
+
+
+def invalidate_token(checksum):
+    local_tokens.delete(checksum)
+    if shared := _shared_cache():
+        shared.delete(_cache_key(checksum))
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    """`OAuth2Authentication` that only goes to the database for tokens it has not validated recently."""
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if len(auth) != 2 or auth[0].lower() != b"bearer":
+            return super().authenticate(request)
+
+        checksum = token_checksum(auth[1].decode("utf-8", "replace"))
+        token = get_cached_token(checksum)
+        if token is None:
+            result = super().authenticate(request)
+            if result is None:
+                return None
+            token = result[1]
+            cache_token(checksum, token)
+
+        # As REST framework's own authenticators do; django-oauth-toolkit does not check it.
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed("User inactive or deleted.")
+        # The cached instances stay untouched, whatever the request does with its user (`last_login`, `refresh_from_db`, ...).
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return token.user, token
+
+
+def authenticated_api_request(request):
+    """
+    Wrap a Django request for a view outside REST framework's `APIView`.
+
+    Authenticates it with the configured authenticators and raises `NotAuthenticated` for anonymous users.
+    """
+    api_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    if not api_request.user or not api_request.user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    return api_request
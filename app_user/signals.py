@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model
+
+from .authentication import invalidate_token
+from .models import AppUser
+
+AccessToken = get_access_token_model()
+
+
+@receiver(post_save, sender=AccessToken)
+@receiver(post_delete, sender=AccessToken)
+def invalidate_cached_access_token(sender, instance, **kwargs):
+    """Revoking or refreshing a token deletes or updates it; stop trusting the cached copy."""
+    invalidate_token(instance.token_checksum)
+
+
+@receiver(post_save, sender=AppUser)
+def invalidate_cached_user_tokens(sender, instance, created, **kwargs):
+    """Cached tokens carry their user; a deactivated or demoted user must not keep authenticating as before."""
+    if not created:
+        live = AccessToken.objects.filter(user=instance, expires__gt=timezone.now())
+        for checksum in live.values_list("token_checksum", flat=True):
+            invalidate_token(checksum)
@@ -1,3 +1,87 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model, get_application_model
+from rest_framework.request import Request
+
+from .authentication import CachedOAuth2Authentication, local_tokens
+
+User = get_user_model()
+AccessToken = get_access_token_model()
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    url = "/api/v1/user/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email="ada@acme.example", first_name="Ada", last_name="Admin", phone_number="0")
+        application = get_application_model().objects.create(
+            name="tests", user=cls.user, client_type="confidential", authorization_grant_type="password"
+        )
+        cls.token = AccessToken.objects.create(
+            user=cls.user, application=application, token="ada-token",
+            expires=timezone.now() + timedelta(hours=1), scope="read write",
+        )
+
+    def setUp(self):
+        local_tokens.clear()
+
+    def get(self, token="ada-token"):
+        return self.client.get(self.url, headers={"Authorization": f"Bearer {token}"})
+
+    def token_lookups(self):
+        """Requests the user endpoint and returns how many queries read the access token table."""
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get().status_code, 200)
+        return sum(AccessToken._meta.db_table in query["sql"] for query in queries)
+
+    def test_validated_token_is_not_read_again(self):
+        self.assertEqual(self.token_lookups(), 1)
+        self.assertEqual(self.token_lookups(), 0)
+
+    def test_unknown_token_is_rejected(self):
+        self.assertEqual(self.get("nobody").status_code, 401)
+
+    def test_revoked_token_is_rejected(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.token.revoke()
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_expired_token_is_rejected(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.token.expires = timezone.now() - timedelta(seconds=1)
+        self.token.save()
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_user_changes_are_seen(self):
+        self.assertEqual(self.get().json()[0]["first_name"], "Ada")
+        self.user.first_name = "Adele"
+        self.user.save()
+        self.assertEqual(self.get().json()[0]["first_name"], "Adele")
+
+    def test_each_request_gets_its_own_user(self):
+        def authenticate():
+            request = RequestFactory().get(self.url, headers={"Authorization": "Bearer ada-token"})
+            return CachedOAuth2Authentication().authenticate(Request(request))
+
+        first_user, first_token = authenticate()
+        first_user.first_name = "Changed"
+        first_user.last_login = timezone.now()
+        with self.assertNumQueries(0):
+            second_user, second_token = authenticate()
+
+        self.assertIsNot(second_user, first_user)
+        self.assertIsNot(second_token, first_token)
+        self.assertIs(second_token.user, second_user)
+        self.assertEqual((second_user.first_name, second_user.last_login), ("Ada", None))
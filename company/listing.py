@@ -0,0 +1,75 @@
+"""
+Lean read paths for the vehicle and driver lists.
+
+Rows come from `.values()`; vehicles' drivers and company admins come from one
+query each on the join tables, instead of a serializer per vehicle. The bodies
+match `VehicleSerializer` and `DriverProfileSerializer`.
+"""
+from django.contrib.auth import get_user_model
+
+from .models import DriverProfile
+
+User = get_user_model()
+
+
+def vehicle_values(vehicles):
+    return vehicles.prefetch_related(None).values(
+        "id", "company_id", "truck_number", "trailer_number", "license_plate", "state_of_registration",
+        "operational", "created_by_id", "date_created", "date_updated",
+    )
+
+
+def vehicle_representations(rows):
+    rows = list(rows)
+
+    drivers = {row["id"]: [] for row in rows}
+    # Through the live manager, like the `drivers` relation: deleted drivers are left out.
+    assignments = DriverProfile.objects.filter(vehicles__in=drivers).order_by("id")
+    for vehicle_id, driver_id in assignments.values_list("vehicles", "id"):
+        drivers[vehicle_id].append(driver_id)
+
+    admins = {row["company_id"]: [] for row in rows}
+    memberships = User.objects.filter(admin_companies__in=admins).order_by("id")
+    for company_id, user_id in memberships.values_list("admin_companies", "id"):
+        admins[company_id].append(user_id)
+
+    return [
+        {
+            "id": row["id"],
+            "company": row["company_id"],
+            "drivers": drivers[row["id"]],
+            "company_admins": admins[row["company_id"]],
+            "truck_number": row["truck_number"],
+            "trailer_number": row["trailer_number"],
+            "license_plate": row["license_plate"],
+            "state_of_registration": row["state_of_registration"],
+            "operational": row["operational"],
+            "created_by": row["created_by_id"],
+            "date_created": row["date_created"],
+            "date_updated": row["date_updated"],
+        }
+        for row in rows
+    ]
+
+
+def driver_values(drivers):
+    return drivers.select_related(None).prefetch_related(None).values(
+        "id", "company_id", "license_number", "company__name", "home_terminal", "deleted",
+        "user__first_name", "user__last_name",
+    )
+
+
+def driver_representations(rows):
+    return [
+        {
+            "id": row["id"],
+            "company": row["company_id"],
+            "license_number": row["license_number"],
+            "company_name": row["company__name"],
+            "home_terminal": row["home_terminal"],
+            "deleted": row["deleted"],
+            # As `User.get_full_name()`.
+            "full_name": f"{row['user__first_name']} {row['user__last_name']}".strip(),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,84 @@
+"""
+Resolve which companies a user administers and which driver profile they hold.
+
+Permission classes and validators ask the same questions several times per
+request, so the answer is loaded once per request. When `MEMBERSHIP_CACHE`
+names a cache alias every worker shares, it is also kept there across requests,
+and `company.signals` clears it whenever company admins or driver profiles
+change. A per-process cache would be cleared in one worker only and keep
+granting revoked access in the others, so there is no fallback to one.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import IntegerField, Value
+
+from .models import Company, DriverProfile
+
+
+def _cache_key(user_id):
+    return f"company-membership:{user_id}"
+
+
+def _shared_cache():
+    alias = getattr(settings, "MEMBERSHIP_CACHE", None)
+    return caches[alias] if alias else None
+
+
+class Membership:
+    def __init__(self, user_id, admin_company_ids=(), driver_id=None, driver_company_id=None):
+        self.user_id = user_id
+        self.admin_company_ids = frozenset(admin_company_ids)
+        self.driver_id = driver_id
+        self.driver_company_id = driver_company_id
+
+    def is_company_admin(self, company_id):
+        try:
+            return int(company_id) in self.admin_company_ids
+        except (TypeError, ValueError):
+            return False
+
+    def is_driver(self, driver_id):
+        return self.driver_id is not None and driver_id == self.driver_id
+
+    def can_access_trip(self, trip):
+        """Is the user the trip driver or an admin of the trip's company?"""
+        return self.is_driver(trip.driver_id) or self.is_company_admin(trip.company_id)
+
+
+def load_membership(user):
+    if not user or not user.is_authenticated:
+        return Membership(None)
+
+    cache = _shared_cache()
+    key = _cache_key(user.id)
+    cached = cache.get(key) if cache else None
+    if cached is None:
+        # Administered companies and the driver profile in one round trip: (company, None) and (company, driver) rows.
+        admin_rows = Company.objects.filter(admins=user).values_list("id", Value(None, output_field=IntegerField()))
+        driver_rows = DriverProfile.objects.filter(user=user).values_list("company_id", "id")
+        admin_company_ids, driver = [], (None, None)
+        for company_id, driver_id in admin_rows.union(driver_rows, all=True):
+            if driver_id is None:
+                admin_company_ids.append(company_id)
+            else:
+                driver = (driver_id, company_id)
+        cached = (admin_company_ids, *driver)
+        if cache:
+            cache.set(key, cached, getattr(settings, "MEMBERSHIP_CACHE_TIMEOUT", 60))
+
+    return Membership(user.id, *cached)
+
+
+def get_membership(request):
+    """The membership of the request's user, loaded at most once per request."""
+    holder = getattr(request, "_request", request)
+    membership = getattr(holder, "_membership", None)
+    if membership is None or membership.user_id != request.user.id:
+        membership = load_membership(request.user)
+        holder._membership = membership
+    return membership
+
+
+def invalidate_membership(user_ids):
+    if cache := _shared_cache():
+        cache.delete_many([_cache_key(user_id) for user_id in user_ids])
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0006_vehicle'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='driverprofile',
+            index=models.Index(fields=['company', 'deleted'], name='driver_company_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['company', 'operational'], name='vehicle_company_oper_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0007_driverprofile_driver_company_deleted_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='driverprofile',
+            name='driver_company_deleted_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vehicle',
+            name='vehicle_company_oper_idx',
+        ),
+        migrations.AddIndex(
+            model_name='driverprofile',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['company'], name='driver_live_company_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(condition=models.Q(('operational', True)), fields=['company'], name='vehicle_live_company_idx'),
+        ),
+    ]
@@ -1,8 +1,41 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+
+class LiveManager(models.Manager):
+    """
+    Default manager of soft-deletable models: only the live rows.
+
+    Those models also have `all_objects`, with every row, for restores, audits
+    and `?deleted=true` listings.
+    """
+    live_filter = {"deleted": False}
+
+    def get_queryset(self):
+        return super().get_queryset().filter(**self.live_filter)
+
+
+class OperationalManager(LiveManager):
+    """Vehicles are soft deleted by taking them out of operation."""
+    live_filter = {"operational": True}
+
+
+class AtomicSaveMixin:
+    """
+    Save the row and run its `post_save` receivers in one transaction.
+
+    The receivers record the change feed (see `trip.sync`); if one fails, the
+    write is rolled back instead of being committed without its change.
+    """
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
 class Company(models.Model):
     name = models.CharField(max_length=255, unique=True)
     main_office_address = models.TextField()
@@ -16,7 +49,7 @@ class Company(models.Model):
     def __str__(self):
         return self.name
 
-class DriverProfile(models.Model):
+class DriverProfile(AtomicSaveMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="drivers")
     license_number = models.CharField(max_length=50)
@@ -26,8 +59,14 @@ class DriverProfile(models.Model):
     deleted = models.BooleanField(default=False)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="company_admin")
 
+    objects = LiveManager()
+    all_objects = models.Manager()
+
     class Meta:
         unique_together = ("user", "company")
+        indexes = [
+            models.Index(fields=["company"], condition=models.Q(deleted=False), name="driver_live_company_idx"),
+        ]
     
     def delete(self, *args, **kwargs):
         """ Soft delete instead of hard delete """
@@ -37,7 +76,7 @@ class DriverProfile(models.Model):
     def __str__(self):
         return self.user.get_full_name()
 
-class Vehicle(models.Model):
+class Vehicle(AtomicSaveMixin, models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="vehicles")
     drivers = models.ManyToManyField(DriverProfile, related_name="vehicles", blank=True)
     truck_number = models.CharField(max_length=50, unique=True)
@@ -49,5 +88,13 @@ class Vehicle(models.Model):
     operational = models.BooleanField(default=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="vehicle_company_admin")
 
+    objects = OperationalManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["company"], condition=models.Q(operational=True), name="vehicle_live_company_idx"),
+        ]
+
     def __str__(self):
         return f"{self.truck_number} - {self.license_plate} ({self.company.name})"
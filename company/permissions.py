@@ -1,6 +1,6 @@
 from rest_framework import permissions
-from .models import Company
-from django.shortcuts import get_object_or_404
+
+from .membership import get_membership
 
 class IsCompanyAdmin(permissions.BasePermission):
     """
@@ -8,7 +8,7 @@ class IsCompanyAdmin(permissions.BasePermission):
     """
     def has_object_permission(self, request, view, obj):
         if view.action in ["update", "partial_update", "destroy", "add_admin"]:
-            return request.user in obj.admins.all()  # Only admins can edit/delete
+            return get_membership(request).is_company_admin(obj.id)  # Only admins can edit/delete
         return True
 
 class IsDriverCompanyAdmin(permissions.BasePermission):
@@ -17,7 +17,7 @@ class IsDriverCompanyAdmin(permissions.BasePermission):
     """
     def has_object_permission(self, request, view, obj):
         if view.action in ["update", "partial_update", "destroy", "restore"]:
-            return request.user in obj.company.admins.all()
+            return get_membership(request).is_company_admin(obj.company_id)
 
         return request.method in permissions.SAFE_METHODS
     
@@ -27,7 +27,7 @@ class IsVehicleCompanyAdmin(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         if view.action in ["update", "partial_update", "destroy", "make_operational", "assign_driver"]:
-            return request.user in obj.company.admins.all()
+            return get_membership(request).is_company_admin(obj.company_id)
         
         return request.method in permissions.SAFE_METHODS 
     
@@ -37,9 +37,8 @@ class UserIsCompanyAdmin(permissions.BasePermission):
 
     def has_permission(self, request, view):
         company_id = request.data.get("company")
-        if view.action in view.action in ["update", "partial_update", "create"] and company_id:
-            company = get_object_or_404(Company, pk=company_id)
-            return request.user in company.admins.all()
+        if view.action in ["update", "partial_update", "create"] and company_id:
+            return get_membership(request).is_company_admin(company_id)
 
         return True
     
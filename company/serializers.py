@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 from django.contrib.auth import get_user_model
 from .models import Company
 from .models import DriverProfile
@@ -45,7 +46,7 @@ class DriverProfileSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"email": "Driver with this email was not found."})
 
         company = validated_data["company"]
-        if DriverProfile.objects.filter(user=user, company=company).exists():
+        if DriverProfile.all_objects.filter(user=user, company=company).exists():
             raise serializers.ValidationError("This driver is already assigned to the company.")
 
         return DriverProfile.objects.create(user=user, **validated_data)
@@ -75,10 +76,15 @@ class VehicleSerializer(serializers.ModelSerializer):
             "date_updated",
         ]
         read_only_fields = ["company_admins", "created_by", "date_created", "date_updated"]
+        # Vehicles out of operation keep their numbers; check against every vehicle, not just the operational ones.
+        extra_kwargs = {
+            field: {"validators": [UniqueValidator(queryset=Vehicle.all_objects.all())]}
+            for field in ["truck_number", "trailer_number", "license_plate"]
+        }
 
     def get_company_admins(self, obj):
         """Returns a list of company admin IDs."""
-        return list(obj.company.admins.values_list("id", flat=True))
+        return [admin.id for admin in obj.company.admins.all()]
 
     def create(self, validated_data):
         operational = validated_data.pop("operational", True)
@@ -0,0 +1,24 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .membership import invalidate_membership
+from .models import Company, DriverProfile
+
+
+@receiver(m2m_changed, sender=Company.admins.through)
+def invalidate_admin_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # The cleared admins are not reported afterwards, so remember them now.
+        instance._cleared_admin_ids = (
+            [instance.pk] if reverse else list(instance.admins.values_list("id", flat=True))
+        )
+    elif action == "post_clear":
+        invalidate_membership(getattr(instance, "_cleared_admin_ids", []))
+    elif action in ("post_add", "post_remove"):
+        invalidate_membership([instance.pk] if reverse else pk_set or [])
+
+
+@receiver(post_save, sender=DriverProfile)
+@receiver(post_delete, sender=DriverProfile)
+def invalidate_driver_membership(sender, instance, **kwargs):
+    invalidate_membership([instance.user_id])
@@ -1,3 +1,249 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from trip.hos import evaluate_entries
+from trip.models import Trip, TripLogEntry
+
+from .membership import get_membership, load_membership
+from .models import Company, DriverProfile, Vehicle
+
+User = get_user_model()
+
+SHARED_CACHE_SETTINGS = {
+    "MEMBERSHIP_CACHE": "shared",
+    "CACHES": {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "default"},
+        "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "shared"},
+    },
+}
+
+
+class MembershipTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@acme.example", first_name="Ada", last_name="Admin", phone_number="0")
+        cls.driver_user = User.objects.create(email="driver@acme.example", first_name="Dan", last_name="Driver", phone_number="0")
+        cls.company = Company.objects.create(
+            name="acme", main_office_address="1 Depot Road", phone_number="0", email="office@acme.example", created_by=cls.admin
+        )
+        cls.other = Company.objects.create(
+            name="globex", main_office_address="2 Depot Road", phone_number="0", email="office@globex.example", created_by=cls.admin
+        )
+        cls.company.admins.add(cls.admin)
+        cls.driver = DriverProfile.objects.create(
+            user=cls.driver_user, company=cls.company, license_number="LIC-1", home_terminal="Terminal 1", created_by=cls.admin
+        )
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def test_admin_and_driver(self):
+        admin = load_membership(self.admin)
+        self.assertTrue(admin.is_company_admin(self.company.id))
+        self.assertTrue(admin.is_company_admin(str(self.company.id)))
+        self.assertFalse(admin.is_company_admin(self.other.id))
+        self.assertFalse(admin.is_company_admin("acme"))
+        self.assertIsNone(admin.driver_id)
+
+        driver = load_membership(self.driver_user)
+        self.assertEqual((driver.driver_id, driver.driver_company_id), (self.driver.id, self.company.id))
+        self.assertTrue(driver.is_driver(self.driver.id))
+        self.assertFalse(driver.is_company_admin(self.company.id))
+
+    def test_loaded_once_per_request(self):
+        request = RequestFactory().get("/")
+        request.user = self.admin
+        with self.assertNumQueries(1):
+            get_membership(request)
+            self.assertTrue(get_membership(request).is_company_admin(self.company.id))
+
+    def test_not_cached_across_requests_without_a_shared_cache(self):
+        with self.assertNumQueries(1):
+            load_membership(self.admin)
+        with self.assertNumQueries(1):
+            load_membership(self.admin)
+        self.assertEqual(len(caches["default"]._cache), 0)
+
+    @override_settings(**SHARED_CACHE_SETTINGS)
+    def test_cached_across_requests_in_the_shared_cache(self):
+        caches["shared"].clear()
+        with self.assertNumQueries(1):
+            load_membership(self.admin)
+        with self.assertNumQueries(0):
+            self.assertTrue(load_membership(self.admin).is_company_admin(self.company.id))
+
+        self.company.admins.remove(self.admin)
+        with self.assertNumQueries(1):
+            self.assertFalse(load_membership(self.admin).is_company_admin(self.company.id))
+
+    def test_admin_changes_invalidate_the_cache(self):
+        self.assertFalse(load_membership(self.admin).is_company_admin(self.other.id))
+        self.other.admins.add(self.admin)
+        self.assertTrue(load_membership(self.admin).is_company_admin(self.other.id))
+
+        self.other.admins.clear()
+        self.assertFalse(load_membership(self.admin).is_company_admin(self.other.id))
+
+        self.admin.admin_companies.remove(self.company)
+        self.assertFalse(load_membership(self.admin).is_company_admin(self.company.id))
+
+    @override_settings(**SHARED_CACHE_SETTINGS)
+    def test_admin_changes_invalidate_the_shared_cache(self):
+        caches["shared"].clear()
+        self.test_admin_changes_invalidate_the_cache()
+
+    def test_driver_profile_changes_invalidate_the_cache(self):
+        self.assertIsNone(load_membership(self.admin).driver_id)
+        profile = DriverProfile.objects.create(
+            user=self.admin, company=self.other, license_number="LIC-2", home_terminal="Terminal 2", created_by=self.admin
+        )
+        self.assertEqual(load_membership(self.admin).driver_company_id, self.other.id)
+
+        # `DriverProfile.delete()` only soft deletes.
+        DriverProfile.all_objects.filter(pk=profile.pk).delete()
+        self.assertIsNone(load_membership(self.admin).driver_id)
+
+    @override_settings(**SHARED_CACHE_SETTINGS)
+    def test_driver_profile_changes_invalidate_the_shared_cache(self):
+        caches["shared"].clear()
+        self.test_driver_profile_changes_invalidate_the_cache()
+
+
+class HoursOfServiceEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@acme.example", first_name="Ada", last_name="Admin", phone_number="0")
+        cls.company = Company.objects.create(
+            name="acme", main_office_address="1 Depot Road", phone_number="0", email="office@acme.example", created_by=cls.admin
+        )
+        cls.company.admins.add(cls.admin)
+        cls.driver, cls.idle = (
+            DriverProfile.objects.create(
+                user=User.objects.create(email=email, first_name="Dan", last_name="Driver", phone_number="0"),
+                company=cls.company, license_number=email, home_terminal="Terminal 1", created_by=cls.admin,
+            )
+            for email in ("driver@acme.example", "idle@acme.example")
+        )
+        cls.vehicle = Vehicle.objects.create(
+            company=cls.company, truck_number="TRK-1", license_plate="PL-1", state_of_registration="TX", created_by=cls.admin
+        )
+        cls.vehicle.drivers.add(cls.driver)
+        cls.trip = Trip.objects.create(
+            company=cls.company, driver=cls.driver, vehicle=cls.vehicle, end_date=timezone.now() + timedelta(days=2),
+            starting_location={"lat": 40.0, "lng": -100.0}, ending_location={"lat": 41.0, "lng": -100.0},
+            start_mileage=1000, manifest_no="MF-1", shipper="Shipper", commodity="Freight",
+        )
+        # Nine hours driving without a break, then on duty: a 30-minute break violation eight hours in.
+        cls.started = timezone.now() - timedelta(hours=10)
+        for hours, category in ((0, TripLogEntry.DRIVING), (9, TripLogEntry.ON_DUTY)):
+            TripLogEntry.objects.create(
+                trip=cls.trip, category=category, remarks="", location={"lat": 40.0, "lng": -100.0},
+                date_created=cls.started + timedelta(hours=hours),
+            )
+
+    def setUp(self):
+        caches["default"].clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def test_company_hos(self):
+        response = self.api.get(f"/api/v1/companies/{self.company.id}/hos/")
+        self.assertEqual(response.status_code, 200)
+        drivers = {row["driver"]: row for row in response.json()["drivers"]}
+        self.assertEqual(set(drivers), {self.driver.id, self.idle.id})
+
+        driving = drivers[self.driver.id]
+        self.assertEqual(driving["current_category"], TripLogEntry.ON_DUTY)
+        self.assertEqual([violation["rule"] for violation in driving["violations"]], ["30_minute_break"])
+        self.assertEqual(driving["remaining"]["driving"], 2)
+        self.assertEqual(drivers[self.idle.id]["remaining"], evaluate_entries([])["remaining"])
+
+        # Violations before `date_from` are left out.
+        since = (self.started + timedelta(hours=9)).isoformat()
+        response = self.api.get(f"/api/v1/companies/{self.company.id}/hos/", {"date_from": since})
+        self.assertEqual([row["violations"] for row in response.json()["drivers"]], [[], []])
+
+    def test_driver_hos_and_violations(self):
+        response = self.api.get(f"/api/v1/drivers/{self.driver.id}/hos/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["violations"]), 1)
+
+        url = f"/api/v1/drivers/{self.driver.id}/hos_violations/"
+        before = (self.started + timedelta(hours=7)).isoformat()
+        self.assertEqual(len(self.api.get(url, {"date_from": self.started.isoformat()}).json()["violations"]), 1)
+        self.assertEqual(self.api.get(url, {"date_from": self.started.isoformat(), "date_to": before}).json()["violations"], [])
+
+    def test_fleet_status(self):
+        url = f"/api/v1/companies/{self.company.id}/fleet_status/"
+        drivers = self.api.get(url).json()["drivers"]
+        self.assertEqual([(row["driver"], row["category"], row["vehicle"]) for row in drivers], [
+            (self.driver.id, TripLogEntry.ON_DUTY, self.vehicle.id),
+        ])
+        vehicles = self.api.get(url, {"by": "vehicle", "category": TripLogEntry.ON_DUTY}).json()["vehicles"]
+        self.assertEqual([(row["vehicle"], row["driver"]) for row in vehicles], [(self.vehicle.id, self.driver.id)])
+        self.assertEqual(self.api.get(url, {"by": "vehicle", "category": TripLogEntry.DRIVING}).json()["vehicles"], [])
+
+    def test_only_company_admins(self):
+        self.api.force_authenticate(self.driver.user)
+        for action in ("hos", "fleet_status"):
+            with self.subTest(action=action):
+                self.assertEqual(self.api.get(f"/api/v1/companies/{self.company.id}/{action}/").status_code, 404)
+
+
+class SoftDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email="admin@acme.example", first_name="Ada", last_name="Admin", phone_number="0")
+        cls.company = Company.objects.create(
+            name="acme", main_office_address="1 Depot Road", phone_number="0", email="office@acme.example", created_by=cls.admin
+        )
+        cls.company.admins.add(cls.admin)
+        cls.driver = DriverProfile.objects.create(
+            user=User.objects.create(email="driver@acme.example", first_name="Dan", last_name="Driver", phone_number="0"),
+            company=cls.company, license_number="LIC-1", home_terminal="Terminal 1", created_by=cls.admin,
+        )
+        cls.vehicle = Vehicle.objects.create(
+            company=cls.company, truck_number="TRK-1", license_plate="PL-1", state_of_registration="TX", created_by=cls.admin
+        )
+
+    def setUp(self):
+        caches["default"].clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def ids(self, url, **params):
+        response = self.api.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.json()]
+
+    def test_deleted_drivers_are_listed_apart_and_restored(self):
+        self.driver.delete()
+        self.assertFalse(DriverProfile.objects.filter(pk=self.driver.pk).exists())
+        self.assertTrue(DriverProfile.all_objects.get(pk=self.driver.pk).deleted)
+        self.assertFalse(self.company.drivers(manager="objects").exists())
+
+        self.assertEqual(self.ids("/api/v1/drivers/"), [])
+        self.assertEqual(self.ids("/api/v1/drivers/", deleted="true"), [self.driver.id])
+        self.assertEqual(self.api.get(f"/api/v1/drivers/{self.driver.id}/").status_code, 404)
+
+        self.assertEqual(self.api.post(f"/api/v1/drivers/{self.driver.id}/restore/").status_code, 200)
+        self.assertEqual(self.ids("/api/v1/drivers/"), [self.driver.id])
+        self.assertEqual(self.ids("/api/v1/drivers/", deleted="true"), [])
+        self.assertEqual(self.api.post(f"/api/v1/drivers/{self.driver.id}/restore/").status_code, 400)
+
+    def test_vehicles_out_of_operation_are_listed_apart_and_restored(self):
+        self.assertEqual(self.api.delete(f"/api/v1/vehicles/{self.vehicle.id}/").status_code, 204)
+        self.assertFalse(Vehicle.objects.filter(pk=self.vehicle.pk).exists())
+        self.assertFalse(Vehicle.all_objects.get(pk=self.vehicle.pk).operational)
+
+        self.assertEqual(self.ids("/api/v1/vehicles/"), [])
+        self.assertEqual(self.ids("/api/v1/vehicles/", operational="false"), [self.vehicle.id])
+
+        self.assertEqual(self.api.post(f"/api/v1/vehicles/{self.vehicle.id}/make_operational/").status_code, 200)
+        self.assertEqual(self.ids("/api/v1/vehicles/"), [self.vehicle.id])
+        self.assertEqual(self.api.post(f"/api/v1/vehicles/{self.vehicle.id}/make_operational/").status_code, 400)
@@ -3,7 +3,9 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.db import models
 
+from company.membership import get_membership
 from company.permissions import IsCompanyAdmin, IsDriverCompanyAdmin, IsVehicleCompanyAdmin, UserIsCompanyAdmin
+from .listing import driver_representations, driver_values, vehicle_representations, vehicle_values
 from .models import Company
 from .serializers import CompanySerializer
 from django.shortcuts import get_object_or_404
@@ -12,9 +14,31 @@ from .serializers import DriverProfileSerializer
 from .models import Vehicle
 from .serializers import VehicleSerializer
 from django.contrib.auth import get_user_model
+from trip.filters import (
+    parse_bool_param, parse_choice_param, parse_date_param, parse_datetime_param, parse_float_param, parse_limit_param, parse_point_params,
+)
+from trip.geo import MAX_RADIUS_KM, nearest
+from trip.hos import evaluate_company, evaluate_driver, evaluate_entries
+from trip.models import DriverLiveStatus, TripLogEntry, VehicleLiveStatus
+from trip.rollups import rollup_report
+from trip.serializers import DriverLiveStatusSerializer, VehicleLiveStatusSerializer
 
 User = get_user_model()
 
+REPORT_PERIODS = [("month", "Month"), ("day", "Day")]
+NEAREST_VEHICLES_LIMIT = 5
+
+
+def report_response(request, **filters):
+    """Mileage/hours report from the rollups, by `period` (month or day) between `date_from` and `date_to`."""
+    params = request.query_params
+    return Response(rollup_report(
+        period=parse_choice_param(params, "period", REPORT_PERIODS) or "month",
+        date_from=parse_date_param(params, "date_from"),
+        date_to=parse_date_param(params, "date_to"),
+        **filters,
+    ))
+
 
 class CompanyViewSet(viewsets.ModelViewSet):
     queryset = Company.objects.all()
@@ -35,7 +59,7 @@ class CompanyViewSet(viewsets.ModelViewSet):
         """
         company = get_object_or_404(Company, pk=pk)
 
-        if request.user not in company.admins.all():
+        if not get_membership(request).is_company_admin(company.id):
             return Response({"error": "Only an admin can add another admin"}, status=403)
 
         email = request.data.get("email")
@@ -47,16 +71,89 @@ class CompanyViewSet(viewsets.ModelViewSet):
 
         return Response({"message": f"{user.email} added as an admin"}, status=200)
 
+    @action(detail=True, methods=["get"])
+    def hos(self, request, pk=None):
+        """Hours-of-Service status of every active driver in the company, evaluated in one pass."""
+        company = self.get_object()
+        since = parse_datetime_param(request.query_params, "date_from")
+        results = evaluate_company(company.id, since=since)
+
+        drivers = company.drivers.filter(deleted=False).values_list("id", flat=True)
+        return Response({
+            "company": company.id,
+            "drivers": [
+                {"driver": driver_id, **(results.get(driver_id) or evaluate_entries([]))}
+                for driver_id in drivers
+            ],
+        })
+
+    @action(detail=True, methods=["get"])
+    def fleet_status(self, request, pk=None):
+        """Live status of every driver (or every vehicle with `?by=vehicle`), optionally only one `category`."""
+        company = self.get_object()
+        by = parse_choice_param(request.query_params, "by", [("driver", "Driver"), ("vehicle", "Vehicle")]) or "driver"
+        category = parse_choice_param(request.query_params, "category", TripLogEntry.CATEGORY_CHOICES)
+
+        if by == "driver":
+            statuses = DriverLiveStatus.objects.filter(company=company, driver__deleted=False).select_related("driver__user", "trip")
+            serializer_class = DriverLiveStatusSerializer
+        else:
+            statuses = VehicleLiveStatus.objects.filter(company=company).select_related("vehicle", "trip")
+            serializer_class = VehicleLiveStatusSerializer
+        if category:
+            statuses = statuses.filter(category=category)
+
+        return Response({"company": company.id, f"{by}s": serializer_class(statuses, many=True).data})
+
+    @action(detail=True, methods=["get"])
+    def nearest_vehicles(self, request, pk=None):
+        """
+        The `limit` vehicles whose last logged location is nearest to `lat`/`lng`, optionally only one `category`.
+
+        The search radius starts small and widens (up to `radius_km`) until enough vehicles are found.
+        """
+        company = self.get_object()
+        params = request.query_params
+        lat, lng = parse_point_params(params)
+        limit = parse_limit_param(params, NEAREST_VEHICLES_LIMIT, 50)
+        max_radius_km = parse_float_param(params, "radius_km", 0, MAX_RADIUS_KM)
+        max_radius_km = MAX_RADIUS_KM if max_radius_km is None else max_radius_km
+        category = parse_choice_param(params, "category", TripLogEntry.CATEGORY_CHOICES)
+
+        statuses = VehicleLiveStatus.objects.filter(company=company)
+        if category:
+            statuses = statuses.filter(category=category)
+
+        hits = nearest(statuses, lat, lng, max_radius_km, limit)
+
+        found = statuses.select_related("vehicle", "trip").in_bulk([vehicle_id for vehicle_id, _ in hits])
+        data = VehicleLiveStatusSerializer([found[vehicle_id] for vehicle_id, _ in hits], many=True).data
+        return Response({
+            "company": company.id,
+            "lat": lat,
+            "lng": lng,
+            "vehicles": [{**row, "distance_km": round(distance, 3)} for row, (_, distance) in zip(data, hits)],
+        })
+
+    @action(detail=True, methods=["get"])
+    def report(self, request, pk=None):
+        """Company miles, hours per duty category and trips started, per month or day."""
+        return report_response(request, company_id=self.get_object().id)
+
 class DriverProfileViewSet(viewsets.ModelViewSet):
     queryset = DriverProfile.objects.all()
     serializer_class = DriverProfileSerializer
     permission_classes = [permissions.IsAuthenticated, IsDriverCompanyAdmin, UserIsCompanyAdmin]
 
     def get_queryset(self):
-        """Filter vehicles by company admins or assigned drivers."""
+        """Drivers the user is, or administers; soft-deleted ones only for `restore` and `?deleted=true` listings."""
         user = self.request.user
+        deleted = None if self.detail else parse_bool_param(self.request.query_params, "deleted")
+        drivers = DriverProfile.all_objects if self.action == "restore" or deleted else DriverProfile.objects
+        if deleted is not None:
+            drivers = drivers.filter(deleted=deleted)
         return (
-            DriverProfile.objects.filter(
+            drivers.filter(
                 models.Q(user=user) | models.Q(company__admins=user)
             )
             .select_related("user")
@@ -64,6 +161,10 @@ class DriverProfileViewSet(viewsets.ModelViewSet):
             .distinct()
         )
 
+    def list(self, request, *args, **kwargs):
+        """Drivers built from `.values()` rows rather than a serializer per driver."""
+        return Response(driver_representations(driver_values(self.filter_queryset(self.get_queryset()))))
+
     def perform_destroy(self, instance):
         """Soft delete a driver instead of hard deleting."""
         instance.deleted = True
@@ -82,6 +183,26 @@ class DriverProfileViewSet(viewsets.ModelViewSet):
 
         return Response({"message": "Driver is already active."}, status=400)
     
+    @action(detail=True, methods=["get"])
+    def hos(self, request, pk=None):
+        """Remaining Hours-of-Service and the violations of the current cycle."""
+        driver = self.get_object()
+        return Response(evaluate_driver(driver.id))
+
+    @action(detail=True, methods=["get"])
+    def hos_violations(self, request, pk=None):
+        """Hours-of-Service violations between `date_from` and `date_to`."""
+        driver = self.get_object()
+        since = parse_datetime_param(request.query_params, "date_from")
+        until = parse_datetime_param(request.query_params, "date_to", end_of_day=True)
+        result = evaluate_driver(driver.id, since=since, now=until)
+        return Response({"driver": driver.id, "violations": result["violations"]})
+
+    @action(detail=True, methods=["get"])
+    def report(self, request, pk=None):
+        """Driver miles, hours per duty category and trips started, per month or day."""
+        return report_response(request, driver_id=self.get_object().id)
+
     @action(detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated])
     def profile(self, request):
         """Retrieve the authenticated user's driver profile."""
@@ -96,11 +217,24 @@ class VehicleViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsVehicleCompanyAdmin, UserIsCompanyAdmin]
 
     def get_queryset(self):
-        """Filter vehicles by company admins or assigned drivers."""
+        """
+        Vehicles of the user's companies or assigned to them. Vehicles out of operation only for
+        `make_operational` and `?operational=false` listings.
+        """
         user = self.request.user
-        return Vehicle.objects.filter(
-            models.Q(drivers__user=user) | models.Q(company__admins=user)
-        ).distinct()
+        operational = None if self.detail else parse_bool_param(self.request.query_params, "operational")
+        vehicles = Vehicle.all_objects if self.action == "make_operational" or operational is False else Vehicle.objects
+        if operational is not None:
+            vehicles = vehicles.filter(operational=operational)
+        vehicles = vehicles.filter(models.Q(drivers__user=user) | models.Q(company__admins=user)).distinct()
+        if self.action == "report":
+            # The report only needs the vehicle's id.
+            return vehicles
+        return vehicles.prefetch_related("drivers", "company__admins")
+
+    def list(self, request, *args, **kwargs):
+        """Vehicles built from `.values()` rows; drivers and company admins come from one query each."""
+        return Response(vehicle_representations(vehicle_values(self.filter_queryset(self.get_queryset()))))
 
     def perform_destroy(self, instance):
         """Soft delete: Set operational to False instead of deleting."""
@@ -119,6 +253,11 @@ class VehicleViewSet(viewsets.ModelViewSet):
 
         return Response({"message": "Vehicle is already operational."}, status=400)
     
+    @action(detail=True, methods=["get"])
+    def report(self, request, pk=None):
+        """Vehicle miles, hours per duty category and trips started, per month or day."""
+        return report_response(request, vehicle_id=self.get_object().id)
+
     @action(detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated, IsVehicleCompanyAdmin])
     def assign_driver(self, request, pk=None):
         """
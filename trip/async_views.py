@@ -0,0 +1,122 @@
+"""
+Async versions of the trip read endpoints, served under `/api/v1/async/`.
+
+They answer exactly like `TripViewSet.list/retrieve/logs/logs_time_series` and
+`TripLogEntryViewSet.list`, ETags, 304s and version-keyed caching included. Queries go through Django's async ORM, so under
+ASGI (`uvicorn truck.asgi:application`) a worker keeps serving other requests
+while one waits on the database.
+
+Django's async ORM is itself the sync ORM run in a thread, one query at a time.
+The list endpoints go further: their pages come from REST framework's sync
+`CursorPagination`, so the whole page fetch runs in that thread (see
+`AsyncCursorPagination`). They save the event loop from blocking, not database
+round trips or threads.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.dateparse import parse_date
+from rest_framework import exceptions
+
+from app_user.authentication import authenticated_api_request
+from truck.renderers import json_renderer
+from .filters import TripFilterBackend, TripLogEntryFilterBackend, wants_deleted
+from .listing import log_entry_representations, log_entry_values, trip_representations, trip_values
+from .models import Trip, TripLogEntry
+from .pagination import TripCursorPagination, TripLogEntryCursorPagination
+from .serializers import TripSerializer
+from .versioning import aconditional_response
+
+
+def render_json(data, status=200):
+    return HttpResponse(json_renderer().render(data), status=status, content_type="application/json")
+
+
+def async_api_view(view):
+    """Authenticate like the REST API and turn API exceptions into JSON error responses."""
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            request = await sync_to_async(authenticated_api_request)(request)
+            return await view(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            return render_json(detail, status=exc.status_code)
+
+    return wrapper
+
+
+async def get_visible_trip(request, pk):
+    """The trip `pk` if the user drives it or administers its company (a bare trip; no annotations)."""
+    trip = await Trip.objects.visible_to(request.user).filter(pk=pk).only("id", "company_id", "driver_id", "version").afirst()
+    if trip is None:
+        raise exceptions.NotFound()
+    return trip
+
+
+@async_api_view
+async def trip_list(request):
+    """One cursor page of trips; the page is fetched by the sync ORM in a thread (`apaginate_queryset`)."""
+    trips = Trip.all_objects if wants_deleted(request.query_params) else Trip.objects
+    trips = TripFilterBackend().filter_queryset(request, trips.visible_to(request.user).with_latest_log(), None)
+
+    paginator = TripCursorPagination()
+    page = await paginator.apaginate_queryset(trip_values(trips), request)
+    return render_json(paginator.get_paginated_data(trip_representations(page)))
+
+
+@async_api_view
+async def trip_detail(request, pk):
+    trip = await get_visible_trip(request, pk)
+
+    async def build():
+        full = await Trip.objects.select_related("driver", "company", "vehicle").with_latest_log().aget(pk=trip.pk)
+        return TripSerializer(full).data
+
+    return await aconditional_response(request, trip, build, render_json)
+
+
+@async_api_view
+async def trip_logs(request, pk):
+    """One cursor page of the trip's log entries; the page is fetched by the sync ORM in a thread (`apaginate_queryset`)."""
+    trip = await get_visible_trip(request, pk)
+
+    async def build():
+        entries = TripLogEntry.all_objects if wants_deleted(request.query_params) else TripLogEntry.objects
+        logs = TripLogEntryFilterBackend().filter_queryset(request, entries.filter(trip=trip), None)
+
+        paginator = TripLogEntryCursorPagination()
+        page = await paginator.apaginate_queryset(log_entry_values(logs), request)
+        return paginator.get_paginated_data(log_entry_representations(page))
+
+    return await aconditional_response(request, trip, build, render_json)
+
+
+@async_api_view
+async def trip_logs_time_series(request, pk):
+    trip = await get_visible_trip(request, pk)
+    days = trip.log_days.order_by("date")
+
+    if request.query_params.get("date"):
+        day = parse_date(request.query_params["date"])
+        if day is None:
+            raise exceptions.ValidationError({"date": "Must be an ISO date."})
+        days = days.filter(date=day)
+
+    async def build():
+        return {str(day.date): day.segments async for day in days}
+
+    return await aconditional_response(request, trip, build, render_json)
+
+
+@async_api_view
+async def trip_log_list(request):
+    """One cursor page of log entries; the page is fetched by the sync ORM in a thread (`apaginate_queryset`)."""
+    entries = TripLogEntry.all_objects if wants_deleted(request.query_params) else TripLogEntry.objects
+    logs = TripLogEntryFilterBackend().filter_queryset(request, entries.visible_to(request.user), None)
+
+    paginator = TripLogEntryCursorPagination()
+    page = await paginator.apaginate_queryset(log_entry_values(logs), request)
+    return render_json(paginator.get_paginated_data(log_entry_representations(page)))
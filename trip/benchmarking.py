@@ -0,0 +1,120 @@
+"""Helpers for management commands that exercise the API, in-process or against a running server."""
+import secrets
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+import requests
+
+from django.test import Client
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model, get_application_model
+
+from .models import Trip
+
+
+class Rollback(Exception):
+    """Raised inside `transaction.atomic()` to throw away benchmark data."""
+
+
+@contextmanager
+def access_token(user):
+    """A throwaway OAuth2 access token for `user`, deleted on exit."""
+    application = get_application_model().objects.create(
+        name=f"benchmark-{secrets.token_hex(4)}",
+        user=user,
+        client_type="confidential",
+        authorization_grant_type="password",
+    )
+    token = get_access_token_model().objects.create(
+        user=user,
+        application=application,
+        token=secrets.token_urlsafe(32),
+        expires=timezone.now() + timedelta(hours=1),
+        scope="read write",
+    )
+    try:
+        yield token.token
+    finally:
+        application.delete()
+
+
+@contextmanager
+def token_client(user):
+    """A test client authenticated as `user` with a throwaway OAuth2 access token."""
+    with access_token(user) as token:
+        yield Client(HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_HOST="localhost")
+
+
+def busiest_admin():
+    """The admin of the company with the most trips."""
+    trip = Trip.objects.order_by("-company__trips__id").select_related("company").first()
+    return trip.company.admins.first() if trip else None
+
+
+def read_endpoints(user):
+    """The main read endpoints, pointed at one of the user's trips."""
+    trip = (
+        Trip.objects.filter(company__in=user.admin_companies.values("id"), status=Trip.ONGOING).first()
+        or Trip.objects.filter(company__in=user.admin_companies.values("id")).first()
+    )
+    endpoints = {
+        "trip list": "/api/v1/trips/",
+        "trip-log list": "/api/v1/trip-logs/",
+        "vehicle list": "/api/v1/vehicles/",
+        "driver list": "/api/v1/drivers/",
+        "company list": "/api/v1/companies/",
+    }
+    if trip:
+        endpoints.update({
+            "trip detail": f"/api/v1/trips/{trip.id}/",
+            "trip logs": f"/api/v1/trips/{trip.id}/logs/",
+            "trip time series": f"/api/v1/trips/{trip.id}/logs_time_series/",
+        })
+    return endpoints
+
+
+def summarise(latencies, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "requests": count,
+        "rps": count / elapsed if elapsed else float("inf"),
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[min(int(count * 0.99), count - 1)],
+    }
+
+
+def time_requests(send, count):
+    """Call `send()` `count` times and summarise the latencies (ms) and throughput."""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(count):
+        request_started = time.perf_counter()
+        response = send()
+        latencies.append((time.perf_counter() - request_started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f"Request failed with status {response.status_code}.")
+    return summarise(latencies, time.perf_counter() - started)
+
+
+def time_concurrent_requests(url, headers, count, concurrency):
+    """GET `url` `count` times over HTTP from `concurrency` threads (one keep-alive session each)."""
+    sessions = threading.local()
+
+    def send(_):
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+        request_started = time.perf_counter()
+        response = sessions.session.get(url, headers=headers, timeout=60)
+        if response.status_code >= 400:
+            raise RuntimeError(f"GET {url} returned {response.status_code}.")
+        return (time.perf_counter() - request_started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        latencies = list(executor.map(send, range(count)))
+    return summarise(latencies, time.perf_counter() - started)
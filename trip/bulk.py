@@ -0,0 +1,124 @@
+"""Batch ingestion of log entries replayed by devices that were offline."""
+from django.db import IntegrityError, transaction
+
+from .models import Trip, TripLogEntry
+from .odometer import check_batch
+from .serializers import TripLogEntryBulkItemSerializer
+from .signals import log_entries_bulk_created
+
+BULK_LOG_ENTRY_LIMIT = 500
+
+CREATED = "created"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+
+
+def _writable_trips(membership, trip_ids):
+    """Trips among `trip_ids` the user may log against (their own or their companies' trips), by id."""
+    trips = Trip.objects.filter(id__in=trip_ids).only(
+        "id", "company_id", "driver_id", "start_mileage", "start_date", "end_date", "status"
+    )
+    return {trip.id: trip for trip in trips if membership.can_access_trip(trip)}
+
+
+def _stored_entries(trip_ids, client_ids):
+    """Ids of the stored entries (soft-deleted ones included) by (trip, client_id)."""
+    return {
+        (trip_id, client_id): entry_id
+        for entry_id, trip_id, client_id in TripLogEntry.all_objects.filter(
+            trip_id__in=trip_ids, client_id__in=client_ids
+        ).values_list("id", "trip_id", "client_id")
+    }
+
+
+def _validate(items):
+    """Results for the items that do not validate, and (index, validated data) for the rest."""
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        serializer = TripLogEntryBulkItemSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {"index": index, "status": INVALID, "errors": serializer.errors}
+    return results, valid
+
+
+def _store(writable, stored, results, valid):
+    """Store the valid items that are not in `stored` yet; returns one result per item."""
+    results = list(results)
+    pending, pending_results = {}, {}
+    # Repeats of an item earlier in the same batch; they end up as their first occurrence did.
+    repeats = set()
+    for index, data in valid:
+        key = (data["trip"], data["client_id"])
+        result = {"index": index, "client_id": data["client_id"]}
+
+        if data["trip"] not in writable:
+            result.update(status=INVALID, errors={"trip": ["You must be the trip driver or a company admin."]})
+        elif key in stored:
+            result.update(status=DUPLICATE, id=stored[key])
+        elif key in pending_results:
+            repeats.add(index)
+        else:
+            fields = {name: value for name, value in data.items() if name != "trip"}
+            pending[key] = TripLogEntry(trip_id=data["trip"], **fields)
+            pending[key].update_coordinates()  # bulk_create skips pre_save
+            pending_results[key] = result
+            result.update(status=CREATED)
+        results[index] = (key, result)
+
+    # Odometer readings and timestamps are checked per trip, against the stored readings and the rest of the batch.
+    by_trip = {}
+    for key, entry in pending.items():
+        by_trip.setdefault(entry.trip_id, []).append((key, entry.date_created, entry.odm_reading))
+    for trip_id, entries in by_trip.items():
+        for key, errors in check_batch(writable[trip_id], entries).items():
+            del pending[key]
+            pending_results[key].update(status=INVALID, errors={field: [message] for field, message in errors.items()})
+
+    created = TripLogEntry.objects.bulk_create(list(pending.values()))
+    log_entries_bulk_created.send(sender=TripLogEntry, entries=created)
+
+    ids = {(entry.trip_id, entry.client_id): entry.id for entry in created}
+    for index, entry in enumerate(results):
+        if isinstance(entry, tuple):
+            key, result = entry
+            if index in repeats:
+                first = pending_results[key]
+                if first["status"] == INVALID:
+                    result.update(status=INVALID, errors=first["errors"])
+                else:
+                    result.update(status=DUPLICATE, id=ids.get(key))
+            elif result["status"] == CREATED:
+                result["id"] = ids.get(key)
+            results[index] = result
+
+    return results
+
+
+def ingest_log_entries(membership, items):
+    """
+    Validate and store a batch of log entries in one transaction.
+
+    Items are idempotent on (trip, client_id): replays are reported as duplicates
+    instead of being stored again. An item repeated within the batch gets the
+    outcome of its first occurrence. Returns one result per item, in input order.
+    """
+    results, valid = _validate(items)
+    client_ids = {data["client_id"] for _, data in valid}
+
+    with transaction.atomic():
+        writable = _writable_trips(membership, {data["trip"] for _, data in valid})
+        stored = _stored_entries(writable, client_ids)
+        while True:
+            try:
+                with transaction.atomic():
+                    return _store(writable, stored, results, valid)
+            except IntegrityError:
+                # Concurrent writes stored some of the same entries first: look again, they are duplicates now.
+                # Each retry has more duplicates; an error that no new entry explains is not ours to swallow.
+                now_stored = _stored_entries(writable, client_ids)
+                if now_stored.keys() <= stored.keys():
+                    raise
+                stored = now_stored
@@ -0,0 +1,147 @@
+"""
+Live trip and log-entry events for server-push subscribers.
+
+Writes publish small deltas once their transaction commits: on the trip's
+channel (`trip:<id>`, for its driver) and on the company's channel
+(`company:<id>`, for fleet dashboards). Delivery goes through the broker named
+by `settings.LIVE_UPDATES_BROKER`. The default `InProcessBroker` only reaches
+subscribers connected to the same process. Replace it with a shared broker
+when running several workers, or with a recording stand-in in tests.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+LOG_ENTRY_EVENT_FIELDS = ["id", "trip_id", "category", "remarks", "location", "odm_reading", "date_created", "deleted"]
+TRIP_EVENT_FIELDS = [
+    "id", "company_id", "driver_id", "vehicle_id", "status", "start_date", "end_date",
+    "start_mileage", "end_mileage", "manifest_no", "deleted",
+]
+
+
+def company_channel(company_id):
+    return f"company:{company_id}"
+
+
+def trip_channel(trip_id):
+    return f"trip:{trip_id}"
+
+
+class Subscription:
+    """A subscriber's queue of events, read from the event loop it was created on."""
+
+    def __init__(self, channels, max_pending):
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(max_pending)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Called from any thread; never blocks the publisher."""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A slow client: end its stream so it reconnects and refetches instead of missing events silently.
+            self.overflowed = True
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class BaseBroker:
+    def publish(self, channel, event):
+        raise NotImplementedError
+
+    def subscribe(self, channels):
+        """Return a `Subscription` receiving the events of `channels`; must be called from the event loop."""
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class InProcessBroker(BaseBroker):
+    """Fans events out to the subscribers connected to this process."""
+
+    def __init__(self, max_pending=1000):
+        self.max_pending = max_pending
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+            event = {"id": next(self._ids), **event}
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels, self.max_pending)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel, set())
+                subscribers.discard(subscription)
+                if not subscribers:
+                    self._subscribers.pop(channel, None)
+
+
+_broker = None
+_broker_path = None
+
+
+def get_broker():
+    """The broker configured by `settings.LIVE_UPDATES_BROKER`, created once per process."""
+    global _broker, _broker_path
+    path = getattr(settings, "LIVE_UPDATES_BROKER", "trip.events.InProcessBroker")
+    if _broker is None or _broker_path != path:
+        _broker, _broker_path = import_string(path)(), path
+    return _broker
+
+
+def _publish(company_id, trip_id, event):
+    broker = get_broker()
+    try:
+        broker.publish(trip_channel(trip_id), event)
+        broker.publish(company_channel(company_id), event)
+    except Exception:
+        # A broker outage must not fail the write that triggered the event.
+        logger.exception("Could not publish %s for trip %s", event["type"], trip_id)
+
+
+def publish_on_commit(company_id, trip_id, event):
+    transaction.on_commit(lambda: _publish(company_id, trip_id, event))
+
+
+def log_entry_event(action, entry, company_id):
+    return {
+        "type": f"log_entry.{action}",
+        "company": company_id,
+        "trip": entry.trip_id,
+        "data": {field: getattr(entry, field) for field in LOG_ENTRY_EVENT_FIELDS},
+    }
+
+
+def trip_event(action, trip):
+    return {
+        "type": f"trip.{action}",
+        "company": trip.company_id,
+        "trip": trip.id,
+        "data": {field: getattr(trip, field) for field in TRIP_EVENT_FIELDS},
+    }
@@ -0,0 +1,110 @@
+"""
+Streaming exports of log entries, read through a server-side cursor.
+
+Under WSGI the rows are read and formatted by a plain generator. Under ASGI
+Django would have to read a sync generator to the end before sending anything,
+so the rows are read in a worker thread and sent a chunk of lines at a time.
+"""
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("trip", "trip_id"),
+    ("manifest_no", "trip__manifest_no"),
+    ("driver", "trip__driver_id"),
+    ("driver_first_name", "trip__driver__user__first_name"),
+    ("driver_last_name", "trip__driver__user__last_name"),
+    ("vehicle", "trip__vehicle_id"),
+    ("truck_number", "trip__vehicle__truck_number"),
+    ("category", "category"),
+    ("date_created", "date_created"),
+    ("odm_reading", "odm_reading"),
+    ("location", "location"),
+    ("remarks", "remarks"),
+    ("deleted", "deleted"),
+]
+EXPORT_NAMES = [name for name, _ in EXPORT_COLUMNS]
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose `write` hands the line back, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+class CSVExport:
+    content_type = "text/csv"
+
+    def __init__(self):
+        # csv writers are not thread-safe; each export has its own.
+        self.writer = csv.writer(Echo())
+        self.date_index, self.location_index = EXPORT_NAMES.index("date_created"), EXPORT_NAMES.index("location")
+
+    def header(self):
+        return self.writer.writerow(EXPORT_NAMES)
+
+    def line(self, row):
+        row = list(row)
+        row[self.date_index] = row[self.date_index].isoformat()
+        row[self.location_index] = json.dumps(row[self.location_index])
+        return self.writer.writerow(row)
+
+
+class NDJSONExport:
+    content_type = "application/x-ndjson"
+
+    def header(self):
+        return ""
+
+    def line(self, row):
+        return json.dumps(dict(zip(EXPORT_NAMES, row)), cls=JSONEncoder) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": CSVExport,
+    "ndjson": NDJSONExport,
+}
+
+
+def export_rows(queryset):
+    return queryset.order_by("date_created", "id").values_list(*(field for _, field in EXPORT_COLUMNS))
+
+
+def stream_export(export, rows):
+    if header := export.header():
+        yield header
+    for row in rows:
+        yield export.line(row)
+
+
+async def astream_export(export, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    # `aiterator()` cannot read `values_list()` rows yet, so chunks of the sync iterator are read in a worker thread.
+    rows = rows.iterator(chunk_size=chunk_size)
+    read_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)))
+
+    header = export.header()
+    while chunk := await read_chunk():
+        yield header + "".join(export.line(row) for row in chunk)
+        header = ""
+    if header:
+        yield header
+
+
+def export_response(file_format, queryset, asynchronous=False):
+    """A streaming response of `queryset`'s rows; `asynchronous` when served under ASGI."""
+    export = EXPORT_FORMATS[file_format]()
+    rows = export_rows(queryset)
+    if asynchronous:
+        content = astream_export(export, rows)
+    else:
+        content = stream_export(export, rows.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+    return StreamingHttpResponse(content, content_type=export.content_type)
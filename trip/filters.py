@@ -0,0 +1,150 @@
+import math
+from datetime import datetime
+
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import is_naive, make_aware
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Trip, TripLogEntry
+
+
+def parse_bool_param(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    if value.lower() in ("true", "1", "yes"):
+        return True
+    if value.lower() in ("false", "0", "no"):
+        return False
+    raise ValidationError({name: "Must be a boolean."})
+
+
+def wants_deleted(params):
+    """Were soft-deleted rows asked for (`?deleted=true`)? Otherwise lists read the live-only default managers."""
+    return bool(parse_bool_param(params, "deleted"))
+
+
+def parse_int_param(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: "Must be an integer."})
+
+
+def parse_limit_param(params, default, maximum):
+    """`limit`, clamped to 1..maximum."""
+    limit = parse_int_param(params, "limit")
+    return default if limit is None else min(max(limit, 1), maximum)
+
+
+def parse_float_param(params, name, minimum=None, maximum=None):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValidationError({name: "Must be a number."})
+    if not math.isfinite(number):
+        raise ValidationError({name: "Must be a number."})
+    if minimum is not None and number < minimum:
+        raise ValidationError({name: f"Must be at least {minimum}."})
+    if maximum is not None and number > maximum:
+        raise ValidationError({name: f"Must be at most {maximum}."})
+    return number
+
+
+def parse_point_params(params):
+    """The required `lat`/`lng` query parameters."""
+    point = (parse_float_param(params, "lat", -90, 90), parse_float_param(params, "lng", -180, 180))
+    missing = {name: "This query parameter is required." for name, value in zip(("lat", "lng"), point) if value is None}
+    if missing:
+        raise ValidationError(missing)
+    return point
+
+
+def parse_bbox_params(params):
+    """The required `min_lat`/`min_lng`/`max_lat`/`max_lng` query parameters. `min_lng > max_lng` crosses the antimeridian."""
+    bounds = {"min_lat": (-90, 90), "min_lng": (-180, 180), "max_lat": (-90, 90), "max_lng": (-180, 180)}
+    box = {name: parse_float_param(params, name, *limits) for name, limits in bounds.items()}
+    missing = {name: "This query parameter is required." for name, value in box.items() if value is None}
+    if missing:
+        raise ValidationError(missing)
+    if box["min_lat"] > box["max_lat"]:
+        raise ValidationError({"min_lat": "Must not be greater than max_lat."})
+    return box["min_lat"], box["min_lng"], box["max_lat"], box["max_lng"]
+
+
+def parse_datetime_param(params, name, end_of_day=False):
+    """Accept either an ISO datetime or a plain date (start or end of that day)."""
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({name: "Must be an ISO date or datetime."})
+        parsed = datetime.combine(day, datetime.max.time() if end_of_day else datetime.min.time())
+
+    return make_aware(parsed) if is_naive(parsed) else parsed
+
+
+def parse_date_param(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValidationError({name: "Must be an ISO date."})
+    return parsed
+
+
+def parse_choice_param(params, name, choices):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    allowed = [choice for choice, _ in choices]
+    if value not in allowed:
+        raise ValidationError({name: f"Must be one of {', '.join(allowed)}."})
+    return value
+
+
+class TripFilterBackend(BaseFilterBackend):
+    """Filter trips by status, company, vehicle, driver, start date range and deleted flag."""
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        filters = {
+            "status": parse_choice_param(params, "status", Trip.STATUS_CHOICES),
+            "company_id": parse_int_param(params, "company"),
+            "vehicle_id": parse_int_param(params, "vehicle"),
+            "driver_id": parse_int_param(params, "driver"),
+            "start_date__gte": parse_datetime_param(params, "date_from"),
+            "start_date__lte": parse_datetime_param(params, "date_to", end_of_day=True),
+            "deleted": parse_bool_param(params, "deleted"),
+        }
+        return queryset.filter(**{key: value for key, value in filters.items() if value is not None})
+
+
+class TripLogEntryFilterBackend(BaseFilterBackend):
+    """Filter log entries by trip, category, company, vehicle, driver, date range and deleted flag."""
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        filters = {
+            "trip_id": parse_int_param(params, "trip"),
+            "category": parse_choice_param(params, "category", TripLogEntry.CATEGORY_CHOICES),
+            "trip__company_id": parse_int_param(params, "company"),
+            "trip__vehicle_id": parse_int_param(params, "vehicle"),
+            "trip__driver_id": parse_int_param(params, "driver"),
+            "date_created__gte": parse_datetime_param(params, "date_from"),
+            "date_created__lte": parse_datetime_param(params, "date_to", end_of_day=True),
+            "deleted": parse_bool_param(params, "deleted"),
+        }
+        return queryset.filter(**{key: value for key, value in filters.items() if value is not None})
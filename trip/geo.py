@@ -0,0 +1,177 @@
+"""
+Coordinates and geohash cells for JSON locations, without PostGIS.
+
+Locations are free-form JSON; `coordinates()` pulls a (lat, lng) pair out of
+the shapes clients send. Each located row also stores a geohash. Nearby points
+share geohash prefixes, so a bounding box is covered by a few prefixes. Each
+prefix is a plain B-tree range scan (`geohash >= prefix AND geohash < prefix
++ "{"`), which works the same on Postgres and SQLite.
+"""
+import heapq
+import math
+
+from django.db.models import Q
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 12
+# Cap on the prefixes used to cover a box; larger boxes use shorter (coarser) prefixes.
+MAX_COVER_CELLS = 32
+EARTH_RADIUS_KM = 6371.0088
+# Defaults and caps for the radius/nearest query endpoints.
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 2000
+# Log entries are far denser than trips or vehicles, so their searches are kept smaller.
+MAX_LOG_RADIUS_KM = 250
+# Nearest searches start this close and widen (by `NEAR_GROWTH`) until enough rows are found.
+NEAR_START_KM = 5
+NEAR_GROWTH = 8
+DEFAULT_NEAR_LIMIT = 50
+MAX_NEAR_LIMIT = 500
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def coordinates(location):
+    """(lat, lng) from `{"lat", "lng"}`-style dicts, GeoJSON points or `[lat, lng]` pairs; None if absent or invalid."""
+    lat = lng = None
+    if isinstance(location, dict):
+        if isinstance(location.get("coordinates"), (list, tuple)) and len(location["coordinates"]) >= 2:
+            lng, lat = location["coordinates"][:2]  # GeoJSON order
+        else:
+            lat = next((location[key] for key in ("lat", "latitude") if key in location), None)
+            lng = next((location[key] for key in ("lng", "lon", "long", "longitude") if key in location), None)
+    elif isinstance(location, (list, tuple)) and len(location) >= 2:
+        lat, lng = location[:2]
+
+    lat, lng = _number(lat), _number(lng)
+    if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        span, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (span[0] + span[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            span[0] = middle
+        else:
+            span[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def location_columns(location):
+    """(latitude, longitude, geohash) to store for a JSON location."""
+    point = coordinates(location)
+    if point is None:
+        return None, None, None
+    return point[0], point[1], encode(*point)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell."""
+    bits = precision * 5
+    return 180 / 2 ** (bits // 2), 360 / 2 ** (bits - bits // 2)
+
+
+def _cells(min_lat, min_lng, max_lat, max_lng, precision):
+    height, width = cell_size(precision)
+    rows = range(int((min_lat + 90) // height), int((max_lat + 90) // height) + 1)
+    columns = range(int((min_lng + 180) // width), int((max_lng + 180) // width) + 1)
+    if len(rows) * len(columns) > MAX_COVER_CELLS:
+        return None
+    return {
+        encode(min(-90 + (row + 0.5) * height, 90), min(-180 + (column + 0.5) * width, 180), precision)
+        for row in rows
+        for column in columns
+    }
+
+
+def cover(min_lat, min_lng, max_lat, max_lng):
+    """The longest geohash prefixes (at most `MAX_COVER_CELLS`) whose cells cover the box."""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cells = _cells(min_lat, min_lng, max_lat, max_lng, precision)
+        if cells is not None:
+            return cells
+    return set(BASE32)
+
+
+def bbox_q(min_lat, min_lng, max_lat, max_lng, prefix=""):
+    """
+    Filter for rows (with `<prefix>latitude/longitude/geohash` columns) inside the box.
+
+    A box with min_lng > max_lng crosses the antimeridian.
+    """
+    if min_lng > max_lng:
+        return bbox_q(min_lat, min_lng, max_lat, 180, prefix) | bbox_q(min_lat, -180, max_lat, max_lng, prefix)
+
+    cells = Q()
+    for cell in cover(min_lat, min_lng, max_lat, max_lng):
+        cells |= Q(**{f"{prefix}geohash__gte": cell, f"{prefix}geohash__lt": cell + "{"})
+    return cells & Q(**{
+        f"{prefix}latitude__gte": min_lat,
+        f"{prefix}latitude__lte": max_lat,
+        f"{prefix}longitude__gte": min_lng,
+        f"{prefix}longitude__lte": max_lng,
+    })
+
+
+def radius_bbox(lat, lng, radius_km):
+    """(min_lat, min_lng, max_lat, max_lng) around a circle; the whole longitude range near the poles."""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = max(lat - delta_lat, -90), min(lat + delta_lat, 90)
+    if min_lat == -90 or max_lat == 90 or math.cos(math.radians(lat)) < 1e-6:
+        return min_lat, -180, max_lat, 180
+
+    delta_lng = math.degrees(math.asin(min(math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat)), 1)))
+    if delta_lng >= 180:
+        return min_lat, -180, max_lat, 180
+    min_lng, max_lng = lng - delta_lng, lng + delta_lng
+    # Wrap across the antimeridian; bbox_q splits such boxes.
+    return min_lat, (min_lng + 540) % 360 - 180, max_lat, (max_lng + 540) % 360 - 180
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1)))
+
+
+def _within(queryset, lat, lng, radius_km, limit, prefix):
+    rows = queryset.filter(bbox_q(*radius_bbox(lat, lng, radius_km), prefix)).values_list(
+        "pk", f"{prefix}latitude", f"{prefix}longitude"
+    )
+    distances = ((haversine_km(lat, lng, row_lat, row_lng), pk) for pk, row_lat, row_lng in rows)
+    return [(pk, distance) for distance, pk in heapq.nsmallest(limit, (hit for hit in distances if hit[0] <= radius_km))]
+
+
+def nearest(queryset, lat, lng, radius_km, limit, prefix=""):
+    """
+    (pk, distance_km) of at most `limit` rows within `radius_km` of a point, nearest first.
+
+    Only the rows in a circle's bounding box are read, so the circle starts at
+    `NEAR_START_KM` and widens until it holds `limit` rows or reaches
+    `radius_km`. Rows outside a circle are farther than any row inside it, so
+    the first circle with `limit` rows holds the nearest ones.
+    """
+    search_km = min(NEAR_START_KM, radius_km)
+    hits = _within(queryset, lat, lng, search_km, limit, prefix)
+    while len(hits) < limit and search_km < radius_km:
+        search_km = min(search_km * NEAR_GROWTH, radius_km)
+        hits = _within(queryset, lat, lng, search_km, limit, prefix)
+    return hits
@@ -0,0 +1,204 @@
+"""
+Hours-of-Service evaluation over a driver's log entries.
+
+Entries are consumed in chronological order (across trips) by a streaming
+evaluator that keeps only the running shift/break counters and the on-duty
+intervals inside the cycle window, so a whole fleet can be evaluated in one
+ordered pass over the log table.
+
+Implements the property-carrying rules: 11 hours driving and a 14-hour window
+after 10 consecutive hours off duty, a 30-minute break after 8 hours of
+driving, the 60/70-hour cycle and the 34-hour restart. Sleeper-berth split
+provisions and exceptions are not modelled.
+"""
+from collections import deque
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import TripLogEntry
+
+DRIVING_LIMIT = 11
+WINDOW_LIMIT = 14
+BREAK_AFTER = 8
+BREAK_LENGTH = 0.5
+SHIFT_RESET = 10
+CYCLE_RESET = 34
+
+CYCLES = {
+    "60_7": (60, 7),
+    "70_8": (70, 8),
+}
+
+REST_CATEGORIES = {TripLogEntry.OFF_DUTY, TripLogEntry.SLEEPER_BERTH}
+ENTRY_FIELDS = ["id", "trip_id", "category", "date_created"]
+
+
+def _hours(start, end):
+    return max((end - start).total_seconds(), 0) / 3600
+
+
+def get_cycle():
+    """The (hours, days) cycle configured by `settings.HOS_CYCLE`, 70 hours / 8 days by default."""
+    return CYCLES[getattr(settings, "HOS_CYCLE", "70_8")]
+
+
+class HoursOfServiceEvaluator:
+    """Streaming HOS evaluator for one driver. Feed entries in chronological order, then `finish()`."""
+
+    def __init__(self, cycle=None):
+        self.cycle_limit, cycle_days = cycle or get_cycle()
+        self.cycle_window = timedelta(days=cycle_days)
+
+        self.shift_start = None
+        self.driving_in_shift = 0
+        self.driving_since_break = 0
+        self.non_driving_run = 0
+        self.rest_run = 0
+        self.duty_intervals = deque()
+        self.violations = []
+        self.current = None
+
+    def feed(self, entry):
+        """Consume one entry dict (`id`, `trip_id`, `category`, `date_created`)."""
+        if self.current is not None:
+            self._apply(self.current, entry["date_created"])
+        self.current = entry
+
+    def finish(self, now=None):
+        """Close the open status at `now` and return remaining hours and violations."""
+        now = now or timezone.now()
+        if self.current is not None:
+            self._apply(self.current, now)
+
+        remaining = {
+            "driving": DRIVING_LIMIT - self.driving_in_shift,
+            "window": WINDOW_LIMIT - _hours(self.shift_start, now) if self.shift_start else WINDOW_LIMIT,
+            "break": BREAK_AFTER - self.driving_since_break,
+            "cycle": self.cycle_limit - self.cycle_hours(now),
+        }
+        remaining = {rule: round(max(hours, 0), 2) for rule, hours in remaining.items()}
+
+        return {
+            "current_category": self.current["category"] if self.current else None,
+            "since": self.current["date_created"] if self.current else None,
+            "remaining": remaining,
+            "available_driving": min(remaining.values()),
+            "violations": self.violations,
+        }
+
+    def cycle_hours(self, at):
+        """On-duty hours inside the cycle window ending at `at`."""
+        window_start = at - self.cycle_window
+        while self.duty_intervals and self.duty_intervals[0][1] <= window_start:
+            self.duty_intervals.popleft()
+        return sum(_hours(max(start, window_start), min(end, at)) for start, end in self.duty_intervals)
+
+    def _apply(self, entry, until):
+        start = entry["date_created"]
+        duration = _hours(start, until)
+        category = entry["category"]
+
+        if category in REST_CATEGORIES:
+            self.rest_run += duration
+            self.non_driving_run += duration
+            if self.non_driving_run >= BREAK_LENGTH:
+                self.driving_since_break = 0
+            if self.rest_run >= SHIFT_RESET:
+                self.shift_start = None
+                self.driving_in_shift = 0
+            if self.rest_run >= CYCLE_RESET:
+                self.duty_intervals.clear()
+            return
+
+        self.rest_run = 0
+        if self.shift_start is None:
+            self.shift_start = start
+
+        if category == TripLogEntry.DRIVING:
+            self._check_driving(entry, start, duration)
+            self.driving_in_shift += duration
+            self.driving_since_break += duration
+            self.non_driving_run = 0
+        else:
+            self.non_driving_run += duration
+            if self.non_driving_run >= BREAK_LENGTH:
+                self.driving_since_break = 0
+
+        self.duty_intervals.append((start, until))
+
+    def _check_driving(self, entry, start, duration):
+        """Record every limit this driving period runs past, and when it was crossed."""
+        allowed = {
+            "11_hour_driving": DRIVING_LIMIT - self.driving_in_shift,
+            "14_hour_window": WINDOW_LIMIT - _hours(self.shift_start, start),
+            "30_minute_break": BREAK_AFTER - self.driving_since_break,
+            "cycle": self.cycle_limit - self.cycle_hours(start),
+        }
+        for rule, hours in allowed.items():
+            if duration > hours:
+                hours = max(hours, 0)
+                self.violations.append({
+                    "rule": rule,
+                    "at": start + timedelta(hours=hours),
+                    "hours_over": round(duration - hours, 2),
+                    "entry": entry["id"],
+                    "trip": entry["trip_id"],
+                })
+
+
+def lookback_start(since=None, now=None):
+    """Earliest entry that can still affect the result: a full cycle window plus a day before `since`."""
+    _, cycle_days = get_cycle()
+    return (since or now or timezone.now()) - timedelta(days=cycle_days + 1)
+
+
+def evaluate_entries(entries, now=None, since=None):
+    """Evaluate one driver's chronological entries, keeping only violations from `since` on."""
+    evaluator = HoursOfServiceEvaluator()
+    for entry in entries:
+        evaluator.feed(entry)
+    result = evaluator.finish(now)
+
+    if since:
+        result["violations"] = [violation for violation in result["violations"] if violation["at"] >= since]
+    return result
+
+
+def driver_entries(driver_id, start, end=None):
+    entries = TripLogEntry.objects.filter(trip__driver_id=driver_id, deleted=False, date_created__gte=start)
+    if end:
+        entries = entries.filter(date_created__lte=end)
+    return entries.order_by("date_created", "id").values(*ENTRY_FIELDS)
+
+
+def evaluate_driver(driver_id, since=None, now=None):
+    """Remaining hours for a driver at `now` and their violations from `since` (the current cycle by default)."""
+    now = now or timezone.now()
+    since = since or now - timedelta(days=get_cycle()[1])
+    return evaluate_entries(driver_entries(driver_id, lookback_start(since), now).iterator(), now, since)
+
+
+def evaluate_company(company_id, since=None, now=None, chunk_size=5000):
+    """Evaluate every driver of a company in a single ordered pass over their log entries."""
+    now = now or timezone.now()
+    since = since or now - timedelta(days=get_cycle()[1])
+
+    entries = (
+        TripLogEntry.objects.filter(
+            trip__company_id=company_id,
+            deleted=False,
+            date_created__gte=lookback_start(since),
+            date_created__lte=now,
+        )
+        .order_by("trip__driver_id", "date_created", "id")
+        .values("trip__driver_id", *ENTRY_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    return {
+        driver_id: evaluate_entries(entries_of_driver, now, since)
+        for driver_id, entries_of_driver in groupby(entries, key=lambda entry: entry["trip__driver_id"])
+    }
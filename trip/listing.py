@@ -0,0 +1,50 @@
+"""
+Lean read paths for the trip and trip-log lists.
+
+List pages are built from `.values()` rows instead of model instances and
+`TripSerializer`/`TripLogEntrySerializer`, which instantiate fields and
+nested serializers for every row. The bodies are the same: the same keys,
+and datetimes rendered by the JSON encoder exactly as the serializers' fields
+render them. `python manage.py benchmark_serializers` compares the two paths.
+"""
+TRIP_COLUMNS = [
+    "id", "start_date", "last_odm_reading", "last_log_category", "last_log_date", "end_date",
+    "starting_location", "ending_location", "start_latitude", "start_longitude", "start_geohash",
+    "end_latitude", "end_longitude", "end_geohash", "start_mileage", "end_mileage", "status", "manifest_no",
+    "shipper", "commodity", "deleted", "version",
+]
+# Nested objects of a trip: {key: {nested key: lookup}}, as `trip.serializers` nests them.
+TRIP_NESTED = {
+    "vehicle": {"id": "vehicle_id", "license_plate": "vehicle__license_plate", "truck_number": "vehicle__truck_number"},
+    "company": {"id": "company_id", "name": "company__name", "main_office_address": "company__main_office_address"},
+    "driver": {"id": "driver_id", "home_terminal": "driver__home_terminal", "license_number": "driver__license_number"},
+}
+
+LOG_ENTRY_COLUMNS = [
+    "id", "category", "remarks", "location", "odm_reading", "date_created", "deleted", "client_id",
+    "latitude", "longitude", "geohash",
+]
+
+
+def trip_values(trips):
+    """`trips` (annotated `with_latest_log()`) as rows, for the cursor paginator and `trip_representations`."""
+    lookups = [lookup for nested in TRIP_NESTED.values() for lookup in nested.values()]
+    return trips.select_related(None).values(*TRIP_COLUMNS, *lookups)
+
+
+def trip_representations(rows):
+    return [
+        {
+            **{column: row[column] for column in TRIP_COLUMNS},
+            **{key: {field: row[lookup] for field, lookup in nested.items()} for key, nested in TRIP_NESTED.items()},
+        }
+        for row in rows
+    ]
+
+
+def log_entry_values(entries):
+    return entries.values(*LOG_ENTRY_COLUMNS, "trip_id")
+
+
+def log_entry_representations(rows):
+    return [{**{column: row[column] for column in LOG_ENTRY_COLUMNS}, "trip": row["trip_id"]} for row in rows]
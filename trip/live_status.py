@@ -0,0 +1,91 @@
+"""
+Per-driver and per-vehicle live status: current duty category, since when,
+last location, last odometer reading and the trip it was logged on.
+
+New entries move the status forward with a single conditional UPDATE. Edits,
+deletes, backdated entries and trip reassignments recompute it from the
+driver's/vehicle's latest live entry instead.
+"""
+from django.utils import timezone
+
+from .models import DriverLiveStatus, Trip, TripLogEntry, VehicleLiveStatus
+
+# (status model, owner field on Trip)
+LIVE_STATUS_MODELS = [(DriverLiveStatus, "driver"), (VehicleLiveStatus, "vehicle")]
+
+STATUS_FIELDS = ["trip_id", "trip__company_id", "category", "date_created", "location", "latitude", "longitude", "geohash"]
+
+
+def _latest_status(owner_field, owner_id):
+    entries = TripLogEntry.objects.filter(
+        **{f"trip__{owner_field}_id": owner_id}, deleted=False, trip__deleted=False
+    ).order_by("-date_created", "-id")
+
+    latest = entries.values(*STATUS_FIELDS).first()
+    if latest is None:
+        return None
+
+    return {
+        "trip_id": latest["trip_id"],
+        "company_id": latest["trip__company_id"],
+        "category": latest["category"],
+        "since": latest["date_created"],
+        "location": latest["location"],
+        "latitude": latest["latitude"],
+        "longitude": latest["longitude"],
+        "geohash": latest["geohash"],
+        "odm_reading": entries.filter(odm_reading__isnull=False).values_list("odm_reading", flat=True).first(),
+    }
+
+
+def refresh_owner_status(model, owner_field, owner_id):
+    """Recompute one driver's or vehicle's status from their latest live entry."""
+    status = _latest_status(owner_field, owner_id)
+    if status is None:
+        model.objects.filter(**{f"{owner_field}_id": owner_id}).delete()
+    else:
+        owner = {f"{owner_field}_id": owner_id}
+        # Statuses usually exist already: one UPDATE (which skips auto_now), and the upsert only for new owners.
+        if not model.objects.filter(**owner).update(**status, date_updated=timezone.now()):
+            model.objects.update_or_create(**owner, defaults=status)
+
+
+def refresh_live_status(trip_ids=(), drivers=(), vehicles=()):
+    """Recompute the statuses of the drivers and vehicles of `trip_ids`, plus any given explicitly."""
+    owners = {"driver": set(drivers), "vehicle": set(vehicles)}
+    for driver_id, vehicle_id in Trip.all_objects.filter(id__in=trip_ids).values_list("driver_id", "vehicle_id"):
+        owners["driver"].add(driver_id)
+        owners["vehicle"].add(vehicle_id)
+
+    for model, owner_field in LIVE_STATUS_MODELS:
+        for owner_id in owners[owner_field] - {None}:
+            refresh_owner_status(model, owner_field, owner_id)
+
+
+def advance_live_status(entry):
+    """Apply a newly created entry, recomputing only when it is not the latest one of its driver/vehicle."""
+    trip = entry.trip
+    if entry.deleted or trip.deleted:
+        return
+
+    values = {
+        "trip_id": trip.id,
+        "company_id": trip.company_id,
+        "category": entry.category,
+        "since": entry.date_created,
+        "location": entry.location,
+        "latitude": entry.latitude,
+        "longitude": entry.longitude,
+        "geohash": entry.geohash,
+    }
+    if entry.odm_reading is not None:
+        values["odm_reading"] = entry.odm_reading
+
+    for model, owner_field in LIVE_STATUS_MODELS:
+        owner_id = getattr(trip, f"{owner_field}_id")
+        # `update()` skips auto_now, so set date_updated explicitly.
+        updated = model.objects.filter(**{f"{owner_field}_id": owner_id}, since__lte=entry.date_created).update(
+            **values, date_updated=timezone.now()
+        )
+        if not updated:
+            refresh_owner_status(model, owner_field, owner_id)
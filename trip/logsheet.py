@@ -0,0 +1,205 @@
+"""
+Daily log sheets: the 24-hour duty-status grid for one trip day, rendered as SVG.
+
+Rendered sheets are cached under a hash of everything drawn on them (the day's
+entries, the status carried in from the previous day and the header details),
+so re-printing or bulk-exporting unchanged days never re-renders them.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import TripLogEntry
+from .timeline import end_of_day, live_log_values, start_of_day
+
+GRID_ROWS = [
+    (TripLogEntry.OFF_DUTY, "1. Off Duty"),
+    (TripLogEntry.SLEEPER_BERTH, "2. Sleeper Berth"),
+    (TripLogEntry.DRIVING, "3. Driving"),
+    (TripLogEntry.ON_DUTY, "4. On Duty (Not Driving)"),
+]
+
+LABEL_WIDTH = 170
+HOUR_WIDTH = 36
+ROW_HEIGHT = 32
+TOTAL_WIDTH = 70
+HEADER_HEIGHT = 130
+GRID_WIDTH = HOUR_WIDTH * 24
+SHEET_WIDTH = LABEL_WIDTH + GRID_WIDTH + TOTAL_WIDTH + 20
+
+
+def describe_location(location):
+    if not isinstance(location, dict):
+        return str(location or "")
+    for key in ("name", "address", "city"):
+        if location.get(key):
+            return str(location[key])
+    lat = location.get("lat", location.get("latitude"))
+    lng = location.get("lng", location.get("lon", location.get("longitude")))
+    return f"{lat}, {lng}" if lat is not None and lng is not None else ""
+
+
+def sheet_header(trip):
+    driver = trip.driver
+    return {
+        "driver": driver.user.get_full_name(),
+        "license_number": driver.license_number,
+        "home_terminal": driver.home_terminal,
+        "company": trip.company.name,
+        "main_office_address": trip.company.main_office_address,
+        "truck_number": trip.vehicle.truck_number,
+        "trailer_number": trip.vehicle.trailer_number or "",
+        "license_plate": trip.vehicle.license_plate,
+        "manifest_no": trip.manifest_no,
+        "shipper": trip.shipper,
+        "commodity": trip.commodity,
+    }
+
+
+def day_sheet_data(trip, day, header=None):
+    """Everything drawn on a day's sheet; None when the trip has no status on that day."""
+    logs = live_log_values(trip.id)
+    day_start, next_day_start = start_of_day(day), start_of_day(day + timedelta(days=1))
+
+    entries = list(logs.filter(date_created__gte=day_start, date_created__lt=next_day_start))
+    carry_in = logs.filter(date_created__lt=day_start).reverse().first()
+    if not entries and not carry_in:
+        return None
+
+    # The last status of the day lasts until midnight, or until now (to the minute) for today.
+    now = timezone.now().replace(second=0, microsecond=0)
+    end = min(end_of_day(day), now) if day_start <= now else end_of_day(day)
+
+    return {
+        "date": day,
+        "header": header or sheet_header(trip),
+        "carry_in": carry_in["category"] if carry_in else TripLogEntry.OFF_DUTY,
+        "entries": [
+            {key: entry[key] for key in ("id", "category", "date_created", "location", "odm_reading", "remarks")}
+            for entry in entries
+        ],
+        "end": end,
+    }
+
+
+def sheet_intervals(data):
+    """(category, start, end) periods covering the day, in order."""
+    points = [(data["carry_in"], start_of_day(data["date"]))]
+    points += [(entry["category"], entry["date_created"]) for entry in data["entries"]]
+
+    intervals = []
+    for index, (category, start) in enumerate(points):
+        end = points[index + 1][1] if index + 1 < len(points) else data["end"]
+        if end > start:
+            intervals.append((category, start, end))
+    return intervals
+
+
+def category_totals(intervals):
+    totals = {category: 0.0 for category, _ in GRID_ROWS}
+    for category, start, end in intervals:
+        totals[category] += (end - start).total_seconds() / 3600
+    return {category: round(hours, 2) for category, hours in totals.items()}
+
+
+def content_hash(data):
+    encoded = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _x(moment, day):
+    hours = (moment - start_of_day(day)).total_seconds() / 3600
+    return LABEL_WIDTH + min(max(hours, 0), 24) * HOUR_WIDTH
+
+
+def render_svg(data):
+    day = data["date"]
+    header = data["header"]
+    intervals = sheet_intervals(data)
+    totals = category_totals(intervals)
+    rows = {category: index for index, (category, _) in enumerate(GRID_ROWS)}
+
+    grid_top = HEADER_HEIGHT
+    remarks_top = grid_top + ROW_HEIGHT * len(GRID_ROWS) + 50
+    height = remarks_top + 20 * (len(data["entries"]) + 1) + 20
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{SHEET_WIDTH}" height="{height}" '
+        f'viewBox="0 0 {SHEET_WIDTH} {height}" font-family="Helvetica, Arial, sans-serif" font-size="12">',
+        f'<rect width="{SHEET_WIDTH}" height="{height}" fill="white"/>',
+        f'<text x="10" y="24" font-size="18" font-weight="bold">Driver\'s Daily Log — {day.isoformat()}</text>',
+    ]
+
+    header_lines = [
+        f"Driver: {header['driver']}   License: {header['license_number']}   Home terminal: {header['home_terminal']}",
+        f"Carrier: {header['company']}   Main office: {header['main_office_address']}",
+        f"Truck: {header['truck_number']}   Trailer: {header['trailer_number']}   Plate: {header['license_plate']}",
+        f"Manifest: {header['manifest_no']}   Shipper: {header['shipper']}   Commodity: {header['commodity']}",
+    ]
+    for index, line in enumerate(header_lines):
+        parts.append(f'<text x="10" y="{50 + index * 18}">{escape(line)}</text>')
+
+    # Hour labels and grid.
+    for hour in range(25):
+        x = LABEL_WIDTH + hour * HOUR_WIDTH
+        label = {0: "Mid", 12: "Noon", 24: "Mid"}.get(hour, str(hour % 12))
+        parts.append(f'<text x="{x}" y="{grid_top - 6}" text-anchor="middle" font-size="10">{label}</text>')
+        parts.append(
+            f'<line x1="{x}" y1="{grid_top}" x2="{x}" y2="{grid_top + ROW_HEIGHT * len(GRID_ROWS)}" '
+            f'stroke="#999" stroke-width="{1 if hour % 6 else 1.5}"/>'
+        )
+    for index, (category, label) in enumerate(GRID_ROWS):
+        y = grid_top + index * ROW_HEIGHT
+        parts.append(f'<rect x="{LABEL_WIDTH}" y="{y}" width="{GRID_WIDTH}" height="{ROW_HEIGHT}" fill="none" stroke="#333"/>')
+        parts.append(f'<text x="10" y="{y + ROW_HEIGHT / 2 + 4}">{escape(label)}</text>')
+        parts.append(
+            f'<text x="{LABEL_WIDTH + GRID_WIDTH + TOTAL_WIDTH - 10}" y="{y + ROW_HEIGHT / 2 + 4}" '
+            f'text-anchor="end">{totals[category]:.2f}</text>'
+        )
+    parts.append(
+        f'<text x="{LABEL_WIDTH + GRID_WIDTH + TOTAL_WIDTH - 10}" y="{grid_top + ROW_HEIGHT * len(GRID_ROWS) + 18}" '
+        f'text-anchor="end" font-weight="bold">{sum(totals.values()):.2f}</text>'
+    )
+
+    # Duty-status line: horizontal in each status row, vertical at every change.
+    path = []
+    for category, start, end in intervals:
+        y = grid_top + rows[category] * ROW_HEIGHT + ROW_HEIGHT / 2
+        x1, x2 = _x(start, day), _x(end, day)
+        path.append(f"{'L' if path else 'M'}{x1:.1f},{y:.1f} L{x2:.1f},{y:.1f}")
+    if path:
+        parts.append(f'<path d="{" ".join(path)}" fill="none" stroke="#0b3d91" stroke-width="3"/>')
+
+    parts.append(f'<text x="10" y="{remarks_top}" font-weight="bold">Remarks</text>')
+    for index, entry in enumerate(data["entries"]):
+        moment = timezone.localtime(entry["date_created"]).strftime("%H:%M")
+        details = [dict(TripLogEntry.CATEGORY_CHOICES)[entry["category"]], describe_location(entry["location"])]
+        if entry["odm_reading"] is not None:
+            details.append(f"odometer {entry['odm_reading']}")
+        if entry["remarks"]:
+            details.append(entry["remarks"])
+        line = f"{moment}  " + " — ".join(detail for detail in details if detail)
+        parts.append(f'<text x="10" y="{remarks_top + 20 * (index + 1)}">{escape(line)}</text>')
+
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def render_day_sheet(trip, day, header=None):
+    """The SVG sheet for a trip day, rendered only when its content changed. None if the day has no status."""
+    data = day_sheet_data(trip, day, header)
+    if data is None:
+        return None
+
+    key = f"log-sheet:svg:{content_hash(data)}"
+    svg = cache.get(key)
+    if svg is None:
+        svg = render_svg(data)
+        cache.set(key, svg, getattr(settings, "LOG_SHEET_CACHE_TIMEOUT", 60 * 60 * 24 * 30))
+    return svg
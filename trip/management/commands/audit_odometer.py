@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from trip.models import TripLogEntry
+from trip.odometer import inconsistent_readings, misdated_entries
+
+
+class Command(BaseCommand):
+    help = (
+        "Flag live log entries whose odometer reading is below the previous reading of their trip (or its start "
+        "mileage), and entries dated outside their trip (before it started, or after a completed trip ended). "
+        "Fails when any are found."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", type=int, action="append", dest="companies", help="Only audit these company ids.")
+        parser.add_argument("--trip", type=int, action="append", dest="trips", help="Only audit these trip ids.")
+
+    def handle(self, *args, **options):
+        entries = TripLogEntry.objects.all()
+        if options["companies"]:
+            entries = entries.filter(trip__company_id__in=options["companies"])
+        if options["trips"]:
+            entries = entries.filter(trip_id__in=options["trips"])
+
+        flagged = 0
+        for row in inconsistent_readings(entries).iterator():
+            flagged += 1
+            self.stdout.write(self.style.ERROR(
+                f"trip {row['trip_id']} entry {row['id']} at {row['date_created'].isoformat()}: "
+                f"odometer {row['odm_reading']} below {row['previous_reading']}"
+            ))
+        for row in misdated_entries(entries).iterator():
+            flagged += 1
+            if row["date_created"] < row["trip__start_date"]:
+                problem = f"dated before the trip started ({row['trip__start_date'].isoformat()})"
+            else:
+                problem = f"dated at or after the trip ended ({row['trip__end_date'].isoformat()})"
+            self.stdout.write(self.style.ERROR(
+                f"trip {row['trip_id']} entry {row['id']} at {row['date_created'].isoformat()}: {problem}"
+            ))
+
+        if flagged:
+            raise CommandError(f"{flagged} inconsistent log entries.")
+        self.stdout.write(self.style.SUCCESS("All odometer readings and timestamps are consistent."))
@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from trip.benchmarking import Rollback, read_endpoints, time_requests, token_client
+from trip.models import Trip, TripLogEntry
+from trip.seed import seed_fleet
+
+BENCHMARKED = ["trip list", "trip detail", "trip logs", "trip time series"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed throwaway fleets of increasing size and measure throughput and p50/p99 latency of the "
+        "trip list, detail, logs, logs_time_series and log-entry create endpoints."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10,100,500", help="Comma-separated driver counts to benchmark.")
+        parser.add_argument("--trips", type=int, default=5, help="Trips per driver.")
+        parser.add_argument("--logs", type=int, default=30, help="Log entries per trip.")
+        parser.add_argument("--requests", type=int, default=50, help="Timed requests per endpoint.")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        self.stdout.write(f"{'drivers':>8}{'trips':>9}{'logs':>10}  {'endpoint':<18}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+
+        for size in sizes:
+            try:
+                with transaction.atomic():
+                    self.benchmark(size, options)
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def benchmark(self, drivers, options):
+        company = seed_fleet(
+            drivers=drivers, trips_per_driver=options["trips"], logs_per_trip=options["logs"], seed=options["seed"]
+        )[0]
+        admin = company.admins.first()
+        endpoints = read_endpoints(admin)
+        trip = Trip.objects.filter(company=company, status=Trip.ONGOING).first()
+        trips = Trip.objects.filter(company=company).count()
+        logs = TripLogEntry.objects.filter(trip__company=company).count()
+
+        with token_client(admin) as client:
+            results = {}
+            for name in BENCHMARKED:
+                client.get(endpoints[name])  # warm up
+                results[name] = time_requests(lambda: client.get(endpoints[name]), options["requests"])
+
+            moment = timezone.now()
+
+            def create():
+                nonlocal moment
+                moment += timedelta(minutes=1)
+                return client.post(
+                    "/api/v1/trip-logs/",
+                    {"trip": trip.id, "category": TripLogEntry.ON_DUTY, "location": {"lat": 0, "lng": 0},
+                     "date_created": moment.isoformat()},
+                    content_type="application/json",
+                )
+
+            results["log create"] = time_requests(create, options["requests"])
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{drivers:>8}{trips:>9}{logs:>10}  {name:<18}{result['rps']:>9.1f}"
+                f"{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+            )
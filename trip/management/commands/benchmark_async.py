@@ -0,0 +1,79 @@
+import subprocess
+import sys
+import time
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from trip.benchmarking import access_token, busiest_admin, read_endpoints, time_concurrent_requests
+
+User = get_user_model()
+
+BENCHMARKED = ["trip list", "trip detail", "trip logs", "trip time series", "trip-log list"]
+
+SERVERS = {
+    "sync (gunicorn)": "{python} -m gunicorn truck.wsgi:application --workers {workers} --bind 127.0.0.1:{port} --log-level warning",
+    "async (uvicorn)": "{python} -m uvicorn truck.asgi:application --workers {workers} --port {port} --log-level warning",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the WSGI (gunicorn) and ASGI (uvicorn) servers with the same number of workers and compare "
+        "requests/second and p50/p99 latency of the sync read endpoints against their /api/v1/async/ versions "
+        "under concurrent load. Uses the data already in the database (see seed_fleet)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", help="User to call the API as (defaults to the admin of the busiest company).")
+        parser.add_argument("--workers", type=int, default=2, help="Worker processes per server.")
+        parser.add_argument("--concurrency", type=int, default=32, help="Concurrent client connections.")
+        parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint.")
+        parser.add_argument("--port", type=int, default=8765)
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options["email"]).first() if options["email"] else busiest_admin()
+        if user is None:
+            raise CommandError("No user to call the API as; seed some data first (seed_fleet).")
+        endpoints = {name: url for name, url in read_endpoints(user).items() if name in BENCHMARKED}
+
+        self.stdout.write(f"{'endpoint':<18}{'server':<18}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+        with access_token(user) as token:
+            headers = {"Authorization": f"Bearer {token}", "Host": "localhost"}
+            for server, command in SERVERS.items():
+                for name, result in self.run_server(server, command, endpoints, headers, options):
+                    self.stdout.write(
+                        f"{name:<18}{server:<18}{result['rps']:>9.1f}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                    )
+
+    def run_server(self, server, command, endpoints, headers, options):
+        base = f"http://127.0.0.1:{options['port']}"
+        process = subprocess.Popen(
+            command.format(python=sys.executable, workers=options["workers"], port=options["port"]).split()
+        )
+        try:
+            self.wait_until_ready(base, process)
+            results = []
+            for name, url in endpoints.items():
+                if server.startswith("async"):
+                    url = url.replace("/api/v1/", "/api/v1/async/", 1)
+                # Warm every worker's token and membership caches first.
+                time_concurrent_requests(base + url, headers, options["workers"] * 4, options["workers"])
+                results.append((name, time_concurrent_requests(base + url, headers, options["requests"], options["concurrency"])))
+            return results
+        finally:
+            process.terminate()
+            process.wait()
+
+    def wait_until_ready(self, base, process, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"The server exited with status {process.returncode}.")
+            try:
+                requests.get(base, headers={"Host": "localhost"}, timeout=5)
+                return
+            except requests.RequestException:
+                time.sleep(0.2)
+        raise CommandError(f"The server did not start within {timeout} seconds.")
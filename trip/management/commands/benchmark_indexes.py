@@ -0,0 +1,99 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from company.models import DriverProfile, Vehicle
+from trip.benchmarking import Rollback
+from trip.models import Trip, TripLogEntry
+from trip.seed import seed_fleet
+
+INDEXED_MODELS = [Trip, TripLogEntry, DriverProfile, Vehicle]
+
+
+class Command(BaseCommand):
+    help = "Seed a throwaway dataset and compare hot trip/log query plans and timings with and without the indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--companies", type=int, default=2)
+        parser.add_argument("--drivers", type=int, default=50)
+        parser.add_argument("--trips", type=int, default=10, help="Trips per driver.")
+        parser.add_argument("--logs", type=int, default=60, help="Log entries per trip.")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query.")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.repeat = options["repeat"]
+
+        try:
+            with transaction.atomic():
+                self.stdout.write("Seeding dataset...")
+                companies = seed_fleet(
+                    companies=options["companies"],
+                    drivers=options["drivers"],
+                    trips_per_driver=options["trips"],
+                    logs_per_trip=options["logs"],
+                    seed=options["seed"],
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+
+                queries = self.hot_queries(companies[0])
+
+                savepoint = transaction.savepoint()
+                self.drop_indexes()
+                before = self.measure(queries, "without indexes")
+                transaction.savepoint_rollback(savepoint)
+
+                after = self.measure(queries, "with indexes")
+                self.report(before, after)
+
+                # Throw the seeded data away.
+                raise Rollback
+        except Rollback:
+            pass
+
+    def hot_queries(self, company):
+        trip = Trip.objects.filter(company=company, status=Trip.ONGOING).first()
+        return {
+            "trip logs by date": lambda: TripLogEntry.objects.filter(trip=trip, deleted=False).order_by("date_created"),
+            "latest odometer reading": lambda: TripLogEntry.objects.filter(
+                trip=trip, odm_reading__isnull=False
+            ).order_by("-date_created")[:1],
+            "driver ongoing trip": lambda: Trip.objects.filter(driver=trip.driver_id, status=Trip.ONGOING)[:1],
+            "vehicle ongoing trip": lambda: Trip.objects.filter(vehicle=trip.vehicle_id, status=Trip.ONGOING)[:1],
+            "company trip page": lambda: Trip.objects.filter(company=company).with_latest_log().order_by(
+                "-start_date", "-id"
+            )[:50],
+        }
+
+    def drop_indexes(self):
+        # Plain DROP INDEX is transactional on both PostgreSQL and SQLite.
+        with connection.cursor() as cursor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+
+    def measure(self, queries, label):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {label} =="))
+        results = {}
+        for name, build in queries.items():
+            self.stdout.write(self.style.MIGRATE_LABEL(name))
+            self.stdout.write(build().explain())
+            list(build())  # warm up
+
+            timings = []
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                list(build())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+        return results
+
+    def report(self, before, after):
+        self.stdout.write(self.style.MIGRATE_HEADING("\n== median ms =="))
+        self.stdout.write(f"{'query':<28}{'without':>10}{'with':>10}{'speedup':>10}")
+        for name in before:
+            speedup = before[name] / after[name] if after[name] else float("inf")
+            self.stdout.write(f"{name:<28}{before[name]:>10.3f}{after[name]:>10.3f}{speedup:>9.1f}x")
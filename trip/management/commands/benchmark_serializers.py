@@ -0,0 +1,92 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from company.listing import driver_representations, driver_values, vehicle_representations, vehicle_values
+from company.models import DriverProfile, Vehicle
+from company.serializers import DriverProfileSerializer, VehicleSerializer
+from trip.benchmarking import Rollback
+from trip.listing import log_entry_representations, log_entry_values, trip_representations, trip_values
+from trip.models import Trip, TripLogEntry
+from trip.seed import seed_fleet
+from trip.serializers import TripLogEntrySerializer, TripSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway fleet and compare the serializer and lean (`.values()`) list paths of trips, trip logs, "
+        "vehicles and drivers: median ms to query and render every row, and that both give the same body."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000, help="Drivers, vehicles, trips and log entries to seed.")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per path.")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.stdout.write("Seeding dataset...")
+                company = seed_fleet(
+                    companies=1, drivers=options["rows"], trips_per_driver=1, logs_per_trip=1, seed=options["seed"]
+                )[0]
+                self.report(self.measure(self.lists(company), options["repeat"]))
+                # Throw the seeded data away.
+                raise Rollback
+        except Rollback:
+            pass
+
+    def lists(self, company):
+        """{name: (queryset as the list view builds it, serializer path, lean path)}"""
+        return {
+            "trips": (
+                Trip.objects.filter(company=company).select_related("driver", "company", "vehicle").with_latest_log(),
+                lambda trips: TripSerializer(trips, many=True).data,
+                lambda trips: trip_representations(trip_values(trips)),
+            ),
+            "trip-logs": (
+                TripLogEntry.objects.filter(trip__company=company),
+                lambda entries: TripLogEntrySerializer(entries, many=True).data,
+                lambda entries: log_entry_representations(log_entry_values(entries)),
+            ),
+            "vehicles": (
+                Vehicle.objects.filter(company=company).prefetch_related("drivers", "company__admins"),
+                lambda vehicles: VehicleSerializer(vehicles, many=True).data,
+                lambda vehicles: vehicle_representations(vehicle_values(vehicles)),
+            ),
+            "drivers": (
+                DriverProfile.objects.filter(company=company).select_related("user").prefetch_related("company__admins"),
+                lambda drivers: DriverProfileSerializer(drivers, many=True).data,
+                lambda drivers: driver_representations(driver_values(drivers)),
+            ),
+        }
+
+    def measure(self, lists, repeat):
+        renderer = JSONRenderer()
+        results = {}
+        for name, (queryset, serialized, lean) in lists.items():
+            queryset = queryset.order_by("id")
+            bodies = [renderer.render(build(queryset.all())) for build in (serialized, lean)]
+            if bodies[0] != bodies[1]:
+                raise CommandError(f"The lean {name} list differs from the serialized one.")
+
+            timings = []
+            for build in (serialized, lean):
+                runs = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    renderer.render(build(queryset.all()))
+                    runs.append((time.perf_counter() - started) * 1000)
+                timings.append(statistics.median(runs))
+            results[name] = (queryset.count(), *timings)
+        return results
+
+    def report(self, results):
+        self.stdout.write(self.style.MIGRATE_HEADING("\n== median ms, query and render =="))
+        self.stdout.write(f"{'list':<12}{'rows':>8}{'serializer':>12}{'lean':>10}{'speedup':>10}")
+        for name, (rows, serialized, lean) in results.items():
+            speedup = serialized / lean if lean else float("inf")
+            self.stdout.write(f"{name:<12}{rows:>8}{serialized:>12.1f}{lean:>10.1f}{speedup:>9.1f}x")
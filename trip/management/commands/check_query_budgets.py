@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from trip.benchmarking import busiest_admin, read_endpoints, token_client
+from truck.metrics import metrics
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Call the main read endpoints as a company admin and report, per DRF action, query count, "
+        "DB time, view/render time and latency. Fails if an action goes over its QUERY_BUDGETS entry."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", help="User to call the API as (defaults to the admin of the busiest company).")
+        parser.add_argument("--requests", type=int, default=5, help="Timed requests per endpoint.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options["email"]).first() if options["email"] else busiest_admin()
+        if user is None:
+            raise CommandError("No user to call the API as; seed some data first (seed_fleet).")
+
+        endpoints = read_endpoints(user)
+        with token_client(user) as client:
+            # Warm the token and membership caches so only steady-state requests are measured.
+            for url in endpoints.values():
+                client.get(url)
+            metrics.reset()
+
+            for url in endpoints.values():
+                for _ in range(options["requests"]):
+                    response = client.get(url)
+                    if response.status_code >= 400:
+                        raise CommandError(f"GET {url} returned {response.status_code}.")
+
+        snapshot = metrics.snapshot()
+        self.stdout.write(
+            f"{'action':<36}{'queries':>8}{'budget':>8}{'db ms':>9}{'view ms':>9}{'render ms':>11}{'p50 ms':>9}{'p99 ms':>9}"
+        )
+        over = []
+        for endpoint, stats in snapshot.items():
+            budget = stats["query_budget"]
+            line = (
+                f"{endpoint:<36}{stats['max_queries']:>8}{budget if budget is not None else '-':>8}"
+                f"{stats['avg_db_ms']:>9.2f}{stats['avg_view_ms']:>9.2f}{stats['avg_render_ms']:>11.2f}"
+                f"{stats['p50_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+            )
+            if budget is not None and stats["max_queries"] > budget:
+                over.append(endpoint)
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+
+        if over:
+            raise CommandError(f"Over query budget: {', '.join(over)}")
+        self.stdout.write(self.style.SUCCESS("All actions within their query budgets."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from trip.models import DailyRollup, MonthlyRollup
+from trip.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily and monthly mileage/hours rollups from the log entries and odometer readings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--trip", type=int, action="append", dest="trips", help="Only rebuild these trip ids.")
+
+    def handle(self, *args, **options):
+        rebuild_rollups(options["trips"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rollups rebuilt: {DailyRollup.objects.count()} daily, {MonthlyRollup.objects.count()} monthly."
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from trip.models import Trip
+from trip.timeline import rebuild_trip_days
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed per-day duty segments used by logs_time_series."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--trip", type=int, action="append", dest="trips", help="Only rebuild these trip ids.")
+
+    def handle(self, *args, **options):
+        trips = Trip.all_objects.all()
+        if options["trips"]:
+            trips = trips.filter(id__in=options["trips"])
+
+        count = 0
+        for trip_id in trips.values_list("id", flat=True).iterator():
+            rebuild_trip_days(trip_id)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt timelines for {count} trips."))
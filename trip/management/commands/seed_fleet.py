@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from trip.seed import seed_fleet
+
+
+class Command(BaseCommand):
+    help = "Seed synthetic companies, drivers, vehicles, trips and realistic log-entry sequences."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--companies", type=int, default=1)
+        parser.add_argument("--drivers", type=int, default=10, help="Drivers (and vehicles) per company.")
+        parser.add_argument("--trips", type=int, default=5, help="Trips per driver.")
+        parser.add_argument("--logs", type=int, default=30, help="Log entries per trip.")
+        parser.add_argument("--seed", type=int, default=None, help="Random seed for repeatable data.")
+
+    def handle(self, *args, **options):
+        companies = seed_fleet(
+            companies=options["companies"],
+            drivers=options["drivers"],
+            trips_per_driver=options["trips"],
+            logs_per_trip=options["logs"],
+            seed=options["seed"],
+        )
+        trips = options["drivers"] * options["trips"]
+        for company in companies:
+            admin = company.admins.first()
+            self.stdout.write(
+                f"{company.name}: {options['drivers']} drivers, {trips} trips, "
+                f"{trips * options['logs']} log entries (admin {admin.email})"
+            )
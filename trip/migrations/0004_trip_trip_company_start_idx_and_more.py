@@ -0,0 +1,46 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0007_driverprofile_driver_company_deleted_idx_and_more'),
+        ('trip', '0003_alter_triplogentry_date_created'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['company', 'start_date'], name='trip_company_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['driver', 'status'], name='trip_driver_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['vehicle', 'status'], name='trip_vehicle_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(condition=models.Q(('status', 'ONGOING')), fields=['driver'], name='trip_ongoing_driver_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(condition=models.Q(('status', 'ONGOING')), fields=['vehicle'], name='trip_ongoing_vehicle_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='triplogentry',
+            index=models.Index(fields=['trip', 'deleted', 'date_created'], name='triplog_trip_deleted_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='triplogentry',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['trip', 'date_created'], name='triplog_live_trip_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='triplogentry',
+            index=models.Index(condition=models.Q(('odm_reading__isnull', False)), fields=['trip', '-date_created'], name='triplog_trip_odm_idx'),
+        ),
+    ]
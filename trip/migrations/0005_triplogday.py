@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:51
+
+import django.db.models.deletion
+import rest_framework.utils.encoders
+from django.db import migrations, models
+
+
+def build_log_days(apps, schema_editor):
+    from trip.timeline import LOG_FIELDS, build_trip_days
+
+    Trip = apps.get_model('trip', 'Trip')
+    TripLogEntry = apps.get_model('trip', 'TripLogEntry')
+    TripLogDay = apps.get_model('trip', 'TripLogDay')
+
+    for trip_id in Trip.objects.values_list('id', flat=True).iterator():
+        logs = TripLogEntry.objects.filter(trip_id=trip_id, deleted=False).order_by('date_created', 'id').values(*LOG_FIELDS)
+        TripLogDay.objects.bulk_create([
+            TripLogDay(trip_id=trip_id, date=day, segments=segments)
+            for day, segments in build_trip_days(logs).items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trip', '0004_trip_trip_company_start_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripLogDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('segments', models.JSONField(encoder=rest_framework.utils.encoders.JSONEncoder)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_days', to='trip.trip')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('trip', 'date'), name='unique_trip_log_day')],
+            },
+        ),
+        migrations.RunPython(build_log_days, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trip', '0005_triplogday'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triplogentry',
+            name='client_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='triplogentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_id__isnull', False)), fields=('trip', 'client_id'), name='unique_trip_log_client_id'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_live_statuses(apps, schema_editor):
+    TripLogEntry = apps.get_model('trip', 'TripLogEntry')
+
+    for model_name, owner_field in [('DriverLiveStatus', 'driver'), ('VehicleLiveStatus', 'vehicle')]:
+        model = apps.get_model('trip', model_name)
+        live = TripLogEntry.objects.filter(deleted=False, trip__deleted=False)
+        owner_ids = live.values_list(f'trip__{owner_field}_id', flat=True).distinct()
+
+        for owner_id in owner_ids.iterator():
+            entries = live.filter(**{f'trip__{owner_field}_id': owner_id}).order_by('-date_created', '-id')
+            latest = entries.values('trip_id', 'trip__company_id', 'category', 'date_created', 'location').first()
+            model.objects.create(
+                **{f'{owner_field}_id': owner_id},
+                trip_id=latest['trip_id'],
+                company_id=latest['trip__company_id'],
+                category=latest['category'],
+                since=latest['date_created'],
+                location=latest['location'],
+                odm_reading=entries.filter(odm_reading__isnull=False).values_list('odm_reading', flat=True).first(),
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0007_driverprofile_driver_company_deleted_idx_and_more'),
+        ('trip', '0006_triplogentry_client_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverLiveStatus',
+            fields=[
+                ('category', models.CharField(choices=[('OFF_DUTY', 'Off Duty'), ('SLEEPER_BERTH', 'Sleeper Berth'), ('DRIVING', 'Driving'), ('ON_DUTY', 'On Duty (Not Driving)')], max_length=30)),
+                ('since', models.DateTimeField()),
+                ('location', models.JSONField()),
+                ('odm_reading', models.PositiveIntegerField(blank=True, null=True)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+                ('driver', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='live_status', serialize=False, to='company.driverprofile')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='company.company')),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='trip.trip')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'category'], name='driver_live_company_cat_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VehicleLiveStatus',
+            fields=[
+                ('category', models.CharField(choices=[('OFF_DUTY', 'Off Duty'), ('SLEEPER_BERTH', 'Sleeper Berth'), ('DRIVING', 'Driving'), ('ON_DUTY', 'On Duty (Not Driving)')], max_length=30)),
+                ('since', models.DateTimeField()),
+                ('location', models.JSONField()),
+                ('odm_reading', models.PositiveIntegerField(blank=True, null=True)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='live_status', serialize=False, to='company.vehicle')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='company.company')),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='trip.trip')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'category'], name='vehicle_live_company_cat_idx')],
+            },
+        ),
+        migrations.RunPython(build_live_statuses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.timezone import localdate
+
+
+def build_rollups(apps, schema_editor):
+    from trip.rollups import OWNER_FIELDS, ROLLUP_FIELDS, TRIP_FIELDS, build_daily_rollups, month_start
+
+    Trip = apps.get_model('trip', 'Trip')
+    TripLogEntry = apps.get_model('trip', 'TripLogEntry')
+    TripLogDay = apps.get_model('trip', 'TripLogDay')
+    DailyRollup = apps.get_model('trip', 'DailyRollup')
+    MonthlyRollup = apps.get_model('trip', 'MonthlyRollup')
+
+    monthly = {}
+    for trip in Trip.objects.filter(deleted=False).values(*TRIP_FIELDS).iterator():
+        readings = list(
+            TripLogEntry.objects.filter(trip_id=trip['id'], deleted=False, odm_reading__isnull=False)
+            .order_by('date_created', 'id')
+            .values_list('date_created', 'odm_reading')
+        )
+        log_days = dict(TripLogDay.objects.filter(trip_id=trip['id']).values_list('date', 'segments'))
+        rollups = build_daily_rollups(trip, log_days, readings, set(log_days) | {localdate(trip['start_date'])})
+
+        owners = {field: trip[field] for field in OWNER_FIELDS}
+        DailyRollup.objects.bulk_create([
+            DailyRollup(trip_id=trip['id'], date=day, **owners, **totals) for day, totals in rollups.items()
+        ])
+        for day, totals in rollups.items():
+            sums = monthly.setdefault((*owners.values(), month_start(day)), dict.fromkeys(ROLLUP_FIELDS, 0))
+            for field in ROLLUP_FIELDS:
+                sums[field] += totals[field]
+
+    MonthlyRollup.objects.bulk_create([
+        MonthlyRollup(company_id=company_id, driver_id=driver_id, vehicle_id=vehicle_id, month=month, **sums)
+        for (company_id, driver_id, vehicle_id, month), sums in monthly.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0007_driverprofile_driver_company_deleted_idx_and_more'),
+        ('trip', '0007_driverlivestatus_vehiclelivestatus'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('miles', models.PositiveIntegerField(default=0)),
+                ('off_duty_hours', models.FloatField(default=0)),
+                ('sleeper_berth_hours', models.FloatField(default=0)),
+                ('driving_hours', models.FloatField(default=0)),
+                ('on_duty_hours', models.FloatField(default=0)),
+                ('trips_started', models.PositiveIntegerField(default=0)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField()),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='company.company')),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='company.driverprofile')),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='trip.trip')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='company.vehicle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'date'], name='daily_rollup_company_idx'), models.Index(fields=['driver', 'date'], name='daily_rollup_driver_idx'), models.Index(fields=['vehicle', 'date'], name='daily_rollup_vehicle_idx')],
+                'constraints': [models.UniqueConstraint(fields=('trip', 'date'), name='unique_trip_daily_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('miles', models.PositiveIntegerField(default=0)),
+                ('off_duty_hours', models.FloatField(default=0)),
+                ('sleeper_berth_hours', models.FloatField(default=0)),
+                ('driving_hours', models.FloatField(default=0)),
+                ('on_duty_hours', models.FloatField(default=0)),
+                ('trips_started', models.PositiveIntegerField(default=0)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+                ('month', models.DateField()),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='company.company')),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='company.driverprofile')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='company.vehicle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['driver', 'month'], name='monthly_rollup_driver_idx'), models.Index(fields=['vehicle', 'month'], name='monthly_rollup_vehicle_idx')],
+                'constraints': [models.UniqueConstraint(fields=('company', 'month', 'driver', 'vehicle'), name='unique_monthly_rollup')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,142 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:14
+
+from django.db import migrations, models
+
+
+def fill_coordinates(apps, schema_editor):
+    from trip.geo import location_columns
+
+    Trip = apps.get_model('trip', 'Trip')
+    TripLogEntry = apps.get_model('trip', 'TripLogEntry')
+    DriverLiveStatus = apps.get_model('trip', 'DriverLiveStatus')
+    VehicleLiveStatus = apps.get_model('trip', 'VehicleLiveStatus')
+
+    trips = []
+    for trip in Trip.objects.only('starting_location', 'ending_location').iterator():
+        trip.start_latitude, trip.start_longitude, trip.start_geohash = location_columns(trip.starting_location)
+        trip.end_latitude, trip.end_longitude, trip.end_geohash = location_columns(trip.ending_location)
+        trips.append(trip)
+    Trip.objects.bulk_update(trips, [
+        'start_latitude', 'start_longitude', 'start_geohash', 'end_latitude', 'end_longitude', 'end_geohash',
+    ], batch_size=1000)
+
+    entries = []
+    for entry in TripLogEntry.objects.only('location').iterator():
+        entry.latitude, entry.longitude, entry.geohash = location_columns(entry.location)
+        entries.append(entry)
+    TripLogEntry.objects.bulk_update(entries, ['latitude', 'longitude', 'geohash'], batch_size=1000)
+
+    for model in (DriverLiveStatus, VehicleLiveStatus):
+        statuses = []
+        for status in model.objects.only('location').iterator():
+            status.latitude, status.longitude, status.geohash = location_columns(status.location)
+            statuses.append(status)
+        model.objects.bulk_update(statuses, ['latitude', 'longitude', 'geohash'], batch_size=1000)
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0007_driverprofile_driver_company_deleted_idx_and_more'),
+        ('trip', '0008_dailyrollup_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverlivestatus',
+            name='geohash',
+            field=models.CharField(blank=True, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='driverlivestatus',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='driverlivestatus',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='end_geohash',
+            field=models.CharField(blank=True, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='end_latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='end_longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='start_geohash',
+            field=models.CharField(blank=True, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='start_latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='start_longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='triplogentry',
+            name='geohash',
+            field=models.CharField(blank=True, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='triplogentry',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='triplogentry',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehiclelivestatus',
+            name='geohash',
+            field=models.CharField(blank=True, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehiclelivestatus',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehiclelivestatus',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='driverlivestatus',
+            index=models.Index(fields=['company', 'geohash'], name='driver_live_company_geo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['start_geohash'], name='trip_start_geohash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['end_geohash'], name='trip_end_geohash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='triplogentry',
+            index=models.Index(fields=['geohash'], name='triplog_geohash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiclelivestatus',
+            index=models.Index(fields=['company', 'geohash'], name='vehicle_live_company_geo_idx'),
+        ),
+        migrations.RunPython(fill_coordinates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0008_live_rows'),
+        ('trip', '0009_coordinates'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='trip',
+            name='trip_company_start_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trip',
+            name='trip_driver_status_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trip',
+            name='trip_vehicle_status_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trip',
+            name='trip_ongoing_driver_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trip',
+            name='trip_ongoing_vehicle_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trip',
+            name='trip_start_geohash_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trip',
+            name='trip_end_geohash_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='triplogentry',
+            name='triplog_trip_deleted_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='triplogentry',
+            name='triplog_trip_odm_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='triplogentry',
+            name='triplog_geohash_idx',
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['company', 'start_date'], name='trip_live_company_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['driver', 'status'], name='trip_live_driver_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['vehicle', 'status'], name='trip_live_vehicle_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(condition=models.Q(('deleted', False), ('status', 'ONGOING')), fields=['driver'], name='trip_ongoing_driver_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(condition=models.Q(('deleted', False), ('status', 'ONGOING')), fields=['vehicle'], name='trip_ongoing_vehicle_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['start_geohash'], name='trip_start_geohash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['end_geohash'], name='trip_end_geohash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='triplogentry',
+            index=models.Index(condition=models.Q(('deleted', False), ('odm_reading__isnull', False)), fields=['trip', '-date_created'], name='triplog_trip_odm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='triplogentry',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['geohash'], name='triplog_geohash_idx'),
+        ),
+    ]
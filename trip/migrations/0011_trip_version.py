@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trip', '0010_live_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
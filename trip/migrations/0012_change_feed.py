@@ -0,0 +1,59 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def record_existing_rows(apps, schema_editor):
+    """Give every existing row a change, so a first sync (`since=0`) returns it."""
+    Change = apps.get_model('trip', 'Change')
+    ChangeCounter = apps.get_model('trip', 'ChangeCounter')
+    sources = [
+        ('driver', apps.get_model('company', 'DriverProfile'), 'company_id'),
+        ('vehicle', apps.get_model('company', 'Vehicle'), 'company_id'),
+        ('trip', apps.get_model('trip', 'Trip'), 'company_id'),
+        ('log_entry', apps.get_model('trip', 'TripLogEntry'), 'trip__company_id'),
+    ]
+
+    last_sequences = {}
+    changes = []
+    for kind, model, company_lookup in sources:
+        for object_id, company_id in model._base_manager.order_by('id').values_list('id', company_lookup).iterator():
+            last_sequences[company_id] = last_sequences.get(company_id, 0) + 1
+            changes.append(Change(company_id=company_id, sequence=last_sequences[company_id], kind=kind, object_id=object_id))
+    Change.objects.bulk_create(changes, batch_size=1000)
+    ChangeCounter.objects.bulk_create([
+        ChangeCounter(company_id=company_id, last_sequence=last) for company_id, last in last_sequences.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0008_live_rows'),
+        ('trip', '0011_trip_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='company.company')),
+                ('last_sequence', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveBigIntegerField()),
+                ('kind', models.CharField(choices=[('trip', 'Trip'), ('log_entry', 'Log entry'), ('vehicle', 'Vehicle'), ('driver', 'Driver')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='company.company')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('company', 'sequence'), name='unique_company_change_sequence'), models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_change_object')],
+            },
+        ),
+        migrations.RunPython(record_existing_rows, migrations.RunPython.noop),
+    ]
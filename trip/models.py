@@ -1,10 +1,30 @@
 from django.db import models
+from django.db.models import OuterRef, Subquery
+from rest_framework.utils.encoders import JSONEncoder
 
-from django.db import models
+from company.models import AtomicSaveMixin, Company, DriverProfile, LiveManager, Vehicle
+from .geo import location_columns
+
+
+class TripQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Trips the user drives or that belong to a company they administer."""
+        # A subquery on the admin's companies avoids the join and the `distinct()` it needed.
+        return self.filter(models.Q(driver__user=user) | models.Q(company__in=user.admin_companies.values("id")))
+
+    def with_latest_log(self):
+        """Annotate each trip with its latest odometer reading and latest log category/timestamp."""
+        logs = TripLogEntry.objects.filter(trip=OuterRef("pk"), deleted=False).order_by("-date_created", "-id")
+        readings = logs.filter(odm_reading__isnull=False)
 
-from company.models import Company, Vehicle, DriverProfile
+        return self.annotate(
+            last_odm_reading=Subquery(readings.values("odm_reading")[:1]),
+            last_log_category=Subquery(logs.values("category")[:1]),
+            last_log_date=Subquery(logs.values("date_created")[:1]),
+        )
 
-class Trip(models.Model):
+
+class Trip(AtomicSaveMixin, models.Model):
     ONGOING = "ONGOING"
     COMPLETED = "COMPLETED"
     CANCELED = "CANCELED"
@@ -24,6 +44,13 @@ class Trip(models.Model):
 
     starting_location = models.JSONField()
     ending_location = models.JSONField()
+    # Copied from the JSON locations by `update_coordinates()` for spatial lookups (see `trip.geo`).
+    start_latitude = models.FloatField(null=True, blank=True)
+    start_longitude = models.FloatField(null=True, blank=True)
+    start_geohash = models.CharField(max_length=12, null=True, blank=True)
+    end_latitude = models.FloatField(null=True, blank=True)
+    end_longitude = models.FloatField(null=True, blank=True)
+    end_geohash = models.CharField(max_length=12, null=True, blank=True)
 
     start_mileage = models.PositiveIntegerField()
     end_mileage = models.PositiveIntegerField(null=True, blank=True)
@@ -33,12 +60,42 @@ class Trip(models.Model):
     shipper = models.CharField(max_length=255)
     commodity = models.CharField(max_length=255)
     deleted = models.BooleanField(default=False)
+    # Bumped on every write to the trip, its log entries and what it embeds; see `trip.versioning`.
+    version = models.PositiveIntegerField(default=1)
+
+    objects = LiveManager.from_queryset(TripQuerySet)()
+    all_objects = TripQuerySet.as_manager()
+
+    class Meta:
+        # Indexes cover live trips only, so they stay small as the deleted history grows.
+        indexes = [
+            models.Index(fields=["company", "start_date"], condition=models.Q(deleted=False), name="trip_live_company_start_idx"),
+            models.Index(fields=["driver", "status"], condition=models.Q(deleted=False), name="trip_live_driver_status_idx"),
+            models.Index(fields=["vehicle", "status"], condition=models.Q(deleted=False), name="trip_live_vehicle_status_idx"),
+            # Ongoing trips are a small, hot slice of the table.
+            models.Index(fields=["driver"], condition=models.Q(status="ONGOING", deleted=False), name="trip_ongoing_driver_idx"),
+            models.Index(fields=["vehicle"], condition=models.Q(status="ONGOING", deleted=False), name="trip_ongoing_vehicle_idx"),
+            models.Index(fields=["start_geohash"], condition=models.Q(deleted=False), name="trip_start_geohash_idx"),
+            models.Index(fields=["end_geohash"], condition=models.Q(deleted=False), name="trip_end_geohash_idx"),
+        ]
 
     def __str__(self):
         return f"Trip {self.manifest_no} - {self.status}"
 
+    def update_coordinates(self):
+        self.start_latitude, self.start_longitude, self.start_geohash = location_columns(self.starting_location)
+        self.end_latitude, self.end_longitude, self.end_geohash = location_columns(self.ending_location)
+
 
-class TripLogEntry(models.Model):
+class TripLogEntryQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Log entries of the trips the user drives or that belong to a company they administer."""
+        return self.filter(
+            models.Q(trip__driver__user=user) | models.Q(trip__company__in=user.admin_companies.values("id"))
+        )
+
+
+class TripLogEntry(AtomicSaveMixin, models.Model):
     OFF_DUTY = "OFF_DUTY"
     SLEEPER_BERTH = "SLEEPER_BERTH"
     DRIVING = "DRIVING"
@@ -58,6 +115,190 @@ class TripLogEntry(models.Model):
     odm_reading = models.PositiveIntegerField(null=True, blank=True)
     date_created = models.DateTimeField()
     deleted = models.BooleanField(default=False)
+    # Supplied by devices so that replayed uploads are not stored twice.
+    client_id = models.CharField(max_length=64, null=True, blank=True)
+    # Copied from `location` by `update_coordinates()` for spatial lookups (see `trip.geo`).
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, null=True, blank=True)
+
+    objects = LiveManager.from_queryset(TripLogEntryQuerySet)()
+    all_objects = TripLogEntryQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["trip", "client_id"], condition=models.Q(client_id__isnull=False), name="unique_trip_log_client_id"
+            ),
+        ]
+        # Indexes cover live entries only, so they stay small as the deleted history grows.
+        indexes = [
+            models.Index(fields=["trip", "date_created"], condition=models.Q(deleted=False), name="triplog_live_trip_date_idx"),
+            models.Index(
+                fields=["trip", "-date_created"],
+                condition=models.Q(odm_reading__isnull=False, deleted=False),
+                name="triplog_trip_odm_idx",
+            ),
+            models.Index(fields=["geohash"], condition=models.Q(deleted=False), name="triplog_geohash_idx"),
+        ]
 
     def __str__(self):
         return f"Log Entry for {self.trip.manifest_no} - {self.category}"
+
+    def update_coordinates(self):
+        self.latitude, self.longitude, self.geohash = location_columns(self.location)
+
+
+class TripLogDay(models.Model):
+    """Precomputed duty-status segments of one trip for one calendar day, kept in sync by `trip.signals`."""
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="log_days")
+    date = models.DateField()
+    segments = models.JSONField(encoder=JSONEncoder)
+    date_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["trip", "date"], name="unique_trip_log_day"),
+        ]
+
+    def __str__(self):
+        return f"Log Day {self.date} for trip {self.trip_id}"
+
+
+class LiveStatus(models.Model):
+    """Latest duty status of a driver or vehicle, kept in sync with its log entries by `trip.signals`."""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="+")
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="+")
+    category = models.CharField(max_length=30, choices=TripLogEntry.CATEGORY_CHOICES)
+    since = models.DateTimeField()
+    location = models.JSONField()
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, null=True, blank=True)
+    odm_reading = models.PositiveIntegerField(null=True, blank=True)
+    date_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class DriverLiveStatus(LiveStatus):
+    driver = models.OneToOneField(DriverProfile, on_delete=models.CASCADE, primary_key=True, related_name="live_status")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["company", "category"], name="driver_live_company_cat_idx"),
+            models.Index(fields=["company", "geohash"], name="driver_live_company_geo_idx"),
+        ]
+
+    def __str__(self):
+        return f"Driver {self.driver_id} - {self.category}"
+
+
+class VehicleLiveStatus(LiveStatus):
+    vehicle = models.OneToOneField(Vehicle, on_delete=models.CASCADE, primary_key=True, related_name="live_status")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["company", "category"], name="vehicle_live_company_cat_idx"),
+            models.Index(fields=["company", "geohash"], name="vehicle_live_company_geo_idx"),
+        ]
+
+    def __str__(self):
+        return f"Vehicle {self.vehicle_id} - {self.category}"
+
+
+class Rollup(models.Model):
+    """Miles, hours per duty category and trips started, kept in sync by `trip.signals`."""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="+")
+    driver = models.ForeignKey(DriverProfile, on_delete=models.CASCADE, related_name="+")
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name="+")
+    miles = models.PositiveIntegerField(default=0)
+    off_duty_hours = models.FloatField(default=0)
+    sleeper_berth_hours = models.FloatField(default=0)
+    driving_hours = models.FloatField(default=0)
+    on_duty_hours = models.FloatField(default=0)
+    trips_started = models.PositiveIntegerField(default=0)
+    date_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class DailyRollup(Rollup):
+    """One trip's totals for one calendar day."""
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="daily_rollups")
+    date = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["trip", "date"], name="unique_trip_daily_rollup"),
+        ]
+        indexes = [
+            models.Index(fields=["company", "date"], name="daily_rollup_company_idx"),
+            models.Index(fields=["driver", "date"], name="daily_rollup_driver_idx"),
+            models.Index(fields=["vehicle", "date"], name="daily_rollup_vehicle_idx"),
+        ]
+
+    def __str__(self):
+        return f"Rollup {self.date} for trip {self.trip_id}"
+
+
+class MonthlyRollup(Rollup):
+    """Totals of one driver with one vehicle for one calendar month (`month` is its first day)."""
+    month = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["company", "month", "driver", "vehicle"], name="unique_monthly_rollup"),
+        ]
+        indexes = [
+            models.Index(fields=["driver", "month"], name="monthly_rollup_driver_idx"),
+            models.Index(fields=["vehicle", "month"], name="monthly_rollup_vehicle_idx"),
+        ]
+
+    def __str__(self):
+        return f"Rollup {self.month:%Y-%m} for driver {self.driver_id}, vehicle {self.vehicle_id}"
+
+
+class ChangeCounter(models.Model):
+    """Last change sequence handed out in a company; see `trip.sync`."""
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name="+")
+    last_sequence = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Change counter of company {self.company_id} at {self.last_sequence}"
+
+
+class Change(models.Model):
+    """
+    Latest change of one trip, log entry, vehicle or driver profile, for delta sync (see `trip.sync`).
+
+    There is one row per object: a new change moves it to the company's next
+    sequence, so the feed grows with the number of objects, not of writes.
+    """
+    TRIP = "trip"
+    LOG_ENTRY = "log_entry"
+    VEHICLE = "vehicle"
+    DRIVER = "driver"
+
+    KIND_CHOICES = [
+        (TRIP, "Trip"),
+        (LOG_ENTRY, "Log entry"),
+        (VEHICLE, "Vehicle"),
+        (DRIVER, "Driver"),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="+")
+    sequence = models.PositiveBigIntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["company", "sequence"], name="unique_company_change_sequence"),
+            models.UniqueConstraint(fields=["kind", "object_id"], name="unique_change_object"),
+        ]
+
+    def __str__(self):
+        return f"Change {self.sequence} of {self.kind} {self.object_id}"
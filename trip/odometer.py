@@ -0,0 +1,147 @@
+"""
+Odometer and timestamp consistency of log entries.
+
+Within a trip, odometer readings must not go down in `date_created` order and
+must not be below the trip's start mileage. Entries must not be dated before
+the trip started, nor at or after the end of a completed trip.
+
+A single write is checked against its two neighbouring readings only: the
+latest one before it and the earliest one after it. Each is one row read off
+the `(trip, -date_created) WHERE odm_reading IS NOT NULL` index, so the cost
+does not grow with the trip's log. Bulk uploads read each trip's readings
+around the batch once and check the batch in memory.
+"""
+from bisect import bisect_right
+
+from django.db.models import F, Q, Window
+from django.db.models.functions import Lag
+
+from .models import Trip, TripLogEntry
+
+
+def _readings(trip_id, exclude_id=None):
+    readings = TripLogEntry.objects.filter(trip_id=trip_id, deleted=False, odm_reading__isnull=False)
+    return readings.exclude(pk=exclude_id) if exclude_id else readings
+
+
+def neighbour_readings(trip_id, moment, exclude_id=None):
+    """(previous, next) odometer readings around `moment`; an existing reading at the same moment counts as previous."""
+    readings = _readings(trip_id, exclude_id)
+    previous = (
+        readings.filter(date_created__lte=moment).order_by("-date_created", "-id").values_list("odm_reading", flat=True).first()
+    )
+    following = (
+        readings.filter(date_created__gt=moment).order_by("date_created", "id").values_list("odm_reading", flat=True).first()
+    )
+    return previous, following
+
+
+def _reading_error(trip, reading, previous, following):
+    if reading < trip.start_mileage:
+        return f"Odometer reading {reading} is below the trip's start mileage ({trip.start_mileage})."
+    if previous is not None and reading < previous:
+        return f"Odometer reading {reading} is below the previous reading ({previous})."
+    if following is not None and reading > following:
+        return f"Odometer reading {reading} is above the next reading ({following})."
+    return None
+
+
+def _timestamp_error(trip, moment):
+    if moment < trip.start_date:
+        return "Log entries cannot be dated before the trip started."
+    # An ongoing trip's end date is only planned.
+    if trip.status == Trip.COMPLETED and moment >= trip.end_date:
+        return "Log entries of a completed trip must be dated before it ended."
+    return None
+
+
+def check_entry(trip, moment, reading, exclude_id=None):
+    """Errors (`{field: message}`) of one entry written to `trip`, checked against its neighbours."""
+    errors = {}
+    if moment is not None and (error := _timestamp_error(trip, moment)):
+        errors["date_created"] = error
+    if moment is not None and reading is not None:
+        if error := _reading_error(trip, reading, *neighbour_readings(trip.id, moment, exclude_id)):
+            errors["odm_reading"] = error
+    return errors
+
+
+def check_batch(trip, entries):
+    """
+    Errors of new entries for one trip, as `{key: {field: message}}`, from `(key, moment, reading)` triples.
+
+    Entries are checked in time order against the stored readings and the batch
+    entries accepted before them, so a batch cannot contradict itself either.
+    """
+    entries = sorted(entries, key=lambda entry: entry[1])
+    errors = {}
+
+    located = [(moment, reading) for _, moment, reading in entries if reading is not None]
+    timeline = []
+    if located:
+        first, last = located[0][0], located[-1][0]
+        readings = _readings(trip.id)
+        before = readings.filter(date_created__lt=first).order_by("-date_created", "-id")
+        after = readings.filter(date_created__gt=last).order_by("date_created", "id")
+        window = readings.filter(date_created__gte=first, date_created__lte=last).order_by("date_created", "id")
+        timeline = [
+            *before.values_list("date_created", "odm_reading")[:1],
+            *window.values_list("date_created", "odm_reading"),
+            *after.values_list("date_created", "odm_reading")[:1],
+        ]
+        timeline.sort(key=lambda point: point[0])
+
+    moments = [moment for moment, _ in timeline]
+    for key, moment, reading in entries:
+        entry_errors = {}
+        if error := _timestamp_error(trip, moment):
+            entry_errors["date_created"] = error
+        if reading is not None:
+            position = bisect_right(moments, moment)
+            previous = timeline[position - 1][1] if position else None
+            following = timeline[position][1] if position < len(timeline) else None
+            if error := _reading_error(trip, reading, previous, following):
+                entry_errors["odm_reading"] = error
+
+        if entry_errors:
+            errors[key] = entry_errors
+        elif reading is not None:
+            position = bisect_right(moments, moment)
+            moments.insert(position, moment)
+            timeline.insert(position, (moment, reading))
+    return errors
+
+
+def inconsistent_readings(queryset=None):
+    """
+    Live readings that go below the previous reading of their trip, in one query.
+
+    The previous reading comes from a `LAG` window over each trip's readings in
+    time order; the first reading of a trip is compared with its start mileage.
+    """
+    readings = (queryset if queryset is not None else TripLogEntry.objects.all()).filter(
+        deleted=False, odm_reading__isnull=False, trip__deleted=False
+    )
+    return (
+        readings.annotate(previous_reading=Window(
+            Lag("odm_reading", default=F("trip__start_mileage")),
+            partition_by=[F("trip_id")],
+            order_by=[F("date_created").asc(), F("id").asc()],
+        ))
+        .filter(odm_reading__lt=F("previous_reading"))
+        .order_by("trip_id", "date_created", "id")
+        .values("id", "trip_id", "date_created", "odm_reading", "previous_reading")
+    )
+
+
+def misdated_entries(queryset=None):
+    """Live entries dated before their trip started, or at or after the end of their completed trip."""
+    entries = (queryset if queryset is not None else TripLogEntry.objects.all()).filter(
+        Q(date_created__lt=F("trip__start_date"))
+        | Q(trip__status=Trip.COMPLETED, date_created__gte=F("trip__end_date")),
+        deleted=False,
+        trip__deleted=False,
+    )
+    return entries.order_by("trip_id", "date_created", "id").values(
+        "id", "trip_id", "date_created", "trip__start_date", "trip__end_date"
+    )
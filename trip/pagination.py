@@ -0,0 +1,36 @@
+from asgiref.sync import sync_to_async
+from rest_framework.pagination import CursorPagination
+
+
+class AsyncCursorPagination(CursorPagination):
+    """
+    `CursorPagination` that async views can await.
+
+    It is not async all the way down: DRF's sync pagination, page fetch
+    included, runs in a thread through `sync_to_async`. That is the thread
+    Django's async ORM would use for the query anyway, so the event loop is
+    never blocked. But a request still holds a thread while its page loads.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return await sync_to_async(self.paginate_queryset)(queryset, request, view)
+
+    def get_paginated_data(self, data):
+        """The body of `get_paginated_response`, for views that render their own responses."""
+        return self.get_paginated_response(data).data
+
+
+class TripCursorPagination(AsyncCursorPagination):
+    """Keyset pagination over trips, newest first."""
+    ordering = ("-start_date", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class TripLogEntryCursorPagination(AsyncCursorPagination):
+    """Keyset pagination over log entries in chronological order."""
+    ordering = ("date_created", "id")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
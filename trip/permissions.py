@@ -1,18 +1,11 @@
 from rest_framework import permissions
 
+from company.membership import get_membership
+
 class IsCompanyAdminOrTripDriver(permissions.BasePermission):
     """Custom permission: Allow access to trip driver or company admin."""
 
     def has_object_permission(self, request, view, obj):
-        user = request.user
-        is_company_admin = False
-        is_trip_driver = False
-        if getattr(obj, "company", None):
-            is_company_admin = obj.company.admins.filter(id=user.id).exists()
-        if getattr(obj, "driver", None):
-            is_trip_driver = obj.driver.user == user
-        if getattr(obj, "trip", None):
-            is_company_admin = obj.trip.company.admins.filter(id=user.id).exists()
-            is_trip_driver = obj.trip.driver.user == user
-
-        return is_company_admin or is_trip_driver
\ No newline at end of file
+        # Log entries are checked against their trip.
+        trip = getattr(obj, "trip", None) or obj
+        return get_membership(request).can_access_trip(trip)
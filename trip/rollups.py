@@ -0,0 +1,301 @@
+"""
+Daily and monthly mileage/hours rollups.
+
+A daily rollup holds one trip's totals for one day:
+- Hours per duty category: each entry's status lasts until the next entry
+  and is split at midnight, so a day between two logged days counts in full.
+  The trip's last status, when a rest, runs to the end of its day (as the
+  timeline shows it); any other is still open and not counted yet.
+- Miles are the day's last odometer reading minus the last reading before
+  that day. The trip's start mileage is used when no earlier reading exists.
+- Trips started count the trip on the day it started.
+
+Monthly rollups sum the daily rows per company, driver, vehicle and month.
+Reports read them, so a year-long report adds up a few rows per month.
+
+Writes refresh only the days they can change (from the written day up to the
+next day with an entry), reading only those days' entries and the entry just
+before them, and the months those days belong to.
+"""
+import operator
+from bisect import bisect_left
+from datetime import timedelta
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils.timezone import localdate
+
+from .models import DailyRollup, MonthlyRollup, Trip, TripLogEntry
+from .timeline import REST_CATEGORIES, start_of_day
+
+HOURS_FIELDS = {
+    TripLogEntry.OFF_DUTY: "off_duty_hours",
+    TripLogEntry.SLEEPER_BERTH: "sleeper_berth_hours",
+    TripLogEntry.DRIVING: "driving_hours",
+    TripLogEntry.ON_DUTY: "on_duty_hours",
+}
+ROLLUP_FIELDS = ["miles", *HOURS_FIELDS.values(), "trips_started"]
+OWNER_FIELDS = ["company_id", "driver_id", "vehicle_id"]
+TRIP_FIELDS = ["id", *OWNER_FIELDS, "start_mileage", "start_date"]
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (month_start(day) + timedelta(days=32)).replace(day=1)
+
+
+def entry_hours(entries, days, until):
+    """
+    Hours per duty category of each of `days`, from chronological `(date_created, category)` entries.
+
+    Each entry's status lasts until the next entry, the last one's until `until`,
+    and is split at midnight. Nothing is counted before the first entry.
+    """
+    hours = {day: dict.fromkeys(HOURS_FIELDS.values(), 0.0) for day in days}
+    for (moment, category), following in zip(entries, [*entries[1:], (until, None)]):
+        field, end = HOURS_FIELDS[category], following[0]
+        while moment < end:
+            day = localdate(moment)
+            stop = min(end, start_of_day(day + timedelta(days=1)))
+            if day in hours:
+                hours[day][field] += (stop - moment).total_seconds() / 3600
+            moment = stop
+    return hours
+
+
+def day_miles(readings, day, start_mileage):
+    """Miles driven on `day` from chronological (date_created, odm_reading) pairs."""
+    moments = [moment for moment, _ in readings]
+    first = bisect_left(moments, start_of_day(day))
+    end = bisect_left(moments, start_of_day(day + timedelta(days=1)))
+    if first == end:
+        return 0
+
+    baseline = readings[first - 1][1] if first else start_mileage
+    return max(readings[end - 1][1] - baseline, 0)
+
+
+def day_range(first, last):
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+def build_daily_rollups(trip, entries, readings, days, until):
+    """
+    Totals of `days` for a trip (a dict of `TRIP_FIELDS`).
+
+    `entries` are chronological `(date_created, category)` pairs: the entry
+    before the first day (if any), then every entry of the days; the last
+    status lasts until `until`. `readings` are the `(date_created, odm_reading)`
+    pairs of the days, after the last reading before them. Days with neither
+    entries, logged hours nor the trip start are left out.
+    """
+    start_day = localdate(trip["start_date"])
+    hours = entry_hours(entries, days, until)
+    logged = {localdate(moment) for moment, _ in entries}
+    return {
+        day: {
+            "miles": day_miles(readings, day, trip["start_mileage"]),
+            **hours[day],
+            "trips_started": int(day == start_day),
+        }
+        for day in days
+        if day in logged or day == start_day or any(hours[day].values())
+    }
+
+
+def _entries(trip_id):
+    return TripLogEntry.objects.filter(trip_id=trip_id, deleted=False).order_by("date_created", "id")
+
+
+def _next_entry_day(entries, moment):
+    """(day, odometer reading) of the first of `entries` at or after `moment`."""
+    first = entries.filter(date_created__gte=moment).values_list("date_created", "odm_reading").first()
+    return first and (localdate(first[0]), first[1])
+
+
+def _refresh_span(trip_id, day, last_day):
+    """
+    The days whose totals a write on `day` can change: from `day` up to the next day with an entry
+    (the status carried over runs to it) and its next odometer reading (its baseline moved). On the
+    trip's last day, also the days from the entry before it, whose status may have been the closing
+    one; when the trip now ends before `day`, from its new last day on.
+    """
+    if last_day is None or last_day < day:
+        return (last_day or day), day
+
+    entries = _entries(trip_id)
+    if last_day == day:
+        previous = entries.filter(date_created__lt=start_of_day(day)).reverse().values_list("date_created", flat=True).first()
+        return (localdate(previous) if previous else day), day
+
+    next_day = start_of_day(day + timedelta(days=1))
+    last, reading = _next_entry_day(entries, next_day)
+    if reading is None:
+        following = _next_entry_day(entries.filter(odm_reading__isnull=False), next_day)
+        last = max(last, following[0]) if following else last
+    return day, last
+
+
+def _merge(spans):
+    merged = []
+    for first, last in sorted(spans):
+        if merged and first <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def _span_rollups(trip, first, last, last_entry):
+    """Daily rollups of `first`..`last`, reading only the entries of those days and the ones just before them."""
+    entries = _entries(trip["id"])
+    span_start, span_end = start_of_day(first), start_of_day(last + timedelta(days=1))
+    window = list(
+        entries.filter(date_created__gte=span_start, date_created__lt=span_end)
+        .values_list("date_created", "category", "odm_reading")
+    )
+    before = entries.filter(date_created__lt=span_start).reverse()
+    carry_in = before.values_list("date_created", "category", "odm_reading").first()
+    baseline = carry_in
+    if carry_in and carry_in[2] is None:
+        baseline = before.filter(odm_reading__isnull=False).values_list("date_created", "category", "odm_reading").first()
+
+    located = [(moment, category) for moment, category, _ in filter(None, [carry_in, *window])]
+    readings = [(moment, reading) for moment, _, reading in filter(None, [baseline, *window]) if reading is not None]
+    if last_entry and last_entry[0] < span_end:
+        # The trip ends in the span: a closing rest runs to midnight, as the timeline shows it; otherwise it stays open.
+        moment, category = last_entry
+        until = start_of_day(localdate(moment) + timedelta(days=1)) if category in REST_CATEGORIES else moment
+    else:
+        until = span_end
+    return build_daily_rollups(trip, located, readings, day_range(first, last), until)
+
+
+def refresh_trip_rollups(trip_id, dates=None):
+    """Recompute a trip's daily rollups for the days writes on `dates` touched (every day when None) and the monthly rollups they feed."""
+    with transaction.atomic(savepoint=False):
+        refresh_monthly_rollups(_refresh_daily_rollups(trip_id, dates))
+
+
+def _refresh_daily_rollups(trip_id, dates):
+    """Recompute a trip's daily rollups; returns the monthly rollup keys they feed, before and after."""
+    trip = Trip.objects.filter(pk=trip_id, deleted=False).values(*TRIP_FIELDS).first()
+    stale = DailyRollup.objects.filter(trip_id=trip_id)
+
+    rollups = {}
+    if trip is not None:
+        last_entry = _entries(trip_id).reverse().values_list("date_created", "category").first()
+        last_day = localdate(last_entry[0]) if last_entry else None
+        start_day = localdate(trip["start_date"])
+        if dates is None:
+            spans = [(start_day, start_day)]
+            if last_day:
+                first_day = localdate(_entries(trip_id).values_list("date_created", flat=True).first())
+                spans.append((first_day, last_day))
+        else:
+            spans = [_refresh_span(trip_id, day, last_day) for day in dates if day is not None]
+        spans = _merge(spans)
+        for first, last in spans:
+            rollups.update(_span_rollups(trip, first, last, last_entry))
+        if dates is not None:
+            stale = stale.filter(reduce(operator.or_, (Q(date__range=span) for span in spans), Q(pk__in=[])))
+    elif dates is not None:
+        stale = stale.filter(date__in=dates)
+
+    months = {(*owners, month_start(day)) for *owners, day in stale.values_list(*OWNER_FIELDS, "date")}
+    stale.delete()
+    DailyRollup.objects.bulk_create([
+        DailyRollup(trip_id=trip_id, date=day, **{field: trip[field] for field in OWNER_FIELDS}, **totals)
+        for day, totals in rollups.items()
+    ])
+    if trip is not None:
+        owners = tuple(trip[field] for field in OWNER_FIELDS)
+        months.update((*owners, month_start(day)) for day in rollups)
+    return months
+
+
+def trip_rollup_months(trip_id):
+    """The (company, driver, vehicle, month) keys a trip's daily rollups feed."""
+    return {
+        (*owners, month_start(day))
+        for *owners, day in DailyRollup.objects.filter(trip_id=trip_id).values_list(*OWNER_FIELDS, "date")
+    }
+
+
+def refresh_monthly_rollups(months):
+    """Re-sum the monthly rollups of (company_id, driver_id, vehicle_id, month) keys from the daily rows."""
+    for company_id, driver_id, vehicle_id, month in months:
+        owners = {"company_id": company_id, "driver_id": driver_id, "vehicle_id": vehicle_id}
+        totals = DailyRollup.objects.filter(**owners, date__gte=month, date__lt=next_month(month)).aggregate(
+            days=Count("id"), **{field: Sum(field) for field in ROLLUP_FIELDS}
+        )
+        if not totals.pop("days"):
+            MonthlyRollup.objects.filter(**owners, month=month).delete()
+            continue
+        MonthlyRollup.objects.update_or_create(**owners, month=month, defaults=totals)
+
+
+def rebuild_rollups(trip_ids=None):
+    """Recompute the daily rollups of the given trips (every trip when None) and the monthly rollups they feed."""
+    if trip_ids is not None:
+        with transaction.atomic():
+            months = set()
+            for trip_id in trip_ids:
+                months |= _refresh_daily_rollups(trip_id, None)
+            refresh_monthly_rollups(months)
+        return
+
+    with transaction.atomic():
+        DailyRollup.objects.filter(trip__deleted=True).delete()
+        for trip_id in Trip.objects.filter(deleted=False).values_list("id", flat=True).iterator():
+            _refresh_daily_rollups(trip_id, None)
+        # Re-summing everything in one pass is cheaper than month by month.
+        MonthlyRollup.objects.all().delete()
+        MonthlyRollup.objects.bulk_create(_monthly_from_daily(DailyRollup.objects.all()))
+
+
+def _monthly_from_daily(daily):
+    sums = {}
+    for row in daily.values(*OWNER_FIELDS, "date", *ROLLUP_FIELDS).iterator():
+        key = (*(row[field] for field in OWNER_FIELDS), month_start(row["date"]))
+        totals = sums.setdefault(key, dict.fromkeys(ROLLUP_FIELDS, 0))
+        for field in ROLLUP_FIELDS:
+            totals[field] += row[field]
+    return [
+        MonthlyRollup(company_id=company_id, driver_id=driver_id, vehicle_id=vehicle_id, month=month, **totals)
+        for (company_id, driver_id, vehicle_id, month), totals in sums.items()
+    ]
+
+
+def rollup_report(period="month", date_from=None, date_to=None, **filters):
+    """
+    Totals per day or month between two dates, for rollups matching `filters` (company, driver or vehicle).
+
+    Monthly reports cover every month the range touches.
+    """
+    if period == "day":
+        rows, key = DailyRollup.objects.filter(**filters), "date"
+    else:
+        rows, key = MonthlyRollup.objects.filter(**filters), "month"
+        date_from = month_start(date_from) if date_from else None
+
+    if date_from:
+        rows = rows.filter(**{f"{key}__gte": date_from})
+    if date_to:
+        rows = rows.filter(**{f"{key}__lte": date_to})
+
+    periods = list(rows.values(key).annotate(**{field: Sum(field) for field in ROLLUP_FIELDS}).order_by(key))
+    totals = {field: sum(row[field] for row in periods) for field in ROLLUP_FIELDS}
+
+    def rounded(values):
+        return {field: round(value, 2) if isinstance(value, float) else value for field, value in values.items()}
+
+    return {
+        "period": period,
+        "periods": [{"start": row[key], **rounded({field: row[field] for field in ROLLUP_FIELDS})} for row in periods],
+        "totals": rounded(totals),
+    }
@@ -0,0 +1,158 @@
+"""
+Trip routes rebuilt from the log entries' coordinates.
+
+A route is the trip's live, located entries in chronological order. For each
+trip we keep:
+- the distance along the route (sum of the legs between successive entries),
+- the straight-line distance from the first to the last entry,
+- GPS vs odometer miles between successive odometer readings, to reconcile
+  the two,
+- a Douglas–Peucker simplified polyline to send to clients.
+
+Routes of many trips are built from one query and one pass over the rows.
+They are cached under the trip's version, which every change to its entries
+bumps (see `trip.versioning`), so a route built from rows read before a change
+can never be served after it.
+"""
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .geo import EARTH_RADIUS_KM
+from .models import TripLogEntry
+
+KM_PER_MILE = 1.609344
+# Points closer than this to the simplified line are dropped from the polyline.
+SIMPLIFY_TOLERANCE_M = 25
+ROUTE_FIELDS = ["trip_id", "id", "date_created", "latitude", "longitude", "odm_reading"]
+
+
+def _cache_key(trip):
+    return f"trip-route:{trip.id}:{trip.version}"
+
+
+def leg_distances_km(lats, lngs):
+    """Great-circle distances between successive points of two parallel coordinate lists."""
+    phis = [math.radians(lat) for lat in lats]
+    lambdas = [math.radians(lng) for lng in lngs]
+    cosines = [math.cos(phi) for phi in phis]
+    return [
+        2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(
+            math.sin((phi2 - phi1) / 2) ** 2 + cos1 * cos2 * math.sin((lambda2 - lambda1) / 2) ** 2, 1
+        )))
+        for phi1, phi2, lambda1, lambda2, cos1, cos2 in zip(phis, phis[1:], lambdas, lambdas[1:], cosines, cosines[1:])
+    ]
+
+
+def simplify(points, tolerance_m=SIMPLIFY_TOLERANCE_M):
+    """Douglas–Peucker simplification of `[lat, lng]` points, on a local equirectangular projection."""
+    if len(points) < 3:
+        return list(points)
+
+    scale = math.cos(math.radians(sum(lat for lat, _ in points) / len(points)))
+    metres_per_degree = math.radians(EARTH_RADIUS_KM * 1000)
+    xy = [(lng * scale * metres_per_degree, lat * metres_per_degree) for lat, lng in points]
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = xy[first], xy[last]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+
+        farthest, distance = None, tolerance_m
+        for index in range(first + 1, last):
+            x, y = xy[index]
+            if length:
+                offset = abs(dy * (x - x1) - dx * (y - y1)) / length
+            else:
+                offset = math.hypot(x - x1, y - y1)
+            if offset > distance:
+                farthest, distance = index, offset
+
+        if farthest is not None:
+            keep[farthest] = True
+            stack.extend([(first, farthest), (farthest, last)])
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def _miles(km):
+    return round(km / KM_PER_MILE, 2)
+
+
+def build_route(trip_id, rows, tolerance_m=SIMPLIFY_TOLERANCE_M):
+    """A trip's route from its chronological `ROUTE_FIELDS` rows."""
+    lats = [row[3] for row in rows]
+    lngs = [row[4] for row in rows]
+    cumulative = [0.0]
+    for leg in leg_distances_km(lats, lngs):
+        cumulative.append(cumulative[-1] + leg)
+
+    readings = [index for index, row in enumerate(rows) if row[5] is not None]
+    reconciliation = []
+    for start, end in zip(readings, readings[1:]):
+        odometer = rows[end][5] - rows[start][5]
+        route = cumulative[end] - cumulative[start]
+        reconciliation.append({
+            "from_entry": rows[start][1],
+            "to_entry": rows[end][1],
+            "from_date": rows[start][2],
+            "to_date": rows[end][2],
+            "odometer_miles": odometer,
+            "route_miles": _miles(route),
+            "straight_line_miles": _miles(leg_distances_km([lats[start], lats[end]], [lngs[start], lngs[end]])[0]),
+            "difference_miles": round(odometer - route / KM_PER_MILE, 2),
+        })
+
+    points = [[lat, lng] for lat, lng in zip(lats, lngs)]
+    straight = leg_distances_km([lats[0], lats[-1]], [lngs[0], lngs[-1]])[0] if len(rows) > 1 else 0.0
+    return {
+        "trip": trip_id,
+        "points": len(points),
+        "distance_miles": _miles(cumulative[-1]),
+        "straight_line_miles": _miles(straight),
+        "odometer_miles": rows[readings[-1]][5] - rows[readings[0]][5] if readings else None,
+        "polyline": simplify(points, tolerance_m),
+        "reconciliation": reconciliation,
+    }
+
+
+def build_routes(trip_ids, tolerance_m=SIMPLIFY_TOLERANCE_M):
+    """Routes of several trips, from a single query over their located live entries."""
+    rows_by_trip = {trip_id: [] for trip_id in trip_ids}
+    rows = (
+        TripLogEntry.objects.filter(trip_id__in=rows_by_trip, deleted=False, latitude__isnull=False)
+        .order_by("trip_id", "date_created", "id")
+        .values_list(*ROUTE_FIELDS)
+    )
+    for row in rows.iterator():
+        rows_by_trip[row[0]].append(row)
+    return {trip_id: build_route(trip_id, trip_rows, tolerance_m) for trip_id, trip_rows in rows_by_trip.items()}
+
+
+def get_routes(trips, tolerance_m=None):
+    """
+    Routes of `trips` by id, from the cache where possible; only the missing ones are built.
+
+    Routes simplified with a non-default `tolerance_m` are always built fresh.
+    """
+    trips = list({trip.id: trip for trip in trips}.values())
+    if tolerance_m is not None and tolerance_m != SIMPLIFY_TOLERANCE_M:
+        return build_routes([trip.id for trip in trips], tolerance_m)
+
+    keys = {trip.id: _cache_key(trip) for trip in trips}
+    cached = cache.get_many(list(keys.values()))
+    routes = {trip_id: cached[key] for trip_id, key in keys.items() if key in cached}
+    missing = [trip_id for trip_id in keys if trip_id not in routes]
+    if missing:
+        built = build_routes(missing)
+        cache.set_many(
+            {keys[trip_id]: route for trip_id, route in built.items()},
+            getattr(settings, "TRIP_ROUTE_CACHE_TIMEOUT", 60 * 60 * 24),
+        )
+        routes.update(built)
+    return {trip_id: routes[trip_id] for trip_id in keys}
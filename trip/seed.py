@@ -0,0 +1,180 @@
+"""Synthetic fleet data for benchmarks and local sizing runs."""
+import random
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from company.models import Company, DriverProfile, Vehicle
+from .models import Change, Trip, TripLogEntry
+from .signals import log_entries_bulk_created
+from .sync import record_changes
+
+User = get_user_model()
+
+AVERAGE_SPEED_MPH = 55
+
+# (category, min minutes, max minutes) for one leg of a realistic duty cycle.
+DUTY_CYCLE = [
+    (TripLogEntry.ON_DUTY, 15, 45),
+    (TripLogEntry.DRIVING, 120, 300),
+    (TripLogEntry.OFF_DUTY, 30, 60),
+    (TripLogEntry.DRIVING, 120, 300),
+    (TripLogEntry.ON_DUTY, 15, 60),
+    (TripLogEntry.SLEEPER_BERTH, 600, 660),
+]
+
+
+def _location(rng, lat, lng):
+    return {"lat": round(lat, 6), "lng": round(lng, 6), "name": f"Mile marker {rng.randint(1, 999)}"}
+
+
+def generate_log_entries(trip, count, rng, start=None, odometer=None, position=None):
+    """Build (unsaved) log entries following the duty cycle, with consistent odometer and positions."""
+    moment = start or trip.start_date
+    odometer = trip.start_mileage if odometer is None else odometer
+    lat, lng = position or (rng.uniform(30, 45), rng.uniform(-120, -75))
+    entries = []
+
+    for index in range(count):
+        category, low, high = DUTY_CYCLE[index % len(DUTY_CYCLE)]
+        entries.append(TripLogEntry(
+            trip=trip,
+            category=category,
+            remarks="",
+            location=_location(rng, lat, lng),
+            odm_reading=odometer,
+            date_created=moment,
+        ))
+
+        minutes = rng.randint(low, high)
+        if category == TripLogEntry.DRIVING:
+            miles = int(AVERAGE_SPEED_MPH * minutes / 60)
+            odometer += miles
+            lat += rng.uniform(-1, 1) * miles / 69
+            lng += rng.uniform(-1, 1) * miles / 54
+        moment += timedelta(minutes=minutes)
+
+    return entries
+
+
+def _create_log_entries(entries, batch_size):
+    for entry in entries:
+        entry.update_coordinates()
+    entries = TripLogEntry.objects.bulk_create(entries, batch_size=batch_size)
+    log_entries_bulk_created.send(sender=TripLogEntry, entries=entries)
+
+
+def seed_fleet(companies=1, drivers=10, trips_per_driver=5, logs_per_trip=30, seed=None, batch_size=2000):
+    """
+    Seed companies, drivers, vehicles, trips and log entries in bulk.
+
+    Every driver gets one vehicle; their trips run back to back and only the last
+    one is left ongoing. Returns the created companies.
+    """
+    rng = random.Random(seed)
+    run = uuid.uuid4().hex[:8]
+    now = timezone.now()
+    created_companies = []
+
+    with transaction.atomic():
+        for company_index in range(companies):
+            prefix = f"{run}-{company_index}"
+            owner = User.objects.create(
+                email=f"admin-{prefix}@fleet.example",
+                username=f"admin-{prefix}@fleet.example",
+                first_name="Fleet",
+                last_name=f"Admin {company_index}",
+                phone_number="0000000000",
+            )
+            company = Company.objects.create(
+                name=f"Fleet {prefix}",
+                main_office_address=f"{company_index} Depot Road",
+                phone_number="0000000000",
+                email=f"fleet-{prefix}@fleet.example",
+                created_by=owner,
+            )
+            company.admins.add(owner)
+
+            users = User.objects.bulk_create([
+                User(
+                    email=f"driver-{prefix}-{index}@fleet.example",
+                    username=f"driver-{prefix}-{index}@fleet.example",
+                    first_name="Driver",
+                    last_name=str(index),
+                    phone_number="0000000000",
+                )
+                for index in range(drivers)
+            ], batch_size=batch_size)
+            profiles = DriverProfile.objects.bulk_create([
+                DriverProfile(
+                    user=user,
+                    company=company,
+                    license_number=f"LIC-{prefix}-{index}",
+                    home_terminal=f"Terminal {index % 5}",
+                    created_by=owner,
+                )
+                for index, user in enumerate(users)
+            ], batch_size=batch_size)
+            vehicles = Vehicle.objects.bulk_create([
+                Vehicle(
+                    company=company,
+                    truck_number=f"TRK-{prefix}-{index}",
+                    license_plate=f"PL-{prefix}-{index}",
+                    state_of_registration="TX",
+                    created_by=owner,
+                )
+                for index in range(drivers)
+            ], batch_size=batch_size)
+            Vehicle.drivers.through.objects.bulk_create([
+                Vehicle.drivers.through(vehicle_id=vehicle.id, driverprofile_id=profile.id)
+                for vehicle, profile in zip(vehicles, profiles)
+            ], batch_size=batch_size)
+
+            # Each trip spans roughly one day per six log entries.
+            trip_length = timedelta(days=max(1, logs_per_trip // 6))
+            trips = []
+            for profile, vehicle in zip(profiles, vehicles):
+                start = now - trip_length * trips_per_driver
+                for index in range(trips_per_driver):
+                    last = index == trips_per_driver - 1
+                    trips.append(Trip(
+                        company=company,
+                        driver=profile,
+                        vehicle=vehicle,
+                        end_date=start + trip_length,
+                        starting_location=_location(rng, rng.uniform(30, 45), rng.uniform(-120, -75)),
+                        ending_location=_location(rng, rng.uniform(30, 45), rng.uniform(-120, -75)),
+                        start_mileage=rng.randint(10_000, 400_000),
+                        status=Trip.ONGOING if last else Trip.COMPLETED,
+                        manifest_no=f"MF-{prefix}-{profile.id}-{index}",
+                        shipper="Synthetic Shipper",
+                        commodity="General freight",
+                    ))
+                    trips[-1].update_coordinates()
+                    start += trip_length
+            trips = Trip.objects.bulk_create(trips, batch_size=batch_size)
+
+            # `start_date` is auto_now_add, so spread the trips over time after inserting them.
+            for index, trip in enumerate(trips):
+                trip.start_date = now - trip_length * (trips_per_driver - index % trips_per_driver)
+            Trip.objects.bulk_update(trips, ["start_date"], batch_size=batch_size)
+
+            # `bulk_create` skips the signals that feed delta sync.
+            record_changes(company.id, Change.DRIVER, [profile.id for profile in profiles])
+            record_changes(company.id, Change.VEHICLE, [vehicle.id for vehicle in vehicles])
+            record_changes(company.id, Change.TRIP, [trip.id for trip in trips])
+
+            entries = []
+            for trip in trips:
+                entries.extend(generate_log_entries(trip, logs_per_trip, rng))
+                if len(entries) >= batch_size:
+                    _create_log_entries(entries, batch_size)
+                    entries = []
+            _create_log_entries(entries, batch_size)
+
+            created_companies.append(company)
+
+    return created_companies
@@ -1,7 +1,10 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
+from company.membership import get_membership
 from company.models import Company, DriverProfile, Vehicle
-from .models import Trip, TripLogEntry
+from .models import DriverLiveStatus, Trip, TripLogEntry, VehicleLiveStatus
+from .odometer import check_entry
 
 class CompanySerializer(serializers.ModelSerializer):
     class Meta:
@@ -21,6 +24,8 @@ class VehicleSerializer(serializers.ModelSerializer):
 class TripSerializer(serializers.ModelSerializer):
     start_date = serializers.ReadOnlyField()
     last_odm_reading = serializers.SerializerMethodField()
+    last_log_category = serializers.SerializerMethodField()
+    last_log_date = serializers.SerializerMethodField()
     vehicle = serializers.PrimaryKeyRelatedField(queryset=Vehicle.objects.all(), write_only=True)
     company = serializers.PrimaryKeyRelatedField(queryset=Company.objects.all(), write_only=True)
     driver = serializers.PrimaryKeyRelatedField(queryset=DriverProfile.objects.all(), write_only=True)
@@ -28,22 +33,39 @@ class TripSerializer(serializers.ModelSerializer):
     class Meta:
         model = Trip
         fields = "__all__"
+        read_only_fields = [
+            "start_latitude", "start_longitude", "start_geohash", "end_latitude", "end_longitude", "end_geohash", "version",
+        ]
+        # Deleted trips keep their manifest numbers; check against every row, not just the live ones.
+        extra_kwargs = {"manifest_no": {"validators": [UniqueValidator(queryset=Trip.all_objects.all())]}}
+
+    def _latest_log(self, obj):
+        """Latest log values, read from the `with_latest_log` annotations when present."""
+        if not hasattr(obj, "last_log_date"):
+            annotated = Trip.all_objects.with_latest_log().filter(pk=obj.pk).values(
+                "last_odm_reading", "last_log_category", "last_log_date"
+            ).first() or {}
+            for key in ("last_odm_reading", "last_log_category", "last_log_date"):
+                setattr(obj, key, annotated.get(key))
+        return obj
 
     def get_last_odm_reading(self, obj):
         """Fetch the latest odm_reading from trip logs."""
-        last_log = (
-            TripLogEntry.objects.filter(trip=obj, odm_reading__isnull=False)
-            .order_by("-date_created")
-            .first()
-        )
-        return last_log.odm_reading if last_log else None
+        return self._latest_log(obj).last_odm_reading
+
+    def get_last_log_category(self, obj):
+        return self._latest_log(obj).last_log_category
+
+    def get_last_log_date(self, obj):
+        last_log_date = self._latest_log(obj).last_log_date
+        return serializers.DateTimeField().to_representation(last_log_date) if last_log_date else None
 
     def validate(self, data):
         request = self.context.get("request")
         if not request or not request.user:
             raise serializers.ValidationError("Authentication required.")
 
-        user = request.user
+        membership = get_membership(request)
         method = request.method
         instance = self.instance
 
@@ -52,7 +74,7 @@ class TripSerializer(serializers.ModelSerializer):
         vehicle = data.get("vehicle", instance.vehicle if instance else None)
 
         # Is a company admin or the driver of the trip?
-        if not (company.admins.filter(id=user.id).exists() or user == driver.user):
+        if not (membership.is_company_admin(company.id) or membership.is_driver(driver.id)):
             raise serializers.ValidationError("You must be a company admin or the assigned driver.")
 
         # Belongs to the company?
@@ -65,10 +87,10 @@ class TripSerializer(serializers.ModelSerializer):
 
         # Has ongoing trip?
         if method == "POST":
-            if Trip.objects.filter(driver=driver, status="Ongoing").exists():
+            if Trip.objects.filter(driver=driver, status=Trip.ONGOING).exists():
                 raise serializers.ValidationError("Driver already has an ongoing trip.")
             
-            if Trip.objects.filter(vehicle=vehicle, status="Ongoing").exists():
+            if Trip.objects.filter(vehicle=vehicle, status=Trip.ONGOING).exists():
                 raise serializers.ValidationError("Truck already has an ongoing trip.")
 
         return data
@@ -82,17 +104,25 @@ class TripSerializer(serializers.ModelSerializer):
         return representation
 
 
+def validate_odm_reading(category, odm_reading):
+    # `odm_reading` is provided for `SLEEPER_BERTH`?
+    if category in {TripLogEntry.SLEEPER_BERTH, TripLogEntry.OFF_DUTY} and odm_reading is None:
+        raise serializers.ValidationError(f"Odometer reading is required for {category}.")
+
+
 class TripLogEntrySerializer(serializers.ModelSerializer):
     class Meta:
         model = TripLogEntry
         fields = "__all__"
+        read_only_fields = ["latitude", "longitude", "geohash"]
+        # `client_id` is optional here; its uniqueness is checked in `validate`.
+        validators = []
 
     def validate(self, data):
         request = self.context.get("request")
         if not request or not request.user:
             raise serializers.ValidationError("Authentication required.")
 
-        user = request.user
         instance = self.instance
 
         trip = data.get("trip", instance.trip if instance else None)
@@ -103,11 +133,77 @@ class TripLogEntrySerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Trip is required.")
 
         # Is trip driver or a company admin?
-        if not (trip.driver.user == user or trip.company.admins.filter(id=user.id).exists()):
+        if not get_membership(request).can_access_trip(trip):
             raise serializers.ValidationError("You must be the trip driver or a company admin.")
 
-        # `odm_reading` is provided for `SLEEPER_BERTH`?
-        if category in {TripLogEntry.SLEEPER_BERTH, TripLogEntry.OFF_DUTY} and odm_reading is None:
-            raise serializers.ValidationError(f"Odometer reading is required for {category}.")
+        validate_odm_reading(category, odm_reading)
+
+        if self._needs_order_check(data):
+            # Odometer and timestamp order against the neighbouring entries only, not the whole log.
+            errors = check_entry(
+                trip,
+                data.get("date_created", instance.date_created if instance else None),
+                odm_reading,
+                exclude_id=instance.pk if instance else None,
+            )
+            if errors:
+                raise serializers.ValidationError(errors)
+
+        client_id = data.get("client_id")
+        if client_id:
+            duplicates = TripLogEntry.all_objects.filter(trip=trip, client_id=client_id)
+            if instance:
+                duplicates = duplicates.exclude(pk=instance.pk)
+            if duplicates.exists():
+                raise serializers.ValidationError({"client_id": "A log entry with this client id already exists for the trip."})
+
+        return data
 
-        return data
\ No newline at end of file
+    def _needs_order_check(self, data):
+        """New and restored entries, and updates that move an entry or change its reading."""
+        instance = self.instance
+        if data.get("deleted", instance.deleted if instance else False):
+            return False
+        if instance is None or instance.deleted:
+            return True
+        # Other edits (remarks, category, ...) must not fail on legacy entries that were already out of order.
+        return any(
+            field in data and data[field] != getattr(instance, field)
+            for field in ("trip", "date_created", "odm_reading")
+        )
+
+
+class TripLogEntryBulkItemSerializer(serializers.ModelSerializer):
+    """One entry of a bulk upload. Trips and permissions are resolved once per batch, not per item."""
+    trip = serializers.IntegerField()
+    client_id = serializers.CharField(max_length=64)
+
+    class Meta:
+        model = TripLogEntry
+        fields = ["trip", "client_id", "category", "remarks", "location", "odm_reading", "date_created"]
+        validators = []
+
+    def validate(self, data):
+        validate_odm_reading(data["category"], data.get("odm_reading"))
+        return data
+
+
+class DriverLiveStatusSerializer(serializers.ModelSerializer):
+    driver_name = serializers.CharField(source="driver.user.get_full_name", read_only=True)
+    trip_status = serializers.CharField(source="trip.status", read_only=True)
+    vehicle = serializers.IntegerField(source="trip.vehicle_id", read_only=True)
+
+    class Meta:
+        model = DriverLiveStatus
+        fields = ["driver", "driver_name", "vehicle", "trip", "trip_status", "category", "since", "location", "latitude", "longitude", "odm_reading", "date_updated"]
+
+
+class VehicleLiveStatusSerializer(serializers.ModelSerializer):
+    truck_number = serializers.CharField(source="vehicle.truck_number", read_only=True)
+    operational = serializers.BooleanField(source="vehicle.operational", read_only=True)
+    trip_status = serializers.CharField(source="trip.status", read_only=True)
+    driver = serializers.IntegerField(source="trip.driver_id", read_only=True)
+
+    class Meta:
+        model = VehicleLiveStatus
+        fields = ["vehicle", "truck_number", "operational", "driver", "trip", "trip_status", "category", "since", "location", "latitude", "longitude", "odm_reading", "date_updated"]
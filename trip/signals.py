@@ -0,0 +1,320 @@
+from django.db.models import F, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils.timezone import localdate
+
+from company.models import Company, DriverProfile, Vehicle
+from .events import log_entry_event, publish_on_commit, trip_event
+from .live_status import advance_live_status, refresh_live_status
+from .models import Change, Trip, TripLogEntry
+from .rollups import refresh_monthly_rollups, refresh_trip_rollups, trip_rollup_months
+from .sync import record_changes
+from .timeline import rebuild_trip_days, refresh_trip_days
+from .versioning import bump_trip_versions
+
+# Trip fields pointing at the models whose serialized data trips embed.
+EMBEDDED_OWNER_FIELDS = {Company: "company", DriverProfile: "driver", Vehicle: "vehicle"}
+SYNC_OWNER_KINDS = {DriverProfile: Change.DRIVER, Vehicle: Change.VEHICLE}
+
+# Log entry fields the rollups and the live statuses are computed from; edits that change none of them skip those.
+ROLLUP_INPUT_FIELDS = ["trip_id", "date_created", "category", "odm_reading", "deleted"]
+LIVE_STATUS_INPUT_FIELDS = [*ROLLUP_INPUT_FIELDS, "location"]
+
+# Sent after `bulk_create` of log entries, which skips the model signals. Receives `entries`.
+log_entries_bulk_created = Signal()
+
+
+def log_inputs_changed(instance, fields):
+    """Did saving the entry change any of `fields`? New entries (nothing remembered) count as changed."""
+    previous = getattr(instance, "_previous_values", None)
+    return previous is None or any(getattr(instance, field) != previous[field] for field in fields)
+
+
+def deleted_with_parent(origin):
+    """Was the entry deleted along with its trip (or something above it)? The trip's receivers cover those."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin is not None and model is not TripLogEntry
+
+
+@receiver(pre_save, sender=TripLogEntry)
+@receiver(pre_save, sender=Trip)
+def update_coordinates(sender, instance, raw=False, **kwargs):
+    """Copy the JSON locations into the indexed latitude/longitude/geohash columns."""
+    instance.update_coordinates()
+
+
+@receiver(pre_save, sender=Trip)
+def bump_version_on_trip_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Increment the version in the UPDATE itself, so a stale in-memory version is never written back."""
+    if instance.pk and not raw and (update_fields is None or "version" in update_fields):
+        instance.version = F("version") + 1
+
+
+@receiver(post_save, sender=Trip)
+def reload_version_on_trip_save(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    # Runs before the other post_save receivers, which may read the version.
+    if raw or created:
+        return
+    if update_fields is not None and "version" not in update_fields:
+        bump_trip_versions(pk=instance.pk)
+    instance.version = Trip.all_objects.filter(pk=instance.pk).values_list("version", flat=True).get()
+
+
+@receiver(post_save, sender=TripLogEntry)
+def bump_version_on_log_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_position", None)
+    bump_trip_versions(pk__in={instance.trip_id, previous[0] if previous else None} - {None})
+
+
+@receiver(post_delete, sender=TripLogEntry)
+def bump_version_on_log_delete(sender, instance, origin=None, **kwargs):
+    if not deleted_with_parent(origin):
+        bump_trip_versions(pk=instance.trip_id)
+
+
+@receiver(log_entries_bulk_created, sender=TripLogEntry)
+def bump_versions_on_bulk_create(sender, entries, **kwargs):
+    bump_trip_versions(pk__in={entry.trip_id for entry in entries})
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=DriverProfile)
+@receiver(post_save, sender=Vehicle)
+def bump_versions_on_owner_save(sender, instance, created=False, raw=False, **kwargs):
+    """Trips embed their company, driver and vehicle, so edits to those change the trips' representations."""
+    if not (raw or created):
+        bump_trip_versions(**{EMBEDDED_OWNER_FIELDS[sender]: instance})
+
+
+@receiver(pre_save, sender=TripLogEntry)
+def remember_previous_log_position(sender, instance, raw=False, **kwargs):
+    """Keep the trip/day an edited entry used to belong to, so that day gets refreshed too, and what it was derived from."""
+    instance._previous_position = instance._previous_values = None
+    if instance.pk and not raw:
+        previous = TripLogEntry.all_objects.filter(pk=instance.pk).values(*LIVE_STATUS_INPUT_FIELDS).first()
+        if previous:
+            instance._previous_position = (previous["trip_id"], previous["date_created"])
+            instance._previous_values = previous
+
+
+@receiver(post_save, sender=TripLogEntry)
+def refresh_timeline_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    dates = {localdate(instance.date_created)}
+    previous = getattr(instance, "_previous_position", None)
+    if previous:
+        previous_trip_id, previous_date = previous
+        if previous_trip_id != instance.trip_id:
+            previous_dates = {localdate(previous_date)}
+            refresh_trip_days(previous_trip_id, previous_dates)
+            refresh_trip_rollups(previous_trip_id, previous_dates)
+        else:
+            dates.add(localdate(previous_date))
+
+    refresh_trip_days(instance.trip_id, dates)
+    if log_inputs_changed(instance, ROLLUP_INPUT_FIELDS):
+        refresh_trip_rollups(instance.trip_id, dates)
+
+
+@receiver(post_delete, sender=TripLogEntry)
+def refresh_timeline_on_delete(sender, instance, origin=None, **kwargs):
+    if deleted_with_parent(origin):
+        return
+    dates = {localdate(instance.date_created)}
+    refresh_trip_days(instance.trip_id, dates)
+    refresh_trip_rollups(instance.trip_id, dates)
+
+
+@receiver(log_entries_bulk_created, sender=TripLogEntry)
+def refresh_timeline_on_bulk_create(sender, entries, **kwargs):
+    dates_by_trip = {}
+    for entry in entries:
+        dates_by_trip.setdefault(entry.trip_id, set()).add(localdate(entry.date_created))
+
+    for trip_id, dates in dates_by_trip.items():
+        # Past a few days a single-pass rebuild is cheaper than refreshing day by day.
+        if len(dates) > 3:
+            rebuild_trip_days(trip_id)
+            refresh_trip_rollups(trip_id)
+        else:
+            refresh_trip_days(trip_id, dates)
+            refresh_trip_rollups(trip_id, dates)
+
+
+@receiver(post_save, sender=TripLogEntry)
+def update_live_status_on_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        advance_live_status(instance)
+        return
+
+    if not log_inputs_changed(instance, LIVE_STATUS_INPUT_FIELDS):
+        return
+    previous = getattr(instance, "_previous_position", None)
+    refresh_live_status(trip_ids={instance.trip_id, previous[0] if previous else None})
+
+
+@receiver(post_delete, sender=TripLogEntry)
+def update_live_status_on_delete(sender, instance, origin=None, **kwargs):
+    if deleted_with_parent(origin):
+        return
+    refresh_live_status(trip_ids={instance.trip_id})
+
+
+@receiver(log_entries_bulk_created, sender=TripLogEntry)
+def update_live_status_on_bulk_create(sender, entries, **kwargs):
+    refresh_live_status(trip_ids={entry.trip_id for entry in entries})
+
+
+@receiver(pre_save, sender=Trip)
+def remember_previous_trip_owners(sender, instance, raw=False, **kwargs):
+    """Keep who a trip used to belong to, so their live status and rollups get recomputed."""
+    instance._previous_owners = None
+    if instance.pk and not raw:
+        instance._previous_owners = (
+            Trip.all_objects.filter(pk=instance.pk)
+            .values_list("driver_id", "vehicle_id", "deleted", "company_id", "start_mileage")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Trip)
+def update_live_status_on_trip_save(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, "_previous_owners", None)
+    if raw or not previous or previous[:3] == (instance.driver_id, instance.vehicle_id, instance.deleted):
+        return
+    refresh_live_status(drivers={previous[0], instance.driver_id}, vehicles={previous[1], instance.vehicle_id})
+
+
+@receiver(post_save, sender=Trip)
+def refresh_rollups_on_trip_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_owners", None)
+    current = (instance.driver_id, instance.vehicle_id, instance.deleted, instance.company_id, instance.start_mileage)
+    if created or (previous and previous != current):
+        refresh_trip_rollups(instance.id)
+
+
+@receiver(pre_delete, sender=Trip)
+def remember_trip_rollup_months(sender, instance, **kwargs):
+    # The daily rollups go with the trip; the monthly ones they fed need re-summing afterwards.
+    instance._rollup_months = trip_rollup_months(instance.id)
+
+
+@receiver(post_delete, sender=Trip)
+def refresh_rollups_on_trip_delete(sender, instance, **kwargs):
+    refresh_monthly_rollups(getattr(instance, "_rollup_months", ()))
+
+
+@receiver(post_delete, sender=Trip)
+def update_live_status_on_trip_delete(sender, instance, **kwargs):
+    refresh_live_status(drivers={instance.driver_id}, vehicles={instance.vehicle_id})
+
+
+@receiver(post_save, sender=TripLogEntry)
+def publish_log_entry_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, "_previous_position", None)
+    if previous and previous[0] != instance.trip_id:
+        # Moved to another trip: it is gone from the old trip's stream.
+        previous_trip = Trip.all_objects.filter(pk=previous[0]).values_list("company_id", flat=True).first()
+        moved = log_entry_event("deleted", instance, previous_trip)
+        moved["trip"] = previous[0]
+        publish_on_commit(previous_trip, previous[0], moved)
+
+    action = "created" if created else "deleted" if instance.deleted else "updated"
+    company_id = instance.trip.company_id
+    publish_on_commit(company_id, instance.trip_id, log_entry_event(action, instance, company_id))
+
+
+@receiver(post_delete, sender=TripLogEntry)
+def publish_log_entry_delete(sender, instance, origin=None, **kwargs):
+    if deleted_with_parent(origin):
+        return
+    company_id = Trip.all_objects.filter(pk=instance.trip_id).values_list("company_id", flat=True).first()
+    if company_id is not None:
+        publish_on_commit(company_id, instance.trip_id, log_entry_event("deleted", instance, company_id))
+
+
+@receiver(log_entries_bulk_created, sender=TripLogEntry)
+def publish_log_entries_bulk_create(sender, entries, **kwargs):
+    companies = dict(Trip.all_objects.filter(id__in={entry.trip_id for entry in entries}).values_list("id", "company_id"))
+    for entry in entries:
+        company_id = companies[entry.trip_id]
+        publish_on_commit(company_id, entry.trip_id, log_entry_event("created", entry, company_id))
+
+
+@receiver(post_save, sender=Trip)
+def publish_trip_save(sender, instance, created=False, raw=False, **kwargs):
+    if not raw:
+        action = "created" if created else "deleted" if instance.deleted else "updated"
+        publish_on_commit(instance.company_id, instance.id, trip_event(action, instance))
+
+
+@receiver(post_delete, sender=Trip)
+def publish_trip_delete(sender, instance, **kwargs):
+    publish_on_commit(instance.company_id, instance.id, trip_event("deleted", instance))
+
+
+def deleted_with_company(origin):
+    """Was the row deleted along with its company? Its change feed goes with it."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is Company
+
+
+@receiver(post_save, sender=Trip)
+def record_trip_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_changes(instance.company_id, Change.TRIP, [instance.id])
+
+
+@receiver(post_delete, sender=Trip)
+def record_trip_delete(sender, instance, origin=None, **kwargs):
+    if not deleted_with_company(origin):
+        record_changes(instance.company_id, Change.TRIP, [instance.id])
+
+
+@receiver(post_save, sender=TripLogEntry)
+def record_log_entry_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_changes(instance.trip.company_id, Change.LOG_ENTRY, [instance.id])
+
+
+@receiver(post_delete, sender=TripLogEntry)
+def record_log_entry_delete(sender, instance, origin=None, **kwargs):
+    if deleted_with_parent(origin):
+        return
+    company_id = Trip.all_objects.filter(pk=instance.trip_id).values_list("company_id", flat=True).first()
+    record_changes(company_id, Change.LOG_ENTRY, [instance.id])
+
+
+@receiver(log_entries_bulk_created, sender=TripLogEntry)
+def record_log_entries_bulk_create(sender, entries, **kwargs):
+    companies = dict(Trip.all_objects.filter(id__in={entry.trip_id for entry in entries}).values_list("id", "company_id"))
+    ids_by_company = {}
+    for entry in entries:
+        ids_by_company.setdefault(companies[entry.trip_id], []).append(entry.id)
+    for company_id, ids in ids_by_company.items():
+        record_changes(company_id, Change.LOG_ENTRY, ids)
+
+
+@receiver(post_save, sender=DriverProfile)
+@receiver(post_save, sender=Vehicle)
+def record_owner_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_changes(instance.company_id, SYNC_OWNER_KINDS[sender], [instance.id])
+
+
+@receiver(post_delete, sender=DriverProfile)
+@receiver(post_delete, sender=Vehicle)
+def record_owner_delete(sender, instance, origin=None, **kwargs):
+    if not deleted_with_company(origin):
+        record_changes(instance.company_id, SYNC_OWNER_KINDS[sender], [instance.id])
@@ -0,0 +1,68 @@
+"""
+Server-Sent Events streams of live trip and log-entry deltas.
+
+These are plain async Django views so that an open stream holds no worker
+thread; serve the project with an ASGI server (`uvicorn truck.asgi:application`).
+Clients authenticate like the REST API (an `Authorization: Bearer` header, or
+`?access_token=` for browsers' `EventSource`) and should refetch through the
+REST endpoints whenever a stream (re)connects.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.utils.encoders import JSONEncoder
+
+from company.membership import load_membership
+from .async_views import async_api_view, get_visible_trip
+from .events import company_channel, get_broker, trip_channel
+
+
+def _format_event(event):
+    data = json.dumps(event, cls=JSONEncoder)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+async def _event_stream(channels):
+    broker = get_broker()
+    subscription = broker.subscribe(channels)
+    heartbeat = getattr(settings, "LIVE_UPDATES_HEARTBEAT", 15)
+    try:
+        yield f"retry: {heartbeat * 1000}\n\n"
+        while not subscription.overflowed:
+            try:
+                event = await subscription.get(heartbeat)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection.
+                yield ": heartbeat\n\n"
+                continue
+            yield _format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def _stream_response(channels):
+    response = StreamingHttpResponse(_event_stream(channels), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@async_api_view
+async def company_events(request, pk):
+    """Every trip and log-entry change of a company, for its admins."""
+    membership = await sync_to_async(load_membership)(request.user)
+    if not membership.is_company_admin(pk):
+        raise PermissionDenied("Only company admins can follow the fleet.")
+
+    return _stream_response([company_channel(pk)])
+
+
+@async_api_view
+async def trip_events(request, pk):
+    """Changes to one trip and its log entries, for its driver and company admins."""
+    trip = await get_visible_trip(request, pk)
+    return _stream_response([trip_channel(trip.id)])
@@ -0,0 +1,112 @@
+"""
+Delta sync: "what changed since my cursor" for offline-capable clients.
+
+Every create, update and (soft or hard) delete of a trip, log entry, vehicle
+or driver profile gives the object the next sequence number of its company
+(see `trip.signals`). A `Change` row keeps only the latest sequence of each
+object, so a client that resyncs reads one row per changed object, however
+many times it changed, and a first sync (`since=0`) reads one per object.
+
+Sequences are handed out by incrementing the company's `ChangeCounter` row,
+in the same transaction as the write itself: saves of the tracked models are
+atomic with their `post_save` receivers (`company.models.AtomicSaveMixin`),
+deletes run their receivers inside the delete's transaction, and bulk uploads
+record their entries inside theirs. The counter row stays locked until that
+transaction commits, so changes of one company commit in sequence order, a
+reader never skips past one that is still in flight, and a write never
+commits without its change. The recording receivers run last and join the
+write's transaction without a savepoint, so the counter is locked by the last
+statements before the commit; still, writes of one company queue on it.
+
+Records are read in their current state, in the compact form of the live
+events, one query per kind. Objects that were hard deleted or that the reader
+can no longer see come back as ids under `removed`. The log entries of a
+removed trip are gone with it.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from company.models import DriverProfile, Vehicle
+from .events import LOG_ENTRY_EVENT_FIELDS, TRIP_EVENT_FIELDS
+from .models import Change, ChangeCounter, Trip, TripLogEntry
+
+DEFAULT_SYNC_LIMIT = 500
+MAX_SYNC_LIMIT = 5000
+
+VEHICLE_SYNC_FIELDS = ["id", "truck_number", "trailer_number", "license_plate", "state_of_registration", "operational"]
+DRIVER_SYNC_FIELDS = ["id", "user_id", "license_number", "home_terminal", "deleted"]
+
+# kind: (model, response key, fields, company lookup, driver lookup)
+SYNC_KINDS = {
+    Change.TRIP: (Trip, "trips", TRIP_EVENT_FIELDS, "company_id", "driver_id"),
+    Change.LOG_ENTRY: (TripLogEntry, "log_entries", LOG_ENTRY_EVENT_FIELDS, "trip__company_id", "trip__driver_id"),
+    Change.VEHICLE: (Vehicle, "vehicles", VEHICLE_SYNC_FIELDS, "company_id", "drivers"),
+    Change.DRIVER: (DriverProfile, "drivers", DRIVER_SYNC_FIELDS, "company_id", "id"),
+}
+
+
+def _allocate(company_id, count):
+    """Reserve `count` sequences of the company; returns the last one. Locks the counter until commit."""
+    counters = ChangeCounter.objects.filter(company_id=company_id)
+    if not counters.update(last_sequence=F("last_sequence") + count):
+        ChangeCounter.objects.get_or_create(company_id=company_id)
+        counters.update(last_sequence=F("last_sequence") + count)
+    return counters.values_list("last_sequence", flat=True).get()
+
+
+def record_changes(company_id, kind, object_ids):
+    """Move `object_ids` of `kind` to the company's next sequences, in one upsert."""
+    object_ids = sorted(set(object_ids) - {None})
+    if not object_ids or company_id is None:
+        return
+
+    # Part of the write's transaction, with no savepoint of its own: if recording fails, the write is rolled back.
+    with transaction.atomic(savepoint=False):
+        first = _allocate(company_id, len(object_ids)) - len(object_ids) + 1
+        Change.objects.bulk_create(
+            [
+                Change(company_id=company_id, sequence=first + offset, kind=kind, object_id=object_id)
+                for offset, object_id in enumerate(object_ids)
+            ],
+            update_conflicts=True,
+            unique_fields=["kind", "object_id"],
+            update_fields=["company", "sequence"],
+        )
+
+
+def changes_since(company_id, since=0, limit=DEFAULT_SYNC_LIMIT, driver_id=None):
+    """
+    Up to `limit` changes of the company after sequence `since`, with the cursor to resume from.
+
+    With `driver_id`, only what that driver can see: their trips, those trips'
+    log entries, their own profile and the vehicles assigned to them.
+    """
+    changes = list(
+        Change.objects.filter(company_id=company_id, sequence__gt=since)
+        .order_by("sequence")
+        .values_list("sequence", "kind", "object_id")[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    ids_by_kind = {}
+    for _, kind, object_id in changes:
+        ids_by_kind.setdefault(kind, []).append(object_id)
+
+    result = {
+        "cursor": changes[-1][0] if changes else since,
+        "has_more": has_more,
+        **{key: [] for _, key, *_ in SYNC_KINDS.values()},
+        "removed": {key: [] for _, key, *_ in SYNC_KINDS.values()},
+    }
+    for kind, ids in ids_by_kind.items():
+        model, key, fields, company_lookup, driver_lookup = SYNC_KINDS[kind]
+        rows = model.all_objects.filter(id__in=ids, **{company_lookup: company_id})
+        if driver_id is not None:
+            rows = rows.filter(**{driver_lookup: driver_id})
+        found = {row["id"]: row for row in rows.values(*fields)}
+
+        # In change order, so clients can apply them as they come.
+        result[key] = [found[object_id] for object_id in ids if object_id in found]
+        result["removed"][key] = [object_id for object_id in ids if object_id not in found]
+    return result
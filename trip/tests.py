@@ -1,3 +1,1431 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import uuid
+import zipfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.functions import TruncDate
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model, get_application_model
+from rest_framework.test import APIClient
+from rest_framework.utils.encoders import JSONEncoder
+
+from app_user.authentication import cache_token, local_tokens, token_checksum
+from company.models import Company, DriverProfile, Vehicle
+from . import bulk
+from .bulk import BULK_LOG_ENTRY_LIMIT, CREATED, DUPLICATE, INVALID
+from .events import InProcessBroker, company_channel, get_broker, trip_channel
+from .export import EXPORT_NAMES, CSVExport, astream_export, export_rows, stream_export
+from .geo import haversine_km, nearest
+from .hos import evaluate_company, evaluate_entries
+from .logsheet import category_totals, day_sheet_data, render_day_sheet, render_svg, sheet_intervals
+from .models import DailyRollup, DriverLiveStatus, MonthlyRollup, Trip, TripLogEntry, VehicleLiveStatus
+from .odometer import inconsistent_readings, misdated_entries
+from .rollups import HOURS_FIELDS, rebuild_rollups
+from .routes import simplify
+from .seed import seed_fleet
+from .streams import _event_stream
+from .timeline import LOG_FIELDS, REST_CATEGORIES, build_trip_days, end_of_day, live_log_values, start_of_day
+
+User = get_user_model()
+
+
+def create_access_token(user):
+    application = get_application_model().objects.create(
+        name="tests", user=user, client_type="confidential", authorization_grant_type="password"
+    )
+    return get_access_token_model().objects.create(
+        user=user, application=application, token=uuid.uuid4().hex, expires=timezone.now() + timedelta(hours=1), scope="read write"
+    )
+
+
+@override_settings(QUERY_BUDGET_MODE="raise")
+class QueryBudgetTests(TestCase):
+    """Every endpoint of `QUERY_BUDGETS` stays within its budget, with cold and with warm caches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = seed_fleet(companies=1, drivers=3, trips_per_driver=2, logs_per_trip=12, seed=1)[0]
+        cls.admin = cls.company.admins.first()
+        cls.token = create_access_token(cls.admin)
+        cls.urls = cls.endpoints()
+
+    def setUp(self):
+        # Budgets assume a validated token (see `QUERY_BUDGETS`); every other cache starts cold.
+        local_tokens.clear()
+        cache_token(token_checksum(self.token.token), self.token)
+        self.headers = {"Authorization": f"Bearer {self.token.token}"}
+
+    def tearDown(self):
+        local_tokens.clear()
+        cache.clear()
+
+    @classmethod
+    def endpoints(cls):
+        company = cls.company
+        trip = Trip.objects.filter(company=company).first()
+        driver = DriverProfile.objects.filter(company=company).first()
+        vehicle = Vehicle.objects.filter(company=company).first()
+        entry = trip.log_entries.exclude(latitude=None).first()
+        point = f"lat={entry.latitude}&lng={entry.longitude}"
+        box = (
+            f"min_lat={entry.latitude - 1}&min_lng={entry.longitude - 1}"
+            f"&max_lat={entry.latitude + 1}&max_lng={entry.longitude + 1}"
+        )
+        return {
+            "TripViewSet.list": "/api/v1/trips/",
+            "TripViewSet.retrieve": f"/api/v1/trips/{trip.id}/",
+            "TripViewSet.logs": f"/api/v1/trips/{trip.id}/logs/",
+            "TripViewSet.logs_time_series": f"/api/v1/trips/{trip.id}/logs_time_series/",
+            "TripViewSet.route": f"/api/v1/trips/{trip.id}/route/",
+            "TripViewSet.routes": "/api/v1/trips/routes/",
+            # The largest radii, so nearest searches widen as far as they can.
+            "TripViewSet.near": f"/api/v1/trips/near/?{point}&radius_km=2000",
+            "TripViewSet.within": f"/api/v1/trips/within/?{box}",
+            "TripLogEntryViewSet.list": "/api/v1/trip-logs/",
+            "TripLogEntryViewSet.near": f"/api/v1/trip-logs/near/?{point}&radius_km=250",
+            "TripLogEntryViewSet.within": f"/api/v1/trip-logs/within/?{box}",
+            "CompanyViewSet.list": "/api/v1/companies/",
+            "CompanyViewSet.fleet_status": f"/api/v1/companies/{company.id}/fleet_status/",
+            "CompanyViewSet.nearest_vehicles": f"/api/v1/companies/{company.id}/nearest_vehicles/?{point}",
+            "CompanyViewSet.report": f"/api/v1/companies/{company.id}/report/",
+            "DriverProfileViewSet.report": f"/api/v1/drivers/{driver.id}/report/",
+            "VehicleViewSet.report": f"/api/v1/vehicles/{vehicle.id}/report/",
+            "DriverProfileViewSet.list": "/api/v1/drivers/",
+            "VehicleViewSet.list": "/api/v1/vehicles/",
+            "SyncView.get": f"/api/v1/sync/?company={company.id}",
+            "trip.async_views.trip_list": "/api/v1/async/trips/",
+            "trip.async_views.trip_detail": f"/api/v1/async/trips/{trip.id}/",
+            "trip.async_views.trip_logs": f"/api/v1/async/trips/{trip.id}/logs/",
+            "trip.async_views.trip_logs_time_series": f"/api/v1/async/trips/{trip.id}/logs_time_series/",
+            "trip.async_views.trip_log_list": "/api/v1/async/trip-logs/",
+        }
+
+    def writes(self):
+        """Write requests by endpoint: (method, url, body). Each call moves on, so repeated writes stay valid."""
+        trip = Trip.objects.filter(company=self.company, status=Trip.ONGOING).first()
+        last = trip.log_entries.order_by("date_created").last()
+        moment, reading = last.date_created + timedelta(hours=1), last.odm_reading + 10
+
+        def entry(offset=0, **fields):
+            return {
+                "trip": trip.id, "category": TripLogEntry.DRIVING, "remarks": "", "location": {"lat": 40.0, "lng": -100.0},
+                "odm_reading": reading + offset, "date_created": (moment + timedelta(minutes=offset)).isoformat(), **fields,
+            }
+
+        return {
+            "TripViewSet.partial_update": ("patch", f"/api/v1/trips/{trip.id}/", {"shipper": "Shipper"}),
+            "TripLogEntryViewSet.create": ("post", "/api/v1/trip-logs/", entry()),
+            "TripLogEntryViewSet.update": ("put", f"/api/v1/trip-logs/{last.id}/", entry(remarks="Replaced")),
+            "TripLogEntryViewSet.partial_update": ("patch", f"/api/v1/trip-logs/{last.id}/", {"remarks": "Edited"}),
+            "TripLogEntryViewSet.bulk": (
+                "post", "/api/v1/trip-logs/bulk/", [entry(offset, client_id=uuid.uuid4().hex) for offset in range(1, 6)]
+            ),
+        }
+
+    def test_every_budget_is_exercised(self):
+        self.assertEqual(set(self.urls) | set(self.writes()), set(settings.QUERY_BUDGETS))
+
+    def test_writes_within_budget(self):
+        for endpoint in self.writes():
+            for state in ("cold", "warm"):
+                with self.subTest(endpoint=endpoint, cache=state):
+                    if state == "cold":
+                        cache.clear()
+                    method, url, body = self.writes()[endpoint]
+                    response = getattr(self.client, method)(url, body, content_type="application/json", headers=self.headers)
+                    self.assertIn(response.status_code, (200, 201), response.content)
+
+    def test_change_counter_is_locked_last(self):
+        """Writes take the company's change counter lock in their last statements, right before they commit."""
+        for endpoint, (method, url, body) in self.writes().items():
+            with self.subTest(endpoint=endpoint), CaptureQueriesContext(connection) as queries:
+                getattr(self.client, method)(url, body, content_type="application/json", headers=self.headers)
+            # Savepoints stand in for the commit inside the test's transaction.
+            statements = [query["sql"] for query in queries if "SAVEPOINT" not in query["sql"]]
+            locked = next(index for index, sql in enumerate(statements) if sql.startswith('UPDATE "trip_changecounter"'))
+            # The counter update, reading the sequence it reached and the upsert of the changes.
+            self.assertEqual(len(statements) - locked, 3, statements[locked:])
+
+    def test_sync_endpoints_within_budget(self):
+        for endpoint, url in self.urls.items():
+            if endpoint.startswith("trip.async_views."):
+                continue
+            for state in ("cold", "warm"):
+                with self.subTest(endpoint=endpoint, cache=state):
+                    if state == "cold":
+                        cache.clear()
+                    # `QueryBudgetExceeded` propagates out of the test client.
+                    response = self.client.get(url, headers=self.headers)
+                    self.assertEqual(response.status_code, 200)
+
+    async def test_async_endpoints_within_budget(self):
+        for endpoint, url in self.urls.items():
+            if not endpoint.startswith("trip.async_views."):
+                continue
+            for state in ("cold", "warm"):
+                with self.subTest(endpoint=endpoint, cache=state):
+                    if state == "cold":
+                        await cache.aclear()
+                    response = await self.async_client.get(url, headers=self.headers)
+                    self.assertEqual(response.status_code, 200)
+
+
+START = datetime(2026, 3, 2, 6, 0, tzinfo=dt_timezone.utc)
+
+
+def at(hours):
+    """`START` plus `hours`."""
+    return START + timedelta(hours=hours)
+
+
+def create_fleet(name):
+    """A company with its admin, one driver and the driver's vehicle."""
+    admin = User.objects.create(
+        email=f"admin@{name}.example", first_name="Ada", last_name="Admin", phone_number="0000000000"
+    )
+    company = Company.objects.create(
+        name=name, main_office_address="1 Depot Road", phone_number="0000000000",
+        email=f"office@{name}.example", created_by=admin,
+    )
+    company.admins.add(admin)
+    driver = create_driver(company, admin, f"driver@{name}.example")
+    vehicle = Vehicle.objects.create(
+        company=company, truck_number=f"TRK-{name}", license_plate=f"PL-{name}",
+        state_of_registration="TX", created_by=admin,
+    )
+    vehicle.drivers.add(driver)
+    return company, admin, driver, vehicle
+
+
+def create_driver(company, admin, email):
+    user = User.objects.create(email=email, first_name="Dan", last_name="Driver", phone_number="0000000000")
+    return DriverProfile.objects.create(
+        user=user, company=company, license_number=f"LIC-{email}", home_terminal="Terminal 1", created_by=admin
+    )
+
+
+def create_trip(company, driver, vehicle, manifest_no, start_mileage=1000, **fields):
+    """A trip started an hour before `START`; `start_date` is auto_now_add, so it is moved afterwards."""
+    trip = Trip.objects.create(
+        company=company, driver=driver, vehicle=vehicle, end_date=at(240),
+        starting_location={"lat": 40.0, "lng": -100.0}, ending_location={"lat": 41.0, "lng": -100.0},
+        start_mileage=start_mileage, manifest_no=manifest_no, **{"shipper": "Shipper", "commodity": "Freight", **fields},
+    )
+    Trip.all_objects.filter(pk=trip.pk).update(start_date=at(-1))
+    rebuild_rollups([trip.id])
+    trip.refresh_from_db()
+    return trip
+
+
+def add_entry(trip, hours, category, odm_reading=None, lat=40.0, lng=-100.0):
+    return TripLogEntry.objects.create(
+        trip=trip, category=category, remarks="", location={"lat": lat, "lng": lng},
+        odm_reading=odm_reading, date_created=at(hours),
+    )
+
+
+class FleetTestCase(TestCase):
+    """A company with one ongoing trip, seen by its admin through the API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.admin, cls.driver, cls.vehicle = create_fleet("acme")
+        cls.trip = create_trip(cls.company, cls.driver, cls.vehicle, "MF-1")
+
+    def setUp(self):
+        # Ids are reused once a test's transaction rolls back, so nothing cached may outlive a test.
+        cache.clear()
+        local_tokens.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def reload_trip(self):
+        self.trip.refresh_from_db()
+        return self.trip
+
+
+def legacy_time_series(trip):
+    """The series `logs_time_series` built from the log entries on every request before `trip.timeline`."""
+    logs = (
+        TripLogEntry.objects.filter(trip=trip, deleted=False)
+        .annotate(date=TruncDate("date_created"))
+        .order_by("date_created")
+        .values(*LOG_FIELDS, "date")
+    )
+    grouped_logs = {}
+    previous_data = {"category": TripLogEntry.OFF_DUTY}
+    log_date = None
+
+    for log in logs:
+        log_date = log["date"]
+        if log_date not in grouped_logs:
+            previous_data["date_created"] = start_of_day(log_date)
+            grouped_logs[log_date] = []
+        grouped_logs[log_date].append({**previous_data, "from": previous_data["date_created"], "to": log["date_created"]})
+        previous_data = log
+
+    complete = previous_data["category"] in [TripLogEntry.SLEEPER_BERTH, TripLogEntry.OFF_DUTY]
+    grouped_logs[log_date].append({
+        **previous_data,
+        "from": previous_data["date_created"],
+        "to": end_of_day(log_date) if complete else previous_data["date_created"],
+    })
+    return json.loads(json.dumps({str(date): series for date, series in grouped_logs.items()}, cls=JSONEncoder))
+
+
+class TimelineTests(FleetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Three days: a full duty day, a short one after the sleeper berth, and a rest on the last.
+        for hours, category, reading in [
+            (0, TripLogEntry.ON_DUTY, 1000),
+            (0.5, TripLogEntry.DRIVING, 1000),
+            (5, TripLogEntry.OFF_DUTY, 1250),
+            (6, TripLogEntry.DRIVING, 1250),
+            (11, TripLogEntry.SLEEPER_BERTH, 1520),
+            (23, TripLogEntry.ON_DUTY, 1520),
+            (23.5, TripLogEntry.DRIVING, 1520),
+            (50, TripLogEntry.OFF_DUTY, 1800),
+        ]:
+            add_entry(cls.trip, hours, category, reading)
+
+    def time_series(self, **params):
+        return self.api.get(f"/api/v1/trips/{self.trip.id}/logs_time_series/", params)
+
+    def assertMatchesLegacy(self):
+        response = self.time_series()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), legacy_time_series(self.trip))
+        # The days refreshed write by write are the days a full rebuild produces.
+        stored = {day.date: day.segments for day in self.trip.log_days.all()}
+        rebuilt = build_trip_days(live_log_values(self.trip.id))
+        self.assertEqual(stored, {day: json.loads(json.dumps(segments, cls=JSONEncoder)) for day, segments in rebuilt.items()})
+
+    def test_matches_legacy_output(self):
+        self.assertEqual(list(self.time_series().json()), ["2026-03-02", "2026-03-03", "2026-03-04"])
+        self.assertMatchesLegacy()
+
+    def test_matches_legacy_output_after_each_write(self):
+        # The last status of a day opens the next one.
+        sleeper = self.trip.log_entries.get(category=TripLogEntry.SLEEPER_BERTH)
+        sleeper.category = TripLogEntry.OFF_DUTY
+        sleeper.save()
+        self.assertMatchesLegacy()
+
+        entry = add_entry(self.trip, 24, TripLogEntry.ON_DUTY, 1600)
+        self.assertMatchesLegacy()
+
+        # Moved to a new last day: the old last day loses its closing segment.
+        entry.date_created = at(75)
+        entry.odm_reading = 1900
+        entry.save()
+        self.assertMatchesLegacy()
+
+        entry.delete()
+        self.assertMatchesLegacy()
+
+        first = self.trip.log_entries.order_by("date_created").first()
+        first.deleted = True
+        first.save()
+        self.assertMatchesLegacy()
+
+    def test_bulk_upload_refreshes_days(self):
+        response = self.api.post("/api/v1/trip-logs/bulk/", [
+            {
+                "trip": self.trip.id, "client_id": "late", "category": TripLogEntry.DRIVING, "remarks": "",
+                "location": {"lat": 40.0, "lng": -100.0}, "odm_reading": 1800, "date_created": at(51).isoformat(),
+            },
+        ], format="json")
+        self.assertEqual(response.json()[0]["status"], CREATED)
+        self.assertMatchesLegacy()
+
+    def test_last_segment_stays_open_while_on_duty(self):
+        add_entry(self.trip, 52, TripLogEntry.DRIVING, 1800)
+        last = self.time_series().json()["2026-03-04"][-1]
+        self.assertEqual(last["from"], last["to"])
+        self.assertMatchesLegacy()
+
+    def test_single_day(self):
+        response = self.time_series(date="2026-03-03")
+        self.assertEqual(response.json(), {"2026-03-03": legacy_time_series(self.trip)["2026-03-03"]})
+        self.assertEqual(self.time_series(date="March").status_code, 400)
+
+
+class BulkIngestTests(FleetTestCase):
+    url = "/api/v1/trip-logs/bulk/"
+
+    def item(self, client_id, hours, odm_reading, **fields):
+        return {
+            "trip": self.trip.id, "client_id": client_id, "category": TripLogEntry.DRIVING, "remarks": "",
+            "location": {"lat": 40.0, "lng": -100.0}, "odm_reading": odm_reading, "date_created": at(hours).isoformat(),
+            **fields,
+        }
+
+    def upload(self, items):
+        response = self.api.post(self.url, items, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_replayed_upload_is_not_stored_twice(self):
+        items = [self.item("a", 1, 1000), self.item("b", 2, 1050)]
+        first = self.upload(items)
+        self.assertEqual([result["status"] for result in first], [CREATED, CREATED])
+
+        again = self.upload(items)
+        self.assertEqual([result["status"] for result in again], [DUPLICATE, DUPLICATE])
+        self.assertEqual([result["id"] for result in again], [result["id"] for result in first])
+        self.assertEqual(self.trip.log_entries.count(), 2)
+
+    def test_soft_deleted_entries_are_duplicates(self):
+        entry_id = self.upload([self.item("a", 1, 1000)])[0]["id"]
+        TripLogEntry.objects.filter(pk=entry_id).update(deleted=True)
+        self.assertEqual(self.upload([self.item("a", 1, 1000)]), [
+            {"index": 0, "client_id": "a", "status": DUPLICATE, "id": entry_id},
+        ])
+
+    def test_repeat_within_batch_mirrors_its_first_occurrence(self):
+        results = self.upload([self.item("a", 1, 1000), self.item("a", 1, 1000), self.item("b", 2, 1050)])
+        self.assertEqual([result["status"] for result in results], [CREATED, DUPLICATE, CREATED])
+        self.assertEqual(results[1]["id"], results[0]["id"])
+        self.assertEqual(self.trip.log_entries.count(), 2)
+
+    def test_repeat_of_invalid_item_is_invalid(self):
+        results = self.upload([self.item("low", 1, 900), self.item("low", 1, 900)])
+        self.assertEqual([result["status"] for result in results], [INVALID, INVALID])
+        self.assertEqual(results[1]["errors"], results[0]["errors"])
+        self.assertIn("odm_reading", results[0]["errors"])
+        self.assertFalse(self.trip.log_entries.exists())
+
+    def test_invalid_items_do_not_block_the_rest(self):
+        company, _, driver, vehicle = create_fleet("globex")
+        other = create_trip(company, driver, vehicle, "MF-OTHER")
+        results = self.upload([
+            self.item("a", 1, 1000),
+            self.item("no-category", 2, 1000, category="FLYING"),
+            self.item("foreign", 2, 1000, trip=other.id),
+            self.item("early", -2, 1000),
+        ])
+        self.assertEqual([result["status"] for result in results], [CREATED, INVALID, INVALID, INVALID])
+        self.assertIn("category", results[1]["errors"])
+        self.assertIn("trip", results[2]["errors"])
+        self.assertIn("date_created", results[3]["errors"])
+        self.assertEqual(self.trip.log_entries.count(), 1)
+
+    def test_batch_is_checked_against_itself_and_stored_readings(self):
+        add_entry(self.trip, 10, TripLogEntry.DRIVING, 1500)
+        results = self.upload([self.item("a", 2, 1100), self.item("b", 3, 1050), self.item("c", 11, 1400)])
+        self.assertEqual([result["status"] for result in results], [CREATED, INVALID, INVALID])
+
+    def test_entries_stored_concurrently_are_duplicates(self):
+        first = self.upload([self.item("a", 1, 1000), self.item("b", 2, 1050)])
+        stored = {(self.trip.id, result["client_id"]): result["id"] for result in first}
+        # Other uploads stored "a", then "b", after each look: both inserts fail, and the third look sees them.
+        looks = [{}, {(self.trip.id, "a"): stored[(self.trip.id, "a")]}]
+        real = bulk._stored_entries
+        with mock.patch("trip.bulk._stored_entries", side_effect=lambda *args: looks.pop(0) if looks else real(*args)) as look:
+            results = self.upload([self.item("a", 1, 1000), self.item("b", 2, 1050), self.item("c", 3, 1100)])
+        self.assertEqual(look.call_count, 3)
+        self.assertEqual([result["status"] for result in results], [DUPLICATE, DUPLICATE, CREATED])
+        self.assertEqual([result["id"] for result in results[:2]], [result["id"] for result in first])
+        self.assertEqual(self.trip.log_entries.count(), 3)
+
+    def test_rejects_empty_and_oversized_batches(self):
+        self.assertEqual(self.api.post(self.url, [], format="json").status_code, 400)
+        self.assertEqual(self.api.post(self.url, {"trip": self.trip.id}, format="json").status_code, 400)
+        items = [self.item(str(index), 1, 1000) for index in range(BULK_LOG_ENTRY_LIMIT + 1)]
+        self.assertEqual(self.api.post(self.url, items, format="json").status_code, 400)
+
+
+class SyncTests(FleetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.entries = [add_entry(cls.trip, hours, TripLogEntry.DRIVING, 1000 + hours) for hours in range(3)]
+        cls.other_driver = create_driver(cls.company, cls.admin, "other@acme.example")
+        cls.other_vehicle = Vehicle.objects.create(
+            company=cls.company, truck_number="TRK-other", license_plate="PL-other",
+            state_of_registration="TX", created_by=cls.admin,
+        )
+        cls.other_vehicle.drivers.add(cls.other_driver)
+        cls.other_trip = create_trip(cls.company, cls.other_driver, cls.other_vehicle, "MF-2")
+        cls.other_entry = add_entry(cls.other_trip, 1, TripLogEntry.DRIVING, 1000)
+
+    def sync(self, **params):
+        response = self.api.get("/api/v1/sync/", {"company": self.company.id, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    @staticmethod
+    def ids(records):
+        return [record["id"] for record in records]
+
+    def test_first_sync_returns_everything_once(self):
+        entry = self.entries[0]
+        for remarks in ("one", "two", "three"):
+            entry.remarks = remarks
+            entry.save()
+
+        data = self.sync(since=0)
+        self.assertFalse(data["has_more"])
+        self.assertEqual(sorted(self.ids(data["trips"])), sorted([self.trip.id, self.other_trip.id]))
+        self.assertEqual(sorted(self.ids(data["log_entries"])), sorted([e.id for e in [*self.entries, self.other_entry]]))
+        self.assertEqual(sorted(self.ids(data["drivers"])), sorted([self.driver.id, self.other_driver.id]))
+        self.assertEqual(sorted(self.ids(data["vehicles"])), sorted([self.vehicle.id, self.other_vehicle.id]))
+        self.assertEqual(data["log_entries"][-1]["id"], entry.id)
+        self.assertEqual(data["removed"], {"trips": [], "log_entries": [], "vehicles": [], "drivers": []})
+
+    def test_since_cursor_returns_only_later_changes(self):
+        cursor = self.sync()["cursor"]
+        self.assertEqual(self.sync(since=cursor)["log_entries"], [])
+
+        entry = self.entries[1]
+        entry.remarks = "flat tyre"
+        entry.save()
+        data = self.sync(since=cursor)
+        self.assertEqual(self.ids(data["log_entries"]), [entry.id])
+        self.assertEqual(data["log_entries"][0]["remarks"], "flat tyre")
+        self.assertGreater(data["cursor"], cursor)
+        self.assertEqual(self.sync(since=data["cursor"])["log_entries"], [])
+
+    def test_pages_follow_the_cursor(self):
+        everything = self.sync(since=0)
+        seen, cursor, pages = [], 0, 0
+        while True:
+            page = self.sync(since=cursor, limit=2)
+            pages += 1
+            seen.extend(self.ids(page["log_entries"]))
+            cursor = page["cursor"]
+            if not page["has_more"]:
+                break
+        self.assertGreater(pages, 1)
+        self.assertEqual(cursor, everything["cursor"])
+        self.assertEqual(sorted(seen), sorted(self.ids(everything["log_entries"])))
+
+    def test_deleted_records_are_removed(self):
+        cursor = self.sync()["cursor"]
+        entry_id = self.entries[2].id
+        self.entries[2].delete()
+
+        data = self.sync(since=cursor)
+        self.assertEqual(data["log_entries"], [])
+        self.assertEqual(data["removed"]["log_entries"], [entry_id])
+
+    def test_soft_deleted_records_are_sent_as_deleted(self):
+        cursor = self.sync()["cursor"]
+        entry = self.entries[0]
+        entry.deleted = True
+        entry.save()
+
+        data = self.sync(since=cursor)
+        self.assertEqual(self.ids(data["log_entries"]), [entry.id])
+        self.assertTrue(data["log_entries"][0]["deleted"])
+
+    def test_drivers_only_see_their_own_records(self):
+        self.api.force_authenticate(self.driver.user)
+        data = self.sync(since=0)
+        self.assertEqual(self.ids(data["trips"]), [self.trip.id])
+        self.assertEqual(sorted(self.ids(data["log_entries"])), sorted(entry.id for entry in self.entries))
+        self.assertEqual(self.ids(data["vehicles"]), [self.vehicle.id])
+        self.assertEqual(self.ids(data["drivers"]), [self.driver.id])
+        self.assertIn(self.other_trip.id, data["removed"]["trips"])
+        self.assertIn(self.other_entry.id, data["removed"]["log_entries"])
+
+    def test_rejects_negative_cursors_and_outsiders(self):
+        self.assertEqual(self.api.get("/api/v1/sync/", {"company": self.company.id, "since": -1}).status_code, 400)
+        _, outsider, _, _ = create_fleet("globex")
+        self.api.force_authenticate(outsider)
+        self.assertEqual(self.api.get("/api/v1/sync/", {"company": self.company.id}).status_code, 403)
+
+
+class OdometerTests(FleetTestCase):
+    url = "/api/v1/trip-logs/"
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.morning = add_entry(cls.trip, 0, TripLogEntry.DRIVING, 1000)
+        cls.noon = add_entry(cls.trip, 6, TripLogEntry.DRIVING, 1300)
+
+    def post_entry(self, hours, odm_reading, trip=None):
+        return self.api.post(self.url, {
+            "trip": (trip or self.trip).id, "category": TripLogEntry.DRIVING, "remarks": "",
+            "location": {"lat": 40.0, "lng": -100.0}, "odm_reading": odm_reading, "date_created": at(hours).isoformat(),
+        }, format="json")
+
+    def test_reading_between_neighbours_is_accepted(self):
+        self.assertEqual(self.post_entry(3, 1000).status_code, 201)
+        self.assertEqual(self.post_entry(4, 1300).status_code, 201)
+        self.assertEqual(self.post_entry(7, 1300).status_code, 201)
+
+    def test_reading_out_of_order_is_rejected(self):
+        for hours, reading, message in [
+            (3, 999, "below the trip's start mileage"),
+            (7, 1200, "below the previous reading"),
+            (3, 1400, "above the next reading"),
+        ]:
+            with self.subTest(reading=reading):
+                response = self.post_entry(hours, reading)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, response.json()["odm_reading"][0])
+
+    def test_entry_dated_outside_the_trip_is_rejected(self):
+        response = self.post_entry(-2, 1000)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("date_created", response.json())
+
+        Trip.all_objects.filter(pk=self.trip.pk).update(status=Trip.COMPLETED, end_date=at(8))
+        self.assertEqual(self.post_entry(7, 1300).status_code, 201)
+        response = self.post_entry(8, 1300)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("date_created", response.json())
+
+    def test_moving_an_entry_is_checked_against_its_new_neighbours(self):
+        response = self.api.patch(f"{self.url}{self.morning.id}/", {"date_created": at(7).isoformat()}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("odm_reading", response.json())
+
+    def test_legacy_out_of_order_entry_can_still_be_edited(self):
+        TripLogEntry.objects.filter(pk=self.noon.pk).update(odm_reading=900)
+
+        response = self.api.patch(f"{self.url}{self.noon.id}/", {"remarks": "checked"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        response = self.api.patch(f"{self.url}{self.noon.id}/", {"odm_reading": 950}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.api.patch(f"{self.url}{self.noon.id}/", {"odm_reading": 1300}, format="json").status_code, 200)
+
+    def test_restore_checks_the_reading(self):
+        self.noon.deleted = True
+        self.noon.save()
+        add_entry(self.trip, 5, TripLogEntry.DRIVING, 1400)
+        self.assertEqual(self.api.post(f"{self.url}{self.noon.id}/restore/").status_code, 400)
+
+    def test_audits_find_inconsistent_and_misdated_entries(self):
+        TripLogEntry.objects.filter(pk=self.noon.pk).update(odm_reading=900)
+        early = add_entry(self.trip, -3, TripLogEntry.DRIVING)
+        self.assertEqual([row["id"] for row in inconsistent_readings()], [self.noon.id])
+        self.assertEqual([row["id"] for row in misdated_entries()], [early.id])
+
+        Trip.all_objects.filter(pk=self.trip.pk).update(status=Trip.COMPLETED, end_date=at(6))
+        self.assertEqual([row["id"] for row in misdated_entries()], [early.id, self.noon.id])
+
+
+class RouteTests(FleetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Due north along one meridian: a degree of latitude, about 69.09 miles.
+        add_entry(cls.trip, 0, TripLogEntry.DRIVING, 1000, lat=40.0)
+        add_entry(cls.trip, 1, TripLogEntry.DRIVING, None, lat=40.5)
+        add_entry(cls.trip, 2, TripLogEntry.OFF_DUTY, 1070, lat=41.0)
+
+    def route(self, **params):
+        response = self.api.get(f"/api/v1/trips/{self.trip.id}/route/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_distances_and_reconciliation(self):
+        route = self.route()
+        self.assertEqual(route["points"], 3)
+        self.assertAlmostEqual(route["distance_miles"], 69.09, delta=0.02)
+        self.assertAlmostEqual(route["straight_line_miles"], 69.09, delta=0.02)
+        self.assertEqual(route["odometer_miles"], 70)
+        [leg] = route["reconciliation"]
+        self.assertEqual(leg["odometer_miles"], 70)
+        self.assertAlmostEqual(leg["difference_miles"], 0.91, delta=0.02)
+        # Collinear points simplify to the end points.
+        self.assertEqual(route["polyline"], [[40.0, -100.0], [41.0, -100.0]])
+
+    def test_route_follows_new_entries(self):
+        self.assertEqual(self.route()["points"], 3)
+        add_entry(self.trip, 3, TripLogEntry.DRIVING, 1070, lat=41.0, lng=-99.0)
+        route = self.route()
+        self.assertEqual(route["points"], 4)
+        self.assertEqual(route["polyline"][-1], [41.0, -99.0])
+
+    def test_tolerance(self):
+        add_entry(self.trip, 3, TripLogEntry.DRIVING, 1070, lat=41.5, lng=-99.99)
+        add_entry(self.trip, 4, TripLogEntry.DRIVING, 1110, lat=42.0, lng=-100.0)
+        # The detour pulls the points before it off the line to the end too.
+        self.assertEqual(len(self.route()["polyline"]), 4)
+        self.assertEqual(len(self.route(tolerance_m=5000)["polyline"]), 2)
+
+    def test_routes_of_a_page_of_trips(self):
+        response = self.api.get("/api/v1/trips/routes/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([route["trip"] for route in response.json()["results"]], [self.trip.id])
+
+    def test_simplify(self):
+        self.assertEqual(simplify([[40.0, -100.0], [40.1, -100.0]]), [[40.0, -100.0], [40.1, -100.0]])
+        # About 850 m off the line from the first to the last point.
+        detour = [[40.0, -100.0], [40.05, -99.99], [40.1, -100.0]]
+        self.assertEqual(simplify(detour), detour)
+        self.assertEqual(simplify(detour, tolerance_m=1000), [detour[0], detour[-1]])
+        zigzag = [[40.0 + index / 100, -100.0 + (index % 2) / 100] for index in range(9)]
+        self.assertEqual(simplify(zigzag), zigzag)
+        self.assertEqual(simplify([[40.0, -100.0]] * 4), [[40.0, -100.0]] * 2)
+
+
+class ConditionalGetTests(FleetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.entry = add_entry(cls.trip, 0, TripLogEntry.DRIVING, 1000)
+
+    def test_etag_and_not_modified(self):
+        url = f"/api/v1/trips/{self.trip.id}/"
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+
+        for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+            with self.subTest(header=header):
+                response = self.api.get(url, HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+                self.assertEqual(response.content, b"")
+
+        self.assertEqual(self.api.get(url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_writes_change_the_etag(self):
+        url = f"/api/v1/trips/{self.trip.id}/logs/"
+        etag = self.api.get(url)["ETag"]
+
+        self.entry.remarks = "updated"
+        self.entry.save()
+        response = self.api.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["results"][0]["remarks"], "updated")
+
+        self.vehicle.state_of_registration = "OK"
+        self.vehicle.save()
+        self.assertEqual(self.api.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+    def test_representations_have_their_own_etags(self):
+        base = f"/api/v1/trips/{self.trip.id}/"
+        etags = {
+            self.api.get(url)["ETag"]
+            for url in (base, f"{base}logs/", f"{base}logs/?page_size=1", f"{base}logs_time_series/")
+        }
+        self.assertEqual(len(etags), 4)
+
+    async def test_async_endpoints(self):
+        token = await sync_to_async(create_access_token)(self.admin)
+        headers = {"Authorization": f"Bearer {token.token}"}
+        etags = {}
+        for url in (
+            f"/api/v1/async/trips/{self.trip.id}/",
+            f"/api/v1/async/trips/{self.trip.id}/logs/",
+            f"/api/v1/async/trips/{self.trip.id}/logs_time_series/",
+        ):
+            with self.subTest(url=url):
+                response = await self.async_client.get(url, headers=headers)
+                self.assertEqual(response.status_code, 200)
+                etags[url] = response["ETag"]
+
+                response = await self.async_client.get(url, headers={**headers, "If-None-Match": etags[url]})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etags[url])
+
+
+        await sync_to_async(add_entry)(self.trip, 1, TripLogEntry.DRIVING, 1050)
+        for url, etag in etags.items():
+            with self.subTest(url=url, written=True):
+                response = await self.async_client.get(url, headers={**headers, "If-None-Match": etag})
+                self.assertEqual(response.status_code, 200)
+
+
+class RollupTests(FleetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # 2 March 08:00 driving, 18:00 off duty; 3 March 06:00 driving, 10:00 off duty.
+        add_entry(cls.trip, 2, TripLogEntry.DRIVING, 1000)
+        add_entry(cls.trip, 12, TripLogEntry.OFF_DUTY, 1550)
+        add_entry(cls.trip, 24, TripLogEntry.DRIVING, 1550)
+        add_entry(cls.trip, 28, TripLogEntry.OFF_DUTY, 1770)
+
+    def daily(self):
+        rows = DailyRollup.objects.filter(trip=self.trip).order_by("date")
+        return {
+            str(row["date"]): row
+            for row in rows.values("date", "miles", "trips_started", *HOURS_FIELDS.values())
+        }
+
+    def hours(self, row):
+        return {field.removesuffix("_hours"): round(row[field], 6) for field in HOURS_FIELDS.values() if row[field]}
+
+    def assertFullDays(self):
+        """Every day but the first (which starts at the first entry) and an open last one accounts for 24 hours."""
+        days = list(self.daily().values())
+        last = self.trip.log_entries.order_by("date_created").last()
+        for row in days[1:] if last.category in REST_CATEGORIES else days[1:-1]:
+            with self.subTest(day=row["date"]):
+                self.assertAlmostEqual(sum(row[field] for field in HOURS_FIELDS.values()), 24)
+        # What the writes refreshed is what a rebuild computes.
+        rebuild_rollups([self.trip.id])
+        self.assertEqual(list(self.daily().values()), days)
+
+    def test_hours_run_from_entry_to_entry(self):
+        daily = self.daily()
+        self.assertEqual(self.hours(daily["2026-03-02"]), {"driving": 10, "off_duty": 6})
+        self.assertEqual(self.hours(daily["2026-03-03"]), {"off_duty": 20, "driving": 4})
+        self.assertEqual([row["miles"] for row in daily.values()], [550, 220])
+        self.assertEqual([row["trips_started"] for row in daily.values()], [1, 0])
+        self.assertFullDays()
+
+    def test_days_without_entries_are_counted(self):
+        add_entry(self.trip, 76, TripLogEntry.ON_DUTY, 1770)
+        daily = self.daily()
+        self.assertEqual(list(daily), ["2026-03-02", "2026-03-03", "2026-03-04", "2026-03-05"])
+        self.assertEqual(self.hours(daily["2026-03-04"]), {"off_duty": 24})
+        self.assertEqual(self.hours(daily["2026-03-05"]), {"off_duty": 10})
+        self.assertEqual(daily["2026-03-04"]["miles"], 0)
+        self.assertFullDays()
+
+    def test_open_last_status_is_not_counted_yet(self):
+        entry = add_entry(self.trip, 30, TripLogEntry.DRIVING, 1770)
+        self.assertEqual(self.hours(self.daily()["2026-03-03"]), {"off_duty": 8, "driving": 4})
+
+        entry.delete()
+        self.assertEqual(self.hours(self.daily()["2026-03-03"]), {"off_duty": 20, "driving": 4})
+
+    def test_writes_keep_every_day_whole(self):
+        moved = add_entry(self.trip, 50, TripLogEntry.SLEEPER_BERTH, 1800)
+        self.assertFullDays()
+
+        moved.date_created = at(100)
+        moved.save()
+        self.assertEqual(list(self.daily())[-1], "2026-03-06")
+        self.assertFullDays()
+
+        moved.delete()
+        self.assertEqual(list(self.daily()), ["2026-03-02", "2026-03-03"])
+        self.assertFullDays()
+
+        first = self.trip.log_entries.order_by("date_created")[1]
+        first.category = TripLogEntry.ON_DUTY
+        first.save()
+        self.assertEqual(self.hours(self.daily()["2026-03-03"]), {"on_duty": 6, "driving": 4, "off_duty": 14})
+        self.assertFullDays()
+
+    def test_remark_edits_leave_rollups_and_live_status_alone(self):
+        def tables_written(**changes):
+            entry = self.trip.log_entries.order_by("date_created").first()
+            with CaptureQueriesContext(connection) as queries:
+                self.api.patch(f"/api/v1/trip-logs/{entry.id}/", changes, format="json")
+            return {table for query in queries for table in ("dailyrollup", "livestatus", "triplogday") if table in query["sql"]}
+
+        self.assertEqual(tables_written(remarks="Weigh station"), {"triplogday"})
+        self.assertEqual(tables_written(category=TripLogEntry.ON_DUTY), {"dailyrollup", "livestatus", "triplogday"})
+        self.assertEqual(self.hours(self.daily()["2026-03-02"]), {"on_duty": 10, "off_duty": 6})
+        self.assertFullDays()
+
+    def test_monthly_rollups_and_reports(self):
+        add_entry(self.trip, 76, TripLogEntry.ON_DUTY, 1770)
+        monthly = MonthlyRollup.objects.get(driver=self.driver, vehicle=self.vehicle, month=date(2026, 3, 1))
+        self.assertEqual(monthly.miles, 770)
+        self.assertAlmostEqual(monthly.driving_hours, 14)
+        self.assertAlmostEqual(monthly.off_duty_hours, 60)
+
+        for url in (
+            f"/api/v1/companies/{self.company.id}/report/",
+            f"/api/v1/drivers/{self.driver.id}/report/",
+            f"/api/v1/vehicles/{self.vehicle.id}/report/",
+        ):
+            with self.subTest(url=url):
+                report = self.api.get(url, {"period": "day", "date_from": "2026-03-03"}).json()
+                self.assertEqual([period["start"] for period in report["periods"]], ["2026-03-03", "2026-03-04", "2026-03-05"])
+                self.assertEqual(report["totals"]["miles"], 220)
+                self.assertEqual(report["totals"]["off_duty_hours"], 54)
+
+
+class LocationSearchTests(TestCase):
+    """Entries on a 9 x 9 grid, 0.1 degree apart, around (40, -100), plus two far away."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.admin, driver, vehicle = create_fleet("acme")
+        cls.trip = create_trip(cls.company, driver, vehicle, "MF-1")
+        for index in range(81):
+            add_entry(cls.trip, index, TripLogEntry.ON_DUTY, lat=39.6 + index // 9 / 10, lng=-100.4 + index % 9 / 10)
+        cls.east = add_entry(cls.trip, 90, TripLogEntry.OFF_DUTY, lat=40.0, lng=-97.0)
+        cls.across = add_entry(cls.trip, 91, TripLogEntry.OFF_DUTY, lat=10.0, lng=179.9)
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def brute_force(self, lat, lng, radius_km, limit):
+        distances = sorted(
+            (haversine_km(lat, lng, entry.latitude, entry.longitude), entry.pk) for entry in TripLogEntry.objects.all()
+        )
+        return [(pk, distance) for distance, pk in distances if distance <= radius_km][:limit]
+
+    def test_nearest_matches_a_full_scan(self):
+        for lat, lng, radius_km, limit in [
+            (40.0, -100.0, 25, 10), (40.0, -100.0, 2000, 500), (40.03, -100.07, 40, 7),
+            (40.0, -98.0, 300, 3), (39.0, -101.0, 100, 1), (0.0, 0.0, 2000, 5),
+        ]:
+            with self.subTest(lat=lat, lng=lng, radius_km=radius_km, limit=limit):
+                hits = nearest(TripLogEntry.objects.all(), lat, lng, radius_km, limit)
+                self.assertEqual([pk for pk, _ in hits], [pk for pk, _ in self.brute_force(lat, lng, radius_km, limit)])
+
+    def test_nearest_stops_widening_once_it_has_enough_rows(self):
+        # Nine entries lie within 5 km of the centre: one search reads only those.
+        with self.assertNumQueries(1):
+            self.assertEqual(len(nearest(TripLogEntry.objects.all(), 40.0, -100.0, 2000, 1)), 1)
+        with self.assertNumQueries(4):
+            self.assertEqual(len(nearest(TripLogEntry.objects.all(), 40.0, -100.0, 2000, 500)), 82)
+
+    def test_near_endpoint(self):
+        response = self.api.get("/api/v1/trip-logs/near/?lat=40&lng=-97.01&radius_km=250&limit=2")
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([row["id"] for row in results], [self.east.id, self.brute_force(40, -97.01, 250, 2)[1][0]])
+        self.assertAlmostEqual(results[0]["distance_km"], 0.852, places=2)
+
+    def test_log_radius_is_capped(self):
+        self.assertEqual(self.api.get("/api/v1/trip-logs/near/?lat=40&lng=-100&radius_km=251").status_code, 400)
+        self.assertEqual(self.api.get("/api/v1/trips/near/?lat=40&lng=-100&radius_km=2000").status_code, 200)
+        self.assertEqual(self.api.get("/api/v1/trips/near/?lat=40&lng=-100&radius_km=2001").status_code, 400)
+
+    def test_trips_near_by_start_or_end(self):
+        url = "/api/v1/trips/near/?lat=41&lng=-100&radius_km=50"
+        self.assertEqual(self.api.get(url).json()["results"], [])
+        self.assertEqual([row["id"] for row in self.api.get(f"{url}&location=end").json()["results"]], [self.trip.id])
+
+    def test_within_box(self):
+        response = self.api.get("/api/v1/trip-logs/within/?min_lat=39.95&min_lng=-100.05&max_lat=40.15&max_lng=-99.85")
+        self.assertEqual(response.status_code, 200)
+        points = {(row["location"]["lat"], row["location"]["lng"]) for row in response.json()["results"]}
+        self.assertEqual(points, {(round(40 + row / 10, 1), round(-100 + column / 10, 1)) for row in (0, 1) for column in (0, 1)})
+
+    def test_within_box_across_the_antimeridian(self):
+        response = self.api.get("/api/v1/trip-logs/within/?min_lat=9&min_lng=179&max_lat=11&max_lng=-179")
+        self.assertEqual([row["id"] for row in response.json()["results"]], [self.across.id])
+        response = self.api.get("/api/v1/trip-logs/within/?min_lat=9&min_lng=-179&max_lat=11&max_lng=179")
+        self.assertEqual(response.json()["results"], [])
+
+
+DRIVING, ON_DUTY, OFF_DUTY = TripLogEntry.DRIVING, TripLogEntry.ON_DUTY, TripLogEntry.OFF_DUTY
+
+
+def duty_log(*periods, trip_id=1):
+    """Entries for back-to-back (hours, category) periods from `START`, closed by going off duty; with the end time."""
+    entries, hours = [], 0
+    for index, (length, category) in enumerate(periods):
+        entries.append({"id": index + 1, "trip_id": trip_id, "category": category, "date_created": at(hours)})
+        hours += length
+    entries.append({"id": len(periods) + 1, "trip_id": trip_id, "category": OFF_DUTY, "date_created": at(hours)})
+    return entries, at(hours)
+
+
+def cycle_days(days, category=ON_DUTY):
+    """`days` days of 14 hours on duty, each followed by the 10 hours off that start a new shift."""
+    return [period for _ in range(days) for period in ((14, category), (10, OFF_DUTY))]
+
+
+class HoursOfServiceTests(SimpleTestCase):
+    def violations(self, *periods, since=None):
+        entries, end = duty_log(*periods)
+        return [
+            (violation["rule"], violation["at"], violation["hours_over"])
+            for violation in evaluate_entries(entries, now=end, since=since)["violations"]
+        ]
+
+    def test_remaining_hours(self):
+        entries, end = duty_log((1, ON_DUTY), (4, DRIVING))
+        result = evaluate_entries(entries[:-1], now=end)
+        self.assertEqual(result["remaining"], {"driving": 7, "window": 9, "break": 4, "cycle": 65})
+        self.assertEqual(result["available_driving"], 4)
+        self.assertEqual((result["current_category"], result["since"]), (DRIVING, at(1)))
+        self.assertEqual(result["violations"], [])
+
+    def test_nothing_logged(self):
+        result = evaluate_entries([], now=START)
+        self.assertEqual(result["remaining"], {"driving": 11, "window": 14, "break": 8, "cycle": 70})
+        self.assertIsNone(result["current_category"])
+
+    def test_11_hour_driving_limit(self):
+        breaks = [(5, DRIVING), (0.5, OFF_DUTY), (5, DRIVING), (0.5, OFF_DUTY)]
+        self.assertEqual(self.violations(*breaks, (1, DRIVING)), [])
+        self.assertEqual(self.violations(*breaks, (2, DRIVING)), [("11_hour_driving", at(12), 1)])
+
+    def test_14_hour_window(self):
+        # Time on duty (not driving) counts towards the window, and the window does not stop for breaks.
+        self.assertEqual(self.violations((10, ON_DUTY), (4, DRIVING)), [])
+        self.assertEqual(self.violations((10, ON_DUTY), (5.5, DRIVING)), [("14_hour_window", at(14), 1.5)])
+        self.assertEqual(
+            self.violations((6, ON_DUTY), (2, OFF_DUTY), (5, DRIVING), (0.5, OFF_DUTY), (2, DRIVING)),
+            [("14_hour_window", at(14), 1.5)],
+        )
+
+    def test_10_hours_off_start_a_new_shift(self):
+        self.assertEqual(self.violations((10, ON_DUTY), (10, OFF_DUTY), (5.5, DRIVING)), [])
+        self.assertEqual(self.violations((10, ON_DUTY), (9.5, OFF_DUTY), (5.5, DRIVING)), [("14_hour_window", at(19.5), 5.5)])
+
+    def test_30_minute_break(self):
+        self.assertEqual(self.violations((9, DRIVING)), [("30_minute_break", at(8), 1)])
+        self.assertEqual(self.violations((4, DRIVING), (0.5, OFF_DUTY), (4.5, DRIVING)), [])
+        # Any 30 minutes not driving count, on duty too; shorter pauses do not.
+        self.assertEqual(self.violations((4, DRIVING), (0.5, ON_DUTY), (4.5, DRIVING)), [])
+        self.assertEqual(self.violations((4, DRIVING), (0.25, OFF_DUTY), (4.5, DRIVING)), [("30_minute_break", at(8.25), 0.5)])
+
+    def test_70_hour_cycle(self):
+        self.assertEqual(self.violations(*cycle_days(5)[:-1], (10, OFF_DUTY), (1, DRIVING)), [("cycle", at(120), 1)])
+        self.assertEqual(self.violations(*cycle_days(4), (13, ON_DUTY), (1, DRIVING)), [])
+
+    @override_settings(HOS_CYCLE="60_7")
+    def test_60_hour_cycle(self):
+        self.assertEqual(self.violations(*cycle_days(4), (5, DRIVING)), [("cycle", at(100), 1)])
+
+    def test_cycle_hours_leave_the_window(self):
+        # Rests too short for a restart; once the first day is over eight days ago, its 14 hours no longer count.
+        rest = [(33, OFF_DUTY), (0.5, ON_DUTY)]
+        self.assertEqual(self.violations(*cycle_days(5)[:-1], *rest * 2, (1, DRIVING)), [("cycle", at(177), 1)])
+        self.assertEqual(self.violations(*cycle_days(5)[:-1], *rest * 3, (1, DRIVING)), [])
+
+    def test_34_hour_restart(self):
+        self.assertEqual(self.violations(*cycle_days(5)[:-1], (34, OFF_DUTY), (1, DRIVING)), [])
+        self.assertEqual(self.violations(*cycle_days(5)[:-1], (33, OFF_DUTY), (1, DRIVING)), [("cycle", at(143), 1)])
+
+    def test_violations_before_since_are_dropped(self):
+        self.assertEqual(self.violations((9, DRIVING), since=at(8)), [("30_minute_break", at(8), 1)])
+        self.assertEqual(self.violations((9, DRIVING), since=at(8.5)), [])
+
+
+class EvaluateCompanyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, admin, cls.driver, vehicle = create_fleet("acme")
+        cls.rested = create_driver(cls.company, admin, "rested@acme.example")
+        cls.idle = create_driver(cls.company, admin, "idle@acme.example")
+        other_company, _, cls.outsider, other_vehicle = create_fleet("globex")
+
+        # The driver's day runs over two trips: 6 hours driving on the first and 3 more on the second.
+        first = create_trip(cls.company, cls.driver, vehicle, "MF-1")
+        second = create_trip(cls.company, cls.driver, vehicle, "MF-2")
+        add_entry(first, 0, DRIVING)
+        add_entry(second, 6, DRIVING)
+        add_entry(second, 9, OFF_DUTY)
+
+        rested_trip = create_trip(cls.company, cls.rested, vehicle, "MF-3")
+        add_entry(rested_trip, 0, DRIVING)
+        add_entry(rested_trip, 4, OFF_DUTY)
+
+        outsider_trip = create_trip(other_company, cls.outsider, other_vehicle, "MF-4")
+        add_entry(outsider_trip, 0, DRIVING)
+        cls.second = second
+
+    def test_drivers_are_evaluated_separately(self):
+        results = evaluate_company(self.company.id, since=START, now=at(12))
+        self.assertEqual(set(results), {self.driver.id, self.rested.id})
+
+        violations = results[self.driver.id]["violations"]
+        self.assertEqual([(violation["rule"], violation["at"], violation["trip"]) for violation in violations], [
+            ("30_minute_break", at(8), self.second.id),
+        ])
+        self.assertEqual(results[self.driver.id]["remaining"]["driving"], 2)
+
+        self.assertEqual(results[self.rested.id]["violations"], [])
+        self.assertEqual(results[self.rested.id]["remaining"]["driving"], 7)
+
+    def test_matches_the_per_driver_evaluation(self):
+        results = evaluate_company(self.company.id, since=START, now=at(12))
+        for driver in (self.driver, self.rested):
+            entries = TripLogEntry.objects.filter(trip__driver=driver).order_by("date_created").values(
+                "id", "trip_id", "category", "date_created"
+            )
+            self.assertEqual(results[driver.id], evaluate_entries(entries, now=at(12), since=START))
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.admin, driver, vehicle = create_fleet("acme")
+        cls.trip = create_trip(cls.company, driver, vehicle, "MF-1")
+        cls.entries = [
+            add_entry(cls.trip, 0, TripLogEntry.ON_DUTY),
+            add_entry(cls.trip, 1, TripLogEntry.DRIVING, 1000, lat=40.5, lng=-100.5),
+            add_entry(cls.trip, 6, TripLogEntry.OFF_DUTY, 1300),
+        ]
+        cls.removed = add_entry(cls.trip, 3, TripLogEntry.ON_DUTY, 1150)
+        cls.removed.deleted = True
+        cls.removed.save()
+
+        other_company, _, other_driver, other_vehicle = create_fleet("globex")
+        add_entry(create_trip(other_company, other_driver, other_vehicle, "MF-2"), 2, TripLogEntry.DRIVING, 1000)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.api.get("/api/v1/trip-logs/export/", {"company": self.company.id, **params})
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, body = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(response["Content-Disposition"], f'attachment; filename="trip-logs-{self.company.id}.csv"')
+
+        header, *rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(header, EXPORT_NAMES)
+        rows = [dict(zip(header, row)) for row in rows]
+        self.assertEqual([int(row["id"]) for row in rows], [entry.id for entry in self.entries])
+        self.assertEqual(rows[1]["manifest_no"], "MF-1")
+        self.assertEqual(rows[1]["date_created"], at(1).isoformat())
+        self.assertEqual(json.loads(rows[1]["location"]), {"lat": 40.5, "lng": -100.5})
+        self.assertEqual([row["odm_reading"] for row in rows], ["", "1000", "1300"])
+
+    def test_ndjson(self):
+        response, body = self.export(file_format="ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row["id"] for row in rows], [entry.id for entry in self.entries])
+        self.assertEqual(rows[1]["location"], {"lat": 40.5, "lng": -100.5})
+        self.assertEqual(rows[1]["driver_first_name"], "Dan")
+
+    def test_filters_and_deleted_entries(self):
+        _, body = self.export(file_format="ndjson", category=TripLogEntry.DRIVING)
+        self.assertEqual([json.loads(line)["id"] for line in body.splitlines()], [self.entries[1].id])
+
+        _, body = self.export(file_format="ndjson", deleted="true")
+        self.assertEqual([(json.loads(line)["id"], json.loads(line)["deleted"]) for line in body.splitlines()], [(self.removed.id, True)])
+
+    def test_only_company_admins_export(self):
+        self.assertEqual(self.api.get("/api/v1/trip-logs/export/").status_code, 400)
+        self.assertEqual(self.api.get("/api/v1/trip-logs/export/", {"company": self.company.id, "file_format": "xml"}).status_code, 400)
+        self.api.force_authenticate(self.trip.driver.user)
+        self.assertEqual(self.api.get("/api/v1/trip-logs/export/", {"company": self.company.id}).status_code, 403)
+
+    async def test_asgi_export_streams_the_same_rows_in_chunks(self):
+        rows = export_rows(TripLogEntry.objects.filter(trip__company_id=self.company.id))
+        chunks = [chunk async for chunk in astream_export(CSVExport(), rows, chunk_size=2)]
+        expected = await sync_to_async(lambda: "".join(stream_export(CSVExport(), rows.iterator())))()
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual("".join(chunks), expected)
+
+
+class LogSheetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.admin, driver, vehicle = create_fleet("acme")
+        cls.trip = create_trip(cls.company, driver, vehicle, "MF-7", shipper="Acme & Sons")
+        # 2 March 08:00 driving, 18:00 off duty; 3 March 06:00 driving, 10:00 off duty.
+        add_entry(cls.trip, 2, TripLogEntry.DRIVING, 1000)
+        add_entry(cls.trip, 12, TripLogEntry.OFF_DUTY, 1550)
+        cls.morning = add_entry(cls.trip, 24, TripLogEntry.DRIVING, 1550)
+        add_entry(cls.trip, 28, TripLogEntry.OFF_DUTY, 1770)
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def sheet(self, day):
+        return day_sheet_data(self.trip, day)
+
+    def test_every_day_covers_24_hours(self):
+        first, second = self.sheet(date(2026, 3, 2)), self.sheet(date(2026, 3, 3))
+        self.assertEqual([(category, start.hour, end.hour) for category, start, end in sheet_intervals(first)], [
+            (TripLogEntry.OFF_DUTY, 0, 8), (TripLogEntry.DRIVING, 8, 18), (TripLogEntry.OFF_DUTY, 18, 23),
+        ])
+        self.assertEqual(category_totals(sheet_intervals(first))[TripLogEntry.DRIVING], 10)
+        # The second day starts in the status carried in from the first.
+        self.assertEqual(second["carry_in"], TripLogEntry.OFF_DUTY)
+        for data in (first, second):
+            with self.subTest(day=data["date"]):
+                self.assertAlmostEqual(sum(category_totals(sheet_intervals(data)).values()), 24, places=2)
+
+        # Days after the trip's last entry keep showing its last status.
+        self.assertEqual(self.sheet(date(2026, 3, 4))["carry_in"], TripLogEntry.OFF_DUTY)
+        self.assertIsNone(self.sheet(date(2026, 3, 1)))
+
+    def test_log_sheet(self):
+        response = self.api.get(f"/api/v1/trips/{self.trip.id}/log_sheet/", {"date": "2026-03-02"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/svg+xml")
+        svg = response.content.decode()
+        self.assertIn("Driver's Daily Log — 2026-03-02", svg)
+        self.assertIn("Shipper: Acme &amp; Sons", svg)
+        self.assertIn("08:00  Driving — 40.0, -100.0 — odometer 1000", svg)
+        self.assertIn(">10.00</text>", svg)
+        self.assertIn(">24.00</text>", svg)
+
+        self.assertEqual(self.api.get(f"/api/v1/trips/{self.trip.id}/log_sheet/").status_code, 400)
+        self.assertEqual(self.api.get(f"/api/v1/trips/{self.trip.id}/log_sheet/", {"date": "2026-03-01"}).status_code, 404)
+
+    def test_sheets_are_rendered_again_only_when_they_change(self):
+        with mock.patch("trip.logsheet.render_svg", wraps=render_svg) as render:
+            first = render_day_sheet(self.trip, date(2026, 3, 3))
+            self.assertEqual(render_day_sheet(self.trip, date(2026, 3, 3)), first)
+            self.assertEqual(render.call_count, 1)
+
+            self.morning.remarks = "Weigh <station>"
+            self.morning.save()
+            self.assertIn("Weigh &lt;station&gt;", render_day_sheet(self.trip, date(2026, 3, 3)))
+            self.assertEqual(render.call_count, 2)
+
+    def test_log_sheets_zip(self):
+        response = self.api.get(f"/api/v1/trips/{self.trip.id}/log_sheets/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="log-sheets-MF-7.zip"')
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        self.assertEqual(archive.namelist(), ["MF-7-2026-03-02.svg", "MF-7-2026-03-03.svg"])
+        self.assertEqual(
+            archive.read("MF-7-2026-03-03.svg").decode(),
+            self.api.get(f"/api/v1/trips/{self.trip.id}/log_sheet/", {"date": "2026-03-03"}).content.decode(),
+        )
+
+        response = self.api.get(f"/api/v1/trips/{self.trip.id}/log_sheets/", {"date_from": "2026-03-03"})
+        self.assertEqual(zipfile.ZipFile(io.BytesIO(response.content)).namelist(), ["MF-7-2026-03-03.svg"])
+
+
+class LiveStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, admin, cls.driver, cls.vehicle = create_fleet("acme")
+        cls.other_driver = create_driver(cls.company, admin, "other@acme.example")
+        cls.trip = create_trip(cls.company, cls.driver, cls.vehicle, "MF-1")
+
+    def status(self, owner):
+        model = DriverLiveStatus if isinstance(owner, DriverProfile) else VehicleLiveStatus
+        status = model.objects.filter(pk=owner.pk).first()
+        return status and (status.category, status.since, status.odm_reading, status.trip_id)
+
+    def assertStatus(self, expected, owners=None):
+        for owner in owners or (self.driver, self.vehicle):
+            with self.subTest(owner=owner):
+                self.assertEqual(self.status(owner), expected)
+
+    def test_new_entries_advance_the_status(self):
+        self.assertStatus(None)
+        add_entry(self.trip, 0, TripLogEntry.DRIVING, 1000)
+        self.assertStatus((TripLogEntry.DRIVING, at(0), 1000, self.trip.id))
+        # Entries without a reading keep the last one.
+        add_entry(self.trip, 2, TripLogEntry.ON_DUTY)
+        self.assertStatus((TripLogEntry.ON_DUTY, at(2), 1000, self.trip.id))
+        self.assertEqual(DriverLiveStatus.objects.get(pk=self.driver.pk).company_id, self.company.id)
+
+    def test_backdated_entries_do_not_advance_the_status(self):
+        add_entry(self.trip, 0, TripLogEntry.DRIVING, 1000)
+        add_entry(self.trip, 4, TripLogEntry.OFF_DUTY)
+        add_entry(self.trip, 2, TripLogEntry.ON_DUTY, 1100)
+        self.assertStatus((TripLogEntry.OFF_DUTY, at(4), 1100, self.trip.id))
+
+    def test_edits_and_deletes_recompute_the_status(self):
+        add_entry(self.trip, 0, TripLogEntry.DRIVING, 1000)
+        latest = add_entry(self.trip, 2, TripLogEntry.ON_DUTY, 1100)
+
+        latest.category = TripLogEntry.SLEEPER_BERTH
+        latest.save()
+        self.assertStatus((TripLogEntry.SLEEPER_BERTH, at(2), 1100, self.trip.id))
+
+        latest.deleted = True
+        latest.save()
+        self.assertStatus((TripLogEntry.DRIVING, at(0), 1000, self.trip.id))
+
+        latest.deleted = False
+        latest.save()
+        latest.delete()
+        self.assertStatus((TripLogEntry.DRIVING, at(0), 1000, self.trip.id))
+
+    def test_reassigned_trips_move_the_status(self):
+        add_entry(self.trip, 0, TripLogEntry.DRIVING, 1000)
+        self.trip.driver = self.other_driver
+        self.trip.save()
+        self.assertIsNone(self.status(self.driver))
+        self.assertStatus((TripLogEntry.DRIVING, at(0), 1000, self.trip.id), owners=[self.other_driver, self.vehicle])
+
+    def test_deleted_trips_take_their_status_with_them(self):
+        add_entry(self.trip, 0, TripLogEntry.DRIVING, 1000)
+        self.trip.deleted = True
+        self.trip.save()
+        self.assertStatus(None)
+
+        self.trip.deleted = False
+        self.trip.save()
+        self.assertStatus((TripLogEntry.DRIVING, at(0), 1000, self.trip.id))
+
+        self.trip.delete()
+        self.assertStatus(None)
+
+
+class RecordingBroker(InProcessBroker):
+    """An in-process broker that also keeps what was published, and holds few events per subscriber."""
+
+    def __init__(self):
+        super().__init__(max_pending=3)
+        self.published = []
+
+    def publish(self, channel, event):
+        self.published.append((channel, event["type"]))
+        super().publish(channel, event)
+
+
+@override_settings(LIVE_UPDATES_BROKER="trip.tests.RecordingBroker", LIVE_UPDATES_HEARTBEAT=0.05)
+class LiveUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.admin, cls.driver, vehicle = create_fleet("acme")
+        cls.trip = create_trip(cls.company, cls.driver, vehicle, "MF-1")
+        cls.other_trip = create_trip(cls.company, cls.driver, vehicle, "MF-2")
+        cls.token = create_access_token(cls.admin)
+
+        other_company, _, other_driver, other_vehicle = create_fleet("globex")
+        cls.outsider_trip = create_trip(other_company, other_driver, other_vehicle, "MF-3")
+        cls.driver_token = create_access_token(other_driver.user)
+
+    def setUp(self):
+        local_tokens.clear()
+        self.broker = get_broker()
+        self.broker.published.clear()
+
+    def channels(self, trip):
+        return [trip_channel(trip.id), company_channel(self.company.id)]
+
+    def test_writes_publish_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = add_entry(self.trip, 0, TripLogEntry.DRIVING, 1000)
+            self.assertEqual(self.broker.published, [])
+        self.assertEqual(self.broker.published, [(channel, "log_entry.created") for channel in self.channels(self.trip)])
+
+        self.broker.published.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            entry.trip = self.other_trip
+            entry.save()
+        # Moving an entry removes it from the old trip's stream.
+        self.assertEqual(self.broker.published, [
+            *[(channel, "log_entry.deleted") for channel in self.channels(self.trip)],
+            *[(channel, "log_entry.updated") for channel in self.channels(self.other_trip)],
+        ])
+
+        self.broker.published.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trip.deleted = True
+            self.trip.save()
+        self.assertEqual(self.broker.published, [(channel, "trip.deleted") for channel in self.channels(self.trip)])
+
+    def test_broker_failures_do_not_fail_writes(self):
+        with mock.patch.object(self.broker, "publish", side_effect=ConnectionError), self.assertLogs("trip.events", "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                entry = add_entry(self.trip, 0, TripLogEntry.DRIVING, 1000)
+        self.assertTrue(TripLogEntry.objects.filter(pk=entry.pk).exists())
+
+    async def test_subscribers_only_get_their_channels(self):
+        subscription = self.broker.subscribe([trip_channel(1)])
+        self.broker.publish(trip_channel(2), {"type": "trip.updated"})
+        self.broker.publish(trip_channel(1), {"type": "trip.updated"})
+        event = await subscription.get(1)
+        self.assertEqual(event["type"], "trip.updated")
+        self.assertTrue(subscription.queue.empty())
+
+        self.broker.unsubscribe(subscription)
+        self.assertEqual(self.broker._subscribers, {})
+
+    async def test_trip_stream(self):
+        response = await self.async_client.get(
+            f"/api/v1/trips/{self.trip.id}/events/", headers={"Authorization": f"Bearer {self.token.token}"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 50.0\n\n")
+        self.broker.publish(trip_channel(self.other_trip.id), {"type": "trip.updated", "trip": self.other_trip.id})
+        self.broker.publish(trip_channel(self.trip.id), {"type": "trip.updated", "trip": self.trip.id})
+        chunk = (await anext(stream)).decode()
+        event_id = chunk.split("\n")[0].removeprefix("id: ")
+        self.assertEqual(chunk, f'id: {event_id}\nevent: trip.updated\ndata: {{"id": {event_id}, "type": "trip.updated", "trip": {self.trip.id}}}\n\n')
+        # Idle streams send comments, so proxies keep the connection open.
+        self.assertEqual(await anext(stream), b": heartbeat\n\n")
+
+    async def test_streams_unsubscribe_when_they_end(self):
+        stream = _event_stream([trip_channel(self.trip.id)])
+        await anext(stream)
+        await stream.aclose()
+        self.assertEqual(self.broker._subscribers, {})
+
+        # Slow clients are cut off, to reconnect and refetch.
+        stream = _event_stream([trip_channel(self.trip.id)])
+        await anext(stream)
+        for _ in range(4):
+            self.broker.publish(trip_channel(self.trip.id), {"type": "trip.updated"})
+        await asyncio.sleep(0)
+        self.assertEqual([chunk async for chunk in stream], [])
+        self.assertEqual(self.broker._subscribers, {})
+
+    async def test_only_the_trips_driver_and_company_admins_follow_it(self):
+        async def status(url, token=None):
+            headers = {"Authorization": f"Bearer {token.token}"} if token else {}
+            return (await self.async_client.get(url, headers=headers)).status_code
+
+        self.assertEqual(await status(f"/api/v1/trips/{self.trip.id}/events/"), 401)
+        self.assertEqual(await status(f"/api/v1/trips/{self.trip.id}/events/", self.driver_token), 404)
+        self.assertEqual(await status(f"/api/v1/companies/{self.company.id}/events/", self.driver_token), 403)
+        self.assertEqual(await status(f"/api/v1/trips/{self.outsider_trip.id}/events/", self.driver_token), 200)
+
+
+class SoftDeleteTests(FleetTestCase):
+    def ids(self, url, **params):
+        response = self.api.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.json()["results"]]
+
+    def test_managers(self):
+        entry = add_entry(self.trip, 0, TripLogEntry.DRIVING, 1000)
+        entry.deleted = True
+        entry.save()
+        self.assertFalse(TripLogEntry.objects.filter(pk=entry.pk).exists())
+        self.assertTrue(TripLogEntry.all_objects.filter(pk=entry.pk).exists())
+        self.assertFalse(self.trip.log_entries.exists())
+
+        Trip.objects.filter(pk=self.trip.pk).update(deleted=True)
+        self.assertFalse(Trip.objects.exists())
+        self.assertEqual(list(Trip.all_objects.all()), [self.trip])
+
+    def test_deleted_trips_are_listed_apart_and_restored(self):
+        url = f"/api/v1/trips/{self.trip.id}/"
+        self.assertEqual(self.api.delete(url).status_code, 204)
+        self.assertTrue(Trip.all_objects.get(pk=self.trip.pk).deleted)
+
+        self.assertEqual(self.ids("/api/v1/trips/"), [])
+        self.assertEqual(self.ids("/api/v1/trips/", deleted="true"), [self.trip.id])
+        self.assertEqual(self.api.get(url).status_code, 404)
+
+        self.assertEqual(self.api.post(f"{url}restore/").status_code, 200)
+        self.assertEqual(self.ids("/api/v1/trips/"), [self.trip.id])
+        self.assertEqual(self.ids("/api/v1/trips/", deleted="true"), [])
+        self.assertEqual(self.api.post(f"{url}restore/").status_code, 400)
+
+    def test_deleted_log_entries_are_listed_apart_and_restored(self):
+        kept = add_entry(self.trip, 0, TripLogEntry.DRIVING, 1000)
+        removed = add_entry(self.trip, 2, TripLogEntry.ON_DUTY, 1100)
+        self.assertEqual(self.api.patch(f"/api/v1/trip-logs/{removed.id}/", {"deleted": True}).status_code, 200)
+
+        self.assertEqual(self.ids("/api/v1/trip-logs/"), [kept.id])
+        self.assertEqual(self.ids("/api/v1/trip-logs/", deleted="true"), [removed.id])
+        self.assertEqual(self.ids(f"/api/v1/trips/{self.trip.id}/logs/", deleted="true"), [removed.id])
+        self.assertEqual(self.api.get(f"/api/v1/trip-logs/{removed.id}/").status_code, 404)
+
+        self.assertEqual(self.api.post(f"/api/v1/trip-logs/{removed.id}/restore/").status_code, 200)
+        self.assertEqual(self.ids("/api/v1/trip-logs/"), [kept.id, removed.id])
+        self.assertEqual(self.api.post(f"/api/v1/trip-logs/{removed.id}/restore/").status_code, 400)
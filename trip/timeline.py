@@ -0,0 +1,124 @@
+"""
+Per-day duty-status segments for trips.
+
+Each day's segments only depend on that day's entries, the last entry before the
+day (its carry-in status) and whether it is the trip's last day, so a write only
+needs to refresh a handful of days instead of the whole trip.
+"""
+from datetime import datetime, timedelta
+
+from django.utils.timezone import localdate, make_aware
+
+from .models import TripLogDay, TripLogEntry
+
+LOG_FIELDS = ["id", "trip_id", "category", "remarks", "location", "odm_reading", "date_created", "deleted"]
+
+REST_CATEGORIES = {TripLogEntry.SLEEPER_BERTH, TripLogEntry.OFF_DUTY}
+
+
+def start_of_day(day):
+    return make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def end_of_day(day):
+    return make_aware(datetime.combine(day, datetime.max.time()))
+
+
+def build_day_segments(day, logs, carry_in=None, is_last_day=False):
+    """
+    Build the segments of one day from its chronological log dicts.
+
+    The day opens with the status carried in from the previous entry (off duty on
+    the first day) and, on the trip's last day, closes with the final entry.
+    """
+    previous = {"category": TripLogEntry.OFF_DUTY}
+    if carry_in:
+        previous = {**carry_in, "date": localdate(carry_in["date_created"])}
+    previous["date_created"] = start_of_day(day)
+
+    segments = []
+    for log in logs:
+        segments.append({**previous, "from": previous["date_created"], "to": log["date_created"]})
+        previous = {**log, "date": day}
+
+    if is_last_day:
+        complete = previous["category"] in REST_CATEGORIES
+        segments.append({
+            **previous,
+            "from": previous["date_created"],
+            "to": end_of_day(day) if complete else previous["date_created"],
+        })
+
+    return segments
+
+
+def build_trip_days(logs):
+    """Build {day: segments} for a whole trip from its chronological, non-deleted log dicts."""
+    grouped = {}
+    for log in logs:
+        grouped.setdefault(localdate(log["date_created"]), []).append(log)
+
+    days = {}
+    carry_in = None
+    last_day = max(grouped, default=None)
+    for day, day_logs in grouped.items():
+        days[day] = build_day_segments(day, day_logs, carry_in, is_last_day=day == last_day)
+        carry_in = day_logs[-1]
+    return days
+
+
+def live_log_values(trip_id):
+    return (
+        TripLogEntry.objects.filter(trip_id=trip_id, deleted=False)
+        .order_by("date_created", "id")
+        .values(*LOG_FIELDS)
+    )
+
+
+def rebuild_trip_days(trip_id):
+    """Recompute every stored day of a trip."""
+    days = build_trip_days(live_log_values(trip_id))
+
+    TripLogDay.objects.filter(trip_id=trip_id).delete()
+    TripLogDay.objects.bulk_create([
+        TripLogDay(trip_id=trip_id, date=day, segments=segments) for day, segments in days.items()
+    ])
+    return set(days)
+
+
+def refresh_trip_days(trip_id, dates):
+    """
+    Refresh the stored days affected by entries written or removed on `dates`.
+
+    Besides the days themselves, this covers the next day with entries (its
+    carry-in may have changed) and the old and new last days of the trip (only
+    the last day gets a closing segment). Returns the refreshed days.
+    """
+    logs = live_log_values(trip_id)
+    affected = {day for day in dates if day is not None}
+
+    for day in list(affected):
+        next_log = logs.filter(date_created__gte=start_of_day(day + timedelta(days=1))).first()
+        if next_log:
+            affected.add(localdate(next_log["date_created"]))
+
+    last_log = logs.reverse().first()
+    last_day = localdate(last_log["date_created"]) if last_log else None
+    stored_last_day = TripLogDay.objects.filter(trip_id=trip_id).order_by("-date").values_list("date", flat=True).first()
+    affected.update(day for day in (last_day, stored_last_day) if day is not None)
+
+    for day in affected:
+        day_start = start_of_day(day)
+        day_logs = list(logs.filter(date_created__gte=day_start, date_created__lt=start_of_day(day + timedelta(days=1))))
+        if not day_logs:
+            TripLogDay.objects.filter(trip_id=trip_id, date=day).delete()
+            continue
+
+        carry_in = logs.filter(date_created__lt=day_start).reverse().first()
+        TripLogDay.objects.update_or_create(
+            trip_id=trip_id,
+            date=day,
+            defaults={"segments": build_day_segments(day, day_logs, carry_in, is_last_day=day == last_day)},
+        )
+
+    return affected
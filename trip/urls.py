@@ -1,6 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TripViewSet, TripLogEntryViewSet
+from . import async_views
+from .streams import company_events, trip_events
+from .views import SyncView, TripViewSet, TripLogEntryViewSet
 
 # Create a router and register the CompanyViewSet
 router = DefaultRouter()
@@ -9,5 +11,12 @@ router.register(r'trip-logs', TripLogEntryViewSet, basename='trip_logs')
 
 urlpatterns = [
     path('', include(router.urls)),
-
+    path('trips/<int:pk>/events/', trip_events, name='trip-events'),
+    path('companies/<int:pk>/events/', company_events, name='company-events'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('async/trips/', async_views.trip_list, name='async-trips-list'),
+    path('async/trips/<int:pk>/', async_views.trip_detail, name='async-trips-detail'),
+    path('async/trips/<int:pk>/logs/', async_views.trip_logs, name='async-trips-logs'),
+    path('async/trips/<int:pk>/logs_time_series/', async_views.trip_logs_time_series, name='async-trips-logs-time-series'),
+    path('async/trip-logs/', async_views.trip_log_list, name='async-trip-logs-list'),
 ]
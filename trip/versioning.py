@@ -0,0 +1,97 @@
+"""
+Trip versions, strong ETags and version-keyed representation caching.
+
+`Trip.version` goes up on every write to the trip or to one of its log
+entries, and on edits of the vehicle, driver or company it embeds (see
+`trip.signals`). The bump is a database-side `version + 1`, so concurrent
+writers never hand out the same version twice.
+
+Conditional reads look up the trip's version only (one narrow row), compare
+the ETag built from it with `If-None-Match`, and answer 304 without building
+the representation. Otherwise the representation is read from the cache under
+the version, or built once and stored there. A stale entry is never served:
+a write changes the version, hence the key.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Trip
+
+
+def bump_trip_versions(**filters):
+    """Increment the version of the trips matching `filters`, in one UPDATE."""
+    return Trip.all_objects.filter(**filters).update(version=F("version") + 1)
+
+
+def _digest(request, trip):
+    # Pages, filters and formats of one trip are separate representations.
+    renderer = getattr(request, "accepted_renderer", None)
+    fingerprint = f"{trip.pk}:{trip.version}:{request.build_absolute_uri()}:{renderer.format if renderer else ''}"
+    return hashlib.sha1(fingerprint.encode()).hexdigest()
+
+
+def trip_etag(request, trip):
+    """Strong ETag of the representation of `trip` that `request` asks for."""
+    return quote_etag(_digest(request, trip))
+
+
+def _not_modified(request, etag):
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    # `If-None-Match` uses weak comparison: a `W/` prefix on either side does not matter.
+    candidates = {tag.removeprefix("W/") for tag in parse_etags(header)}
+    return "*" in candidates or etag in candidates
+
+
+def _representation_key(digest):
+    return f"trip-representation:{digest}"
+
+
+def _with_validators(response, etag):
+    response["ETag"] = etag
+    # The body depends on who may see the trip; shared caches must revalidate with us.
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def conditional_response(request, trip, build):
+    """
+    `build()`'s data for `trip`, with a strong ETag; 304 when the client already has it.
+
+    The built data is cached under the trip's version, so later requests for the
+    same representation skip building it until the trip changes.
+    """
+    digest = _digest(request, trip)
+    etag = quote_etag(digest)
+    if _not_modified(request, etag):
+        return _with_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+    key = _representation_key(digest)
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, settings.TRIP_REPRESENTATION_CACHE_TIMEOUT)
+    return _with_validators(Response(data), etag)
+
+
+async def aconditional_response(request, trip, build, render):
+    """`conditional_response` for async views: `build` is a coroutine function and `render(data)` makes the response."""
+    digest = _digest(request, trip)
+    etag = quote_etag(digest)
+    if _not_modified(request, etag):
+        return _with_validators(HttpResponseNotModified(), etag)
+
+    key = _representation_key(digest)
+    data = await cache.aget(key)
+    if data is None:
+        data = await build()
+        await cache.aset(key, data, settings.TRIP_REPRESENTATION_CACHE_TIMEOUT)
+    return _with_validators(render(data), etag)
@@ -1,101 +1,334 @@
-from django.db.models import Q
-from django.db.models.functions import TruncDate
-from django.utils.timezone import make_aware
+import io
+import zipfile
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse
+from django.utils.dateparse import parse_date
 
 from rest_framework.decorators import action
 from rest_framework import viewsets, permissions
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.views import APIView
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework import status
 
+from company.membership import get_membership
 from trip.permissions import IsCompanyAdminOrTripDriver
+from .bulk import BULK_LOG_ENTRY_LIMIT, ingest_log_entries
+from .export import EXPORT_FORMATS, export_response
+from .filters import (
+    TripFilterBackend, TripLogEntryFilterBackend, parse_bbox_params, parse_choice_param, parse_float_param,
+    parse_int_param, parse_limit_param, parse_point_params, wants_deleted,
+)
+from .geo import DEFAULT_NEAR_LIMIT, DEFAULT_RADIUS_KM, MAX_LOG_RADIUS_KM, MAX_NEAR_LIMIT, MAX_RADIUS_KM, bbox_q, nearest
+from .listing import log_entry_representations, log_entry_values, trip_representations, trip_values
+from .logsheet import render_day_sheet, sheet_header
+from .pagination import TripCursorPagination, TripLogEntryCursorPagination
+from .routes import get_routes
+from .sync import DEFAULT_SYNC_LIMIT, MAX_SYNC_LIMIT, changes_since
+from .versioning import conditional_response
 from .models import Trip
+from .odometer import check_entry
 from .serializers import TripSerializer
 from .models import TripLogEntry
 from .serializers import TripLogEntrySerializer
 
-from datetime import datetime
+TRIP_LOCATIONS = [("start", "Starting location"), ("end", "Ending location")]
+# Trip reads answered with ETags and cached by trip version (see `trip.versioning`).
+CONDITIONAL_ACTIONS = {"retrieve", "logs", "logs_time_series"}
+
+
+def near_response(request, queryset, serializer_class, prefix="", max_radius_km=MAX_RADIUS_KM):
+    """
+    Rows of `queryset` within `radius_km` of `lat`/`lng`, nearest first, each with its `distance_km`.
+
+    The geohash index narrows the search to the bounding box of a circle that
+    widens up to `radius_km`; exact distances are computed on those candidates only.
+    """
+    params = request.query_params
+    lat, lng = parse_point_params(params)
+    radius_km = parse_float_param(params, "radius_km", 0, max_radius_km)
+    radius_km = DEFAULT_RADIUS_KM if radius_km is None else radius_km
+
+    hits = nearest(queryset, lat, lng, radius_km, parse_limit_param(params, DEFAULT_NEAR_LIMIT, MAX_NEAR_LIMIT), prefix)
+    rows = queryset.in_bulk([pk for pk, _ in hits])
+    data = serializer_class([rows[pk] for pk, _ in hits], many=True).data
+    return Response({
+        "lat": lat,
+        "lng": lng,
+        "radius_km": radius_km,
+        "results": [{**row, "distance_km": round(distance, 3)} for row, (_, distance) in zip(data, hits)],
+    })
+
+
+def within_response(view, request, queryset, prefix=""):
+    """A cursor page of the rows of `queryset` inside the `min_lat`/`min_lng`/`max_lat`/`max_lng` box."""
+    page = view.paginate_queryset(queryset.filter(bbox_q(*parse_bbox_params(request.query_params), prefix)))
+    return view.get_paginated_response(view.get_serializer(page, many=True).data)
 
 
 class TripViewSet(viewsets.ModelViewSet):
     queryset = Trip.objects.all()
     serializer_class = TripSerializer
     permission_classes = [permissions.IsAuthenticated, IsCompanyAdminOrTripDriver]
+    pagination_class = TripCursorPagination
+    filter_backends = [TripFilterBackend]
 
     def get_queryset(self):
-        """Driver or company admin trips."""
-        user = self.request.user
+        """Driver or company admin trips; soft-deleted ones only for `restore` and `?deleted=true` listings."""
+        if self.action == "restore" or (not self.detail and wants_deleted(self.request.query_params)):
+            trips = Trip.all_objects
+        else:
+            trips = Trip.objects
+        trips = trips.visible_to(self.request.user)
+        if self.action in CONDITIONAL_ACTIONS:
+            # Enough for the permission check and the ETag; the body is built separately, only when needed.
+            return trips.only("id", "company", "driver", "version")
+        return trips.select_related("driver", "company", "vehicle").with_latest_log()
 
-        return Trip.objects.filter(
-            Q(driver__user=user) | Q(company__admins=user)
-        ).distinct().select_related("driver", "company").prefetch_related("company__admins")
+    def filter_queryset(self, queryset):
+        """Query filters apply to trip listings, not to single-trip lookups."""
+        if self.detail:
+            return queryset
+        return super().filter_queryset(queryset)
+
+    def list(self, request, *args, **kwargs):
+        """One cursor page of trips, built from `.values()` rows rather than a serializer per trip."""
+        rows = self.paginate_queryset(trip_values(self.filter_queryset(self.get_queryset())))
+        return self.get_paginated_response(trip_representations(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        """The trip, or 304 when `If-None-Match` has its current ETag."""
+        trip = self.get_object()
+
+        def build():
+            full = Trip.objects.select_related("driver", "company", "vehicle").with_latest_log().get(pk=trip.pk)
+            return self.get_serializer(full).data
+
+        return conditional_response(request, trip, build)
 
     def perform_destroy(self, instance):
         """Soft delete the trip."""
         instance.deleted = True
         instance.save()
 
+    @action(detail=True, methods=["post"])
+    def restore(self, request, pk=None):
+        """Restore a soft-deleted trip."""
+        trip = self.get_object()
+        if not trip.deleted:
+            return Response({"message": "Trip is not deleted."}, status=400)
+
+        trip.deleted = False
+        trip.save()
+        return Response({"message": "Trip has been restored."}, status=200)
+
     @action(detail=True, methods=["get"], permission_classes=[permissions.IsAuthenticated, IsCompanyAdminOrTripDriver])
     def logs(self, request, pk=None):
-        """Retrieve all log entries for a specific trip."""
+        """Retrieve the log entries for a specific trip, one cursor page at a time."""
         trip = self.get_object()
-        logs = trip.log_entries.select_related("trip", "trip__driver").all()
-        serializer = TripLogEntrySerializer(logs, many=True)
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    
+        def build():
+            entries = TripLogEntry.all_objects if wants_deleted(request.query_params) else TripLogEntry.objects
+            logs = TripLogEntryFilterBackend().filter_queryset(request, entries.filter(trip=trip), self)
+
+            paginator = TripLogEntryCursorPagination()
+            page = paginator.paginate_queryset(log_entry_values(logs), request, view=self)
+            return paginator.get_paginated_data(log_entry_representations(page))
+
+        return conditional_response(request, trip, build)
+
     @action(detail=True, methods=["get"])
     def logs_time_series(self, request, pk=None):
-        """Return grouped trip logs as a time series."""
+        """Return grouped trip logs as a time series, optionally for a single `date`."""
         trip = self.get_object()
-        logs = trip.log_entries.filter(deleted=False).annotate(date=TruncDate("date_created")).order_by("date_created")
-        grouped_logs = {}
-        previous_data = {'category': TripLogEntry.OFF_DUTY}
-        log_date = None
-
-        for log in logs:
-            log_date = log.date
-            if log_date not in grouped_logs:
-                start_of_day = make_aware(datetime.combine(log_date, datetime.min.time()))
-                previous_data['date_created'] = start_of_day
-                grouped_logs[log_date] = []
-            
-            grouped_logs[log_date].append({
-                **previous_data,
-                "from": previous_data['date_created'],
-                "to": log.date_created,
-            })
-            previous_data = log.__dict__
-            previous_data.pop('_state')
-
-        complete = previous_data["category"] in [TripLogEntry.SLEEPER_BERTH, TripLogEntry.OFF_DUTY]
-        grouped_logs[log_date].append({
-            **previous_data,
-            "from": previous_data['date_created'],
-            "to": make_aware(datetime.combine(log_date, datetime.max.time())) if complete  else previous_data['date_created'],
-        })
-
-        return Response({str(date): series for date, series in grouped_logs.items()})
+        days = trip.log_days.order_by("date")
+
+        if request.query_params.get("date"):
+            day = parse_date(request.query_params["date"])
+            if day is None:
+                raise ValidationError({"date": "Must be an ISO date."})
+            days = days.filter(date=day)
+
+        return conditional_response(request, trip, lambda: {str(day.date): day.segments for day in days})
+
+    @action(detail=True, methods=["get"])
+    def log_sheet(self, request, pk=None):
+        """Render the daily log sheet (24-hour duty grid) of one `date` as SVG."""
+        trip = self.get_object()
+        day = parse_date(request.query_params.get("date") or "")
+        if day is None:
+            raise ValidationError({"date": "An ISO date is required."})
+
+        svg = render_day_sheet(trip, day)
+        if svg is None:
+            raise NotFound("The trip has no log entries on or before this date.")
+
+        return HttpResponse(svg, content_type="image/svg+xml")
+
+    @action(detail=False, methods=["get"])
+    def near(self, request):
+        """Trips starting (or ending, with `location=end`) within `radius_km` of `lat`/`lng`, nearest first."""
+        location = parse_choice_param(request.query_params, "location", TRIP_LOCATIONS) or "start"
+        return near_response(request, self.filter_queryset(self.get_queryset()), self.get_serializer_class(), f"{location}_")
+
+    @action(detail=False, methods=["get"])
+    def within(self, request):
+        """Trips starting (or ending, with `location=end`) inside a bounding box, one cursor page at a time."""
+        location = parse_choice_param(request.query_params, "location", TRIP_LOCATIONS) or "start"
+        return within_response(self, request, self.filter_queryset(self.get_queryset()), f"{location}_")
+
+    @action(detail=True, methods=["get"])
+    def route(self, request, pk=None):
+        """
+        The trip's route from its log locations: distance along it, straight-line distance, a simplified
+        polyline (`tolerance_m`) and GPS vs odometer miles between successive odometer readings.
+        """
+        trip = self.get_object()
+        tolerance_m = parse_float_param(request.query_params, "tolerance_m", 0, 10_000)
+        return Response(get_routes([trip], tolerance_m)[trip.id])
+
+    @action(detail=False, methods=["get"])
+    def routes(self, request):
+        """Routes of one cursor page of trips, with the list filters applied."""
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        tolerance_m = parse_float_param(request.query_params, "tolerance_m", 0, 10_000)
+        return self.get_paginated_response(list(get_routes(page, tolerance_m).values()))
+
+    @action(detail=True, methods=["get"])
+    def log_sheets(self, request, pk=None):
+        """Download the daily log sheets of every logged day (optionally `date_from`/`date_to`) as a zip of SVGs."""
+        trip = self.get_object()
+        days = trip.log_days.order_by("date").values_list("date", flat=True)
+        date_from = parse_date(request.query_params.get("date_from") or "")
+        date_to = parse_date(request.query_params.get("date_to") or "")
+        if date_from:
+            days = days.filter(date__gte=date_from)
+        if date_to:
+            days = days.filter(date__lte=date_to)
+
+        header = sheet_header(trip)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for day in days:
+                archive.writestr(f"{trip.manifest_no}-{day.isoformat()}.svg", render_day_sheet(trip, day, header))
+
+        response = HttpResponse(buffer.getvalue(), content_type="application/zip")
+        response["Content-Disposition"] = f'attachment; filename="log-sheets-{trip.manifest_no}.zip"'
+        return response
 
 class TripLogEntryViewSet(viewsets.ModelViewSet):
     """Manage trip log entries, accessible only by trip drivers or company admins."""
     queryset = TripLogEntry.objects.all()
     serializer_class = TripLogEntrySerializer
     permission_classes = [permissions.IsAuthenticated, IsCompanyAdminOrTripDriver]
+    pagination_class = TripLogEntryCursorPagination
+    filter_backends = [TripLogEntryFilterBackend]
 
     def get_queryset(self):
-        """Filter logs to only those related to the authenticated user's trips."""
-        user = self.request.user
-        return TripLogEntry.objects.filter(
-            Q(trip__driver__user=user) | 
-            Q(trip__company__admins=user)
-        ).distinct() 
+        """Logs of the user's trips; soft-deleted ones only for `restore` and `?deleted=true` listings."""
+        if self.action == "restore" or (not self.detail and wants_deleted(self.request.query_params)):
+            return TripLogEntry.all_objects.visible_to(self.request.user)
+        return TripLogEntry.objects.visible_to(self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        """One cursor page of log entries, built from `.values()` rows rather than a serializer per entry."""
+        rows = self.paginate_queryset(log_entry_values(self.filter_queryset(self.get_queryset())))
+        return self.get_paginated_response(log_entry_representations(rows))
 
     def perform_create(self, serializer):
         """Ensure the user is authorized to create a log entry."""
         trip = serializer.validated_data.get("trip")
 
-        if not (trip.driver.user == self.request.user or trip.company.admins.filter(id=self.request.user.id).exists()):
+        if not get_membership(self.request).can_access_trip(trip):
             raise PermissionDenied("You must be the trip driver or a company admin.")
 
         serializer.save()
+
+    @action(detail=True, methods=["post"])
+    def restore(self, request, pk=None):
+        """Restore a soft-deleted log entry, if its odometer reading still fits between its neighbours."""
+        entry = self.get_object()
+        if not entry.deleted:
+            return Response({"message": "Log entry is not deleted."}, status=400)
+
+        errors = check_entry(entry.trip, entry.date_created, entry.odm_reading, exclude_id=entry.pk)
+        if errors:
+            raise ValidationError(errors)
+
+        entry.deleted = False
+        entry.save()
+        return Response({"message": "Log entry has been restored."}, status=200)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Create a batch of log entries for one or more trips, idempotent on each entry's `client_id`."""
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError("Expected a non-empty list of log entries.")
+        if len(items) > BULK_LOG_ENTRY_LIMIT:
+            raise ValidationError(f"At most {BULK_LOG_ENTRY_LIMIT} log entries can be uploaded at once.")
+
+        return Response(ingest_log_entries(get_membership(request), items), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"])
+    def near(self, request):
+        """Log entries recorded within `radius_km` of `lat`/`lng`, nearest first, with the list filters applied."""
+        return near_response(
+            request, self.filter_queryset(self.get_queryset()), self.get_serializer_class(), max_radius_km=MAX_LOG_RADIUS_KM
+        )
+
+    @action(detail=False, methods=["get"])
+    def within(self, request):
+        """Log entries recorded inside a bounding box, one cursor page at a time, with the list filters applied."""
+        return within_response(self, request, self.filter_queryset(self.get_queryset()))
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Stream a company's log entries as CSV or NDJSON (`file_format`), with the list filters applied.
+        Only company admins can export.
+        """
+        company_id = parse_int_param(request.query_params, "company")
+        if company_id is None:
+            raise ValidationError({"company": "This query parameter is required."})
+        if not get_membership(request).is_company_admin(company_id):
+            raise PermissionDenied("Only company admins can export trip logs.")
+
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in EXPORT_FORMATS:
+            raise ValidationError({"file_format": f"Must be one of {', '.join(EXPORT_FORMATS)}."})
+
+        entries = TripLogEntry.all_objects if wants_deleted(request.query_params) else TripLogEntry.objects
+        logs = self.filter_queryset(entries.filter(trip__company_id=company_id))
+        response = export_response(file_format, logs, asynchronous=isinstance(request._request, ASGIRequest))
+        response["Content-Disposition"] = f'attachment; filename="trip-logs-{company_id}.{file_format}"'
+        return response
+
+
+class SyncView(APIView):
+    """
+    Records changed since `since` (a cursor from a previous response, 0 for everything), `limit` at a time.
+
+    Company admins get every change of the `company`; drivers get the changes to their own trips,
+    log entries, profile and vehicles. Keep calling with the returned `cursor` while `has_more` is true.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        membership = get_membership(request)
+        company_id = parse_int_param(params, "company") or membership.driver_company_id
+        since = parse_int_param(params, "since") or 0
+        if since < 0:
+            raise ValidationError({"since": "Must not be negative."})
+
+        if membership.is_company_admin(company_id):
+            driver_id = None
+        elif company_id is not None and company_id == membership.driver_company_id:
+            driver_id = membership.driver_id
+        else:
+            raise PermissionDenied("You must be a driver or an admin of the company.")
+
+        limit = parse_limit_param(params, DEFAULT_SYNC_LIMIT, MAX_SYNC_LIMIT)
+        return Response(changes_since(company_id, since, limit, driver_id))
@@ -0,0 +1,130 @@
+"""
+Read-replica routing (enabled by `DB_REPLICA_HOSTS`).
+
+Reads go to a replica only while serving a GET/HEAD request for one of
+`DATABASE_REPLICA_ACTIONS`; everything else (other actions, management
+commands, signals, background work) reads from the primary. Writes always go
+to the primary.
+
+Replicas lag behind the primary, so reads fall back to it right after a write:
+- within a request, once anything has been written, the rest of its reads go
+  to the primary;
+- a client that wrote is pinned to the primary for
+  `DATABASE_REPLICA_PIN_SECONDS`, so it reads its own writes. Clients are told
+  apart by their `Authorization` header or session cookie. Its next request
+  may reach another worker, so pins live in `DATABASE_REPLICA_PIN_CACHE`, a
+  cache every worker shares; replicas are refused without one.
+
+OAuth tokens and sessions are always read from the primary: a token issued a
+moment ago may not have reached the replicas yet.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import Resolver404, resolve
+
+from .metrics import resolve_endpoint
+
+PRIMARY = "default"
+PRIMARY_ONLY_APPS = {"oauth2_provider", "sessions"}
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        # Explicitly, or Django would follow a replica-loaded instance in `hints` back to its replica.
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        # The replicas do not have this write yet; read the rest of the request from the primary.
+        _replica_reads.set(False)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+def _client_key(request):
+    credentials = request.headers.get("Authorization") or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return f"db-primary-pin:{hashlib.sha1(credentials.encode()).hexdigest()}"
+
+
+class ReplicaRoutingMiddleware:
+    """Lets the views of `DATABASE_REPLICA_ACTIONS` read from replicas, and pins clients that write to the primary."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "DATABASE_REPLICA_PIN_CACHE", None):
+            raise ImproperlyConfigured(
+                "Read replicas need DATABASE_REPLICA_PIN_CACHE, a cache shared by every worker, "
+                "so that clients read their own writes (set REDIS_URL or DB_REPLICA_PIN_CACHE)."
+            )
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        # Set for every request, so a thread never carries the flag from one request to the next.
+        token = _replica_reads.set(self.reads_from_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        self.pin_after_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        # Set here, before the view runs: the async ORM's worker threads get a copy of this context, and a value set
+        # later, from a `process_view` adapted to run in a thread, would never reach them.
+        token = _replica_reads.set(await sync_to_async(self.reads_from_replica)(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        await sync_to_async(self.pin_after_write)(request, response)
+        return response
+
+    @property
+    def pins(self):
+        return caches[settings.DATABASE_REPLICA_PIN_CACHE]
+
+    def reads_from_replica(self, request):
+        if request.method not in SAFE_METHODS:
+            return False
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        endpoint = resolve_endpoint(request, match.func)
+        actions = settings.DATABASE_REPLICA_ACTIONS
+        if endpoint not in actions and endpoint.rpartition(".")[2] not in actions:
+            return False
+
+        key = _client_key(request)
+        return key is None or not self.pins.get(key)
+
+    def pin_after_write(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        key = _client_key(request)
+        if key is not None:
+            self.pins.set(key, True, settings.DATABASE_REPLICA_PIN_SECONDS)
@@ -0,0 +1,205 @@
+"""
+Per-endpoint query count and latency instrumentation.
+
+`InstrumentationMiddleware` records, for every request, the DRF action that
+served it (`TripViewSet.list`, `TripViewSet.logs`, ...), the number of queries,
+the time spent in the database, in the view and in rendering, and the total
+latency. Each request is logged on the `truck.metrics` logger, reported in a
+`Server-Timing` header and aggregated in-process for the metrics endpoint. The
+middleware runs natively in both sync (WSGI) and async (ASGI) stacks.
+
+`settings.QUERY_BUDGETS` maps an action (or a whole viewset) to the maximum
+number of queries it may run. Going over is logged as a warning, or raises
+`QueryBudgetExceeded` when `settings.QUERY_BUDGET_MODE` is "raise" (use that in
+tests and CI so N+1 regressions fail loudly).
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("truck.metrics")
+
+# Keep this many recent latencies per endpoint for the percentiles.
+LATENCY_SAMPLES = 1000
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class EndpointMetrics:
+    """Thread-safe in-process aggregates per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, queries, db_ms, view_ms, render_ms, total_ms):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                "count": 0, "queries": 0, "max_queries": 0, "db_ms": 0.0,
+                "view_ms": 0.0, "render_ms": 0.0, "total_ms": 0.0, "latencies": [],
+            })
+            stats["count"] += 1
+            stats["queries"] += queries
+            stats["max_queries"] = max(stats["max_queries"], queries)
+            stats["db_ms"] += db_ms
+            stats["view_ms"] += view_ms
+            stats["render_ms"] += render_ms
+            stats["total_ms"] += total_ms
+            stats["latencies"].append(total_ms)
+            del stats["latencies"][:-LATENCY_SAMPLES]
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    "count": stats["count"],
+                    "avg_queries": round(stats["queries"] / stats["count"], 2),
+                    "max_queries": stats["max_queries"],
+                    "query_budget": get_query_budget(endpoint),
+                    "avg_db_ms": round(stats["db_ms"] / stats["count"], 3),
+                    "avg_view_ms": round(stats["view_ms"] / stats["count"], 3),
+                    "avg_render_ms": round(stats["render_ms"] / stats["count"], 3),
+                    "avg_total_ms": round(stats["total_ms"] / stats["count"], 3),
+                    "p50_ms": round(percentile(stats["latencies"], 0.5), 3),
+                    "p99_ms": round(percentile(stats["latencies"], 0.99), 3),
+                }
+                for endpoint, stats in sorted(self._endpoints.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+metrics = EndpointMetrics()
+
+
+def get_query_budget(endpoint):
+    """Budget for "ViewSet.action", falling back to the "ViewSet" budget."""
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    if endpoint in budgets:
+        return budgets[endpoint]
+    return budgets.get(endpoint.split(".")[0])
+
+
+def resolve_endpoint(request, view_func):
+    view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    if view_class is None:
+        return f"{view_func.__module__}.{view_func.__name__}"
+
+    # DRF viewsets map HTTP methods to actions on the view function.
+    actions = getattr(view_func, "actions", None) or {}
+    return f"{view_class.__name__}.{actions.get(request.method.lower(), request.method.lower())}"
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        counters, started = self.start()
+        with self.count_queries(counters):
+            response = self.get_response(request)
+        return self.finish(request, response, counters, started)
+
+    async def __acall__(self, request):
+        counters, started = self.start()
+        # The async ORM runs queries on the request's thread-sensitive worker thread, and
+        # connections are per thread, so count on that thread's connections.
+        counting = await sync_to_async(self.count_queries)(counters)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(counting.close)()
+        return self.finish(request, response, counters, started)
+
+    def start(self):
+        return {"queries": 0, "db_time": 0.0}, time.perf_counter()
+
+    def count_queries(self, counters):
+        """Count queries on this thread's connections until the returned stack is closed."""
+        def wrapper(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                counters["queries"] += 1
+                counters["db_time"] += time.perf_counter() - started
+
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        return stack
+
+    def finish(self, request, response, counters, started):
+        total_ms = (time.perf_counter() - started) * 1000
+
+        endpoint = getattr(request, "_metrics_endpoint", None)
+        if endpoint is None:
+            return response
+
+        db_ms = counters["db_time"] * 1000
+        render_ms = getattr(request, "_metrics_render_ms", 0.0)
+        view_ms = getattr(request, "_metrics_view_ms", total_ms - render_ms)
+        metrics.record(endpoint, counters["queries"], db_ms, view_ms, render_ms, total_ms)
+
+        response["Server-Timing"] = (
+            f"db;dur={db_ms:.2f}, view;dur={view_ms:.2f}, render;dur={render_ms:.2f}, total;dur={total_ms:.2f}"
+        )
+        logger.info(
+            "%s %s queries=%d db_ms=%.2f view_ms=%.2f render_ms=%.2f total_ms=%.2f",
+            endpoint, response.status_code, counters["queries"], db_ms, view_ms, render_ms, total_ms,
+        )
+        self.check_budget(endpoint, counters["queries"])
+        return response
+
+    def check_budget(self, endpoint, queries):
+        budget = get_query_budget(endpoint)
+        if budget is None or queries <= budget:
+            return
+
+        message = f"{endpoint} ran {queries} queries, over its budget of {budget}."
+        if getattr(settings, "QUERY_BUDGET_MODE", "log") == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_endpoint = resolve_endpoint(request, view_func)
+        request._metrics_view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns, so time the two separately.
+        request._metrics_view_ms = (time.perf_counter() - request._metrics_view_started) * 1000
+        render = response.render
+
+        def timed_render():
+            started = time.perf_counter()
+            try:
+                return render()
+            finally:
+                request._metrics_render_ms = (time.perf_counter() - started) * 1000
+
+        response.render = timed_render
+        return response
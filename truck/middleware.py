@@ -0,0 +1,112 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also runs natively under ASGI.
+
+    WhiteNoise's middleware is sync-only, which makes Django run every async view
+    below it in a worker thread. Static lookups are in-memory, so the async path
+    only needs to await the rest of the stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Brotli or gzip compression of large text and JSON responses (`RESPONSE_COMPRESSION=true`).
+
+    The encoding is negotiated per request from `Accept-Encoding`: Brotli when
+    the client accepts it and the `brotli` package is installed, gzip
+    otherwise. Bodies under `COMPRESSION_MIN_SIZE` bytes are sent as they are,
+    since compressing them costs more CPU than it saves on the wire.
+
+    Streamed bodies (exports, event streams) are never touched: compressing
+    them here would mean reading them into memory first.
+    """
+    COMPRESSIBLE_TYPES = ("application/json", "text/", "image/svg+xml")
+    STREAMED_TYPES = ("text/csv", "application/x-ndjson", "text/event-stream")
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or not response.get("Content-Type", "").startswith(self.COMPRESSIBLE_TYPES)
+            or response.get("Content-Type", "").startswith(self.STREAMED_TYPES)
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding == "br":
+            compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        elif encoding == "gzip":
+            compressed = compress_string(response.content)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # The compressed bytes differ from the identity ones, so a strong ETag becomes weak (as GZipMiddleware does).
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
+
+
+def negotiate_encoding(accept_encoding):
+    """The encoding to use ("br", "gzip" or None) for an `Accept-Encoding` header; `q=0` rules one out."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
@@ -0,0 +1,61 @@
+"""
+Opt-in fast JSON rendering and parsing (`FAST_JSON=true`).
+
+`orjson` is used when it is installed: it encodes datetimes, dates, UUIDs and
+nested dicts/lists in C, instead of calling back into Python for every
+datetime as `json` + DRF's `JSONEncoder` do. Without it, rendering falls back
+to the stdlib encoder. Either way the output matches DRF's `JSONRenderer`:
+compact, UTF-8, UTC datetimes ending in `Z`, and U+2028/U+2029 escaped.
+Indented (browsable) output still goes through DRF.
+"""
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Types orjson does not know (Decimal, lazy strings, timedelta, ...) are encoded as DRF does.
+_drf_encoder = JSONEncoder()
+
+
+def dumps(data):
+    """`data` as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_drf_encoder.default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type or "", renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        body = dumps(data)
+        # As DRF does, so the output can be embedded in a <script> tag.
+        if b"\xe2\x80" in body:
+            body = body.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+        return body
+
+
+class FastJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+def json_renderer():
+    """The JSON renderer views that render their own responses should use."""
+    return FastJSONRenderer() if settings.FAST_JSON else JSONRenderer()
@@ -61,6 +61,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'truck.metrics.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -70,9 +71,17 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'truck.middleware.StaticFilesMiddleware',
 ]
 
+# Brotli/gzip for response bodies of at least COMPRESSION_MIN_SIZE bytes, negotiated per request.
+RESPONSE_COMPRESSION = str_to_bool(os.getenv('RESPONSE_COMPRESSION', 'False'))
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '4096'))
+COMPRESSION_BROTLI_QUALITY = 5
+if RESPONSE_COMPRESSION:
+    # Outside everything else that may change the body.
+    MIDDLEWARE.insert(1, 'truck.middleware.CompressionMiddleware')
+
 AUTH_USER_MODEL = "app_user.AppUser" 
 ROOT_URLCONF = 'truck.urls'
 
@@ -100,16 +109,128 @@ AUTHENTICATION_BACKENDS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'oauth2_provider.contrib.rest_framework.OAuth2Authentication',
+        'app_user.authentication.CachedOAuth2Authentication',
     ]
 }
 
+# JSON rendering/parsing with orjson when installed (stdlib fallback); see truck.renderers.
+FAST_JSON = str_to_bool(os.getenv('FAST_JSON', 'False'))
+if FAST_JSON:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'truck.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = [
+        'truck.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ]
+
 OAUTH2_PROVIDER = {
     'ACCESS_TOKEN_EXPIRE_SECONDS': 36000,  # Adjust token expiry if needed
     'SCOPES': {'read': 'Read access', 'write': 'Write access'},
     'ALLOWED_GRANT_TYPES': ['password', 'client_credentials', 'authorization_code', 'refresh_token'],
 }
 
+# "default" is a per-process cache. REDIS_URL (e.g. redis://cache:6379/0) adds a "shared" cache that every worker
+# sees, for state that must agree across processes; it needs the redis package (`pip install redis`).
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+if os.getenv('REDIS_URL'):
+    CACHES['shared'] = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.getenv('REDIS_URL')}
+SHARED_CACHE = 'shared' if 'shared' in CACHES else None
+
+# Validated access tokens are cached per process, and in SHARED_CACHE (a CACHES alias) when set.
+# LOCAL_TTL bounds how long another process may keep trusting a token revoked elsewhere.
+OAUTH2_TOKEN_CACHE = {
+    'MAX_SIZE': int(os.getenv('OAUTH2_TOKEN_CACHE_SIZE', '10000')),
+    'LOCAL_TTL': int(os.getenv('OAUTH2_TOKEN_CACHE_LOCAL_TTL', '60')),
+    'SHARED_CACHE': os.getenv('OAUTH2_TOKEN_SHARED_CACHE') or None,
+}
+
+# Maximum queries per DRF action ("ViewSet.action") or per viewset ("ViewSet").
+# Overruns are logged, or raise when QUERY_BUDGET_MODE is "raise" (use that in tests/CI).
+# Budgets count every query of the request with the access token already validated; a token's first
+# request runs one more to look it up (see OAUTH2_TOKEN_CACHE).
+QUERY_BUDGETS = {
+    'TripViewSet.list': 3,
+    'TripViewSet.retrieve': 3,
+    'TripViewSet.logs': 4,
+    'TripViewSet.logs_time_series': 4,
+    'TripViewSet.route': 4,
+    'TripViewSet.routes': 3,
+    # Nearest searches widen 5, 40, 320, 2000 km (250 for log entries; see trip.geo) until enough rows are found.
+    'TripViewSet.near': 6,
+    'TripViewSet.within': 3,
+    'TripLogEntryViewSet.list': 3,
+    'TripLogEntryViewSet.near': 5,
+    'TripLogEntryViewSet.within': 3,
+    'CompanyViewSet.list': 4,
+    'CompanyViewSet.fleet_status': 3,
+    # Up to four widening searches plus the lookup of the vehicles found.
+    'CompanyViewSet.nearest_vehicles': 8,
+    'CompanyViewSet.report': 3,
+    'DriverProfileViewSet.report': 4,
+    'VehicleViewSet.report': 4,
+    'DriverProfileViewSet.list': 4,
+    'VehicleViewSet.list': 4,
+    # The membership (when not cached), the changes, then one query per kind of record changed.
+    'SyncView.get': 6,
+    'trip.async_views.trip_list': 3,
+    'trip.async_views.trip_detail': 3,
+    'trip.async_views.trip_logs': 4,
+    'trip.async_views.trip_logs_time_series': 4,
+    'trip.async_views.trip_log_list': 3,
+    # Writes also refresh what is derived from the rows (see trip.signals): the trip version, timeline days,
+    # rollups and live statuses, then record the change feed. Log entry writes are budgeted for one trip and
+    # the day(s) they touch; edits that leave the time, category, reading and location alone skip the rollups
+    # and live statuses.
+    'TripViewSet.partial_update': 10,
+    'TripLogEntryViewSet.create': 33,
+    'TripLogEntryViewSet.update': 41,
+    'TripLogEntryViewSet.partial_update': 41,
+    'TripLogEntryViewSet.bulk': 54,  # Includes the savepoint the insert is retried from.
+}
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'log')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Set METRICS_LOG_LEVEL=INFO to log query counts and timings of every request.
+        'truck.metrics': {
+            'handlers': ['console'],
+            'level': os.getenv('METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# A user's company-admin/driver membership is loaded once per request. Across requests it is only cached in
+# MEMBERSHIP_CACHE (a CACHES alias every worker shares), for MEMBERSHIP_CACHE_TIMEOUT seconds (cleared on changes).
+MEMBERSHIP_CACHE = os.getenv('MEMBERSHIP_CACHE') or SHARED_CACHE
+MEMBERSHIP_CACHE_TIMEOUT = 60
+
+# Seconds a trip route (see trip.routes) stays cached; keyed by trip version, so changes never serve stale routes
+TRIP_ROUTE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Seconds a trip's detail/logs representation stays cached; keyed by trip version, so changes never serve stale data
+TRIP_REPRESENTATION_CACHE_TIMEOUT = 60 * 60
+
+# Seconds a rendered daily log sheet stays cached (keyed by a hash of its content)
+LOG_SHEET_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+# Broker delivering live trip/log events to Server-Sent Events streams, and the stream heartbeat in seconds
+LIVE_UPDATES_BROKER = os.getenv("LIVE_UPDATES_BROKER", "trip.events.InProcessBroker")
+LIVE_UPDATES_HEARTBEAT = 15
+
+# Hours-of-Service duty cycle: "70_8" (70 hours / 8 days) or "60_7" (60 hours / 7 days)
+HOS_CYCLE = os.getenv("HOS_CYCLE", "70_8")
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -121,16 +242,61 @@ OAUTH2_PROVIDER = {
 #     }
 # }
 
-DATABASES = {
-    'default': {
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before reuse. Set DB_POOL=true to use
+# Django's connection pool instead (needs `psycopg[pool]`, i.e. psycopg 3); pooled connections are not persistent.
+DB_POOL = str_to_bool(os.getenv('DB_POOL', 'False'))
+DB_CONN_MAX_AGE = 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', '60'))
+DB_CONN_HEALTH_CHECKS = str_to_bool(os.getenv('DB_CONN_HEALTH_CHECKS', 'True'))
+DB_POOL_OPTIONS = {
+    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+    'timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+}
+
+
+def postgres_database(host, port):
+    return {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
-        'HOST': os.getenv('DB_HOST', 'localhost'),
-        'PORT': os.getenv('DB_PORT', '5432'),
+        'HOST': host,
+        'PORT': port,
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+        'OPTIONS': {'pool': DB_POOL_OPTIONS} if DB_POOL else {},
     }
+
+
+DATABASES = {
+    'default': postgres_database(os.getenv('DB_HOST', 'localhost'), os.getenv('DB_PORT', '5432')),
+}
+
+# Read replicas, as comma-separated "host" or "host:port" (same name and credentials as the primary).
+# GET requests to DATABASE_REPLICA_ACTIONS read from a replica, unless the client wrote in the last
+# DATABASE_REPLICA_PIN_SECONDS or the request itself wrote; see truck.db.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(','))):
+    replica_host, _, replica_port = replica.strip().partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **postgres_database(replica_host, replica_port or os.getenv('DB_PORT', '5432')),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+# Viewset actions, and function views by their dotted path.
+DATABASE_REPLICA_ACTIONS = {
+    'list', 'retrieve', 'logs', 'logs_time_series', 'profile',
+    'trip.async_views.trip_list', 'trip.async_views.trip_detail', 'trip.async_views.trip_logs',
+    'trip.async_views.trip_logs_time_series', 'trip.async_views.trip_log_list',
 }
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', '5'))
+# The CACHES alias holding those pins. It must be shared by every worker (a per-process cache only works for a single
+# process), so replicas are refused without one.
+DATABASE_REPLICA_PIN_CACHE = os.getenv('DB_REPLICA_PIN_CACHE') or SHARED_CACHE
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['truck.db.ReadReplicaRouter']
+    MIDDLEWARE.append('truck.db.ReplicaRoutingMiddleware')
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -0,0 +1,194 @@
+import gzip
+import io
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
+
+import brotli
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from trip.models import Trip
+from .db import PRIMARY, ReadReplicaRouter, ReplicaRoutingMiddleware
+from .middleware import CompressionMiddleware, negotiate_encoding
+from .renderers import FastJSONParser, FastJSONRenderer
+
+REPLICA_SETTINGS = {
+    "DATABASE_REPLICAS": ["replica_0"],
+    "DATABASE_REPLICA_PIN_CACHE": "pins",
+    "CACHES": {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "default"},
+        "pins": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "pins"},
+    },
+}
+
+
+def read_alias(request):
+    """Where a read of the request would go, as the response body."""
+    return HttpResponse(ReadReplicaRouter().db_for_read(Trip))
+
+
+def write_then_read_alias(request):
+    ReadReplicaRouter().db_for_write(Trip)
+    return read_alias(request)
+
+
+@override_settings(**REPLICA_SETTINGS)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        caches["pins"].clear()
+        self.factory = RequestFactory()
+
+    def route(self, method, path, view=read_alias, client="alice", status=200):
+        def get_response(request):
+            response = view(request)
+            response.status_code = status
+            return response
+
+        request = getattr(self.factory, method)(path, headers={"Authorization": f"Bearer {client}"} if client else {})
+        return ReplicaRoutingMiddleware(get_response)(request).content.decode()
+
+    def test_listed_reads_go_to_a_replica(self):
+        self.assertEqual(self.route("get", "/api/v1/trips/"), "replica_0")
+        self.assertEqual(self.route("get", "/api/v1/trips/1/logs/"), "replica_0")
+        self.assertEqual(self.route("get", "/api/v1/async/trips/"), "replica_0")
+        self.assertEqual(self.route("get", "/api/v1/trips/", client=None), "replica_0")
+
+    def test_everything_else_reads_from_the_primary(self):
+        self.assertEqual(self.route("get", "/api/v1/trips/near/"), PRIMARY)
+        self.assertEqual(self.route("get", "/api/v1/sync/"), PRIMARY)
+        self.assertEqual(self.route("get", "/nowhere/"), PRIMARY)
+        self.assertEqual(self.route("post", "/api/v1/trips/"), PRIMARY)
+        # Outside a request.
+        self.assertEqual(ReadReplicaRouter().db_for_read(Trip), PRIMARY)
+
+    def test_reads_after_a_write_in_the_request_go_to_the_primary(self):
+        self.assertEqual(self.route("get", "/api/v1/trips/", view=write_then_read_alias), PRIMARY)
+        self.assertEqual(self.route("get", "/api/v1/trips/", client="bob"), "replica_0")
+
+    def test_clients_that_wrote_are_pinned_to_the_primary(self):
+        self.route("post", "/api/v1/trip-logs/", status=201)
+        self.assertEqual(self.route("get", "/api/v1/trips/"), PRIMARY)
+        self.assertEqual(self.route("get", "/api/v1/trips/", client="bob"), "replica_0")
+        # The pin lives in the shared cache, where every worker sees it.
+        self.assertEqual(len(caches["pins"]._cache), 1)
+        self.assertEqual(len(caches["default"]._cache), 0)
+
+        caches["pins"].clear()
+        self.assertEqual(self.route("get", "/api/v1/trips/"), "replica_0")
+
+    def test_failed_writes_do_not_pin(self):
+        self.route("post", "/api/v1/trip-logs/", status=400)
+        self.assertEqual(self.route("get", "/api/v1/trips/"), "replica_0")
+
+    async def test_async_views_read_from_a_replica_in_the_orm_thread(self):
+        async def get_response(request):
+            return HttpResponse(await sync_to_async(ReadReplicaRouter().db_for_read)(Trip))
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        response = await middleware(self.factory.get("/api/v1/async/trips/"))
+        self.assertEqual(response.content, b"replica_0")
+        response = await middleware(self.factory.get("/api/v1/trips/near/"))
+        self.assertEqual(response.content, PRIMARY.encode())
+
+    @override_settings(DATABASE_REPLICA_PIN_CACHE=None)
+    def test_replicas_need_a_shared_pin_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaRoutingMiddleware(read_alias)
+
+
+class FastJSONTests(SimpleTestCase):
+    data = {
+        "id": uuid.UUID(int=1),
+        "utc": datetime(2026, 3, 2, 6, 0, 0, 123456, tzinfo=timezone.utc),
+        "offset": datetime(2026, 3, 2, 6, 0, tzinfo=timezone(timedelta(hours=-5))),
+        "day": date(2026, 3, 2),
+        "amount": Decimal("12.50"),
+        "duration": timedelta(hours=1),
+        "nested": [{"remarks": "Café \u2028 stop", "odm_reading": None, "deleted": False}],
+    }
+
+    def render(self):
+        return FastJSONRenderer().render(self.data, "application/json")
+
+    def test_renders_what_rest_framework_renders(self):
+        expected = JSONRenderer().render(self.data, "application/json")
+        self.assertEqual(self.render(), expected)
+        with mock.patch("truck.renderers.orjson", None):
+            self.assertEqual(self.render(), expected)
+
+        indented = "application/json; indent=2"
+        self.assertEqual(FastJSONRenderer().render(self.data, indented), JSONRenderer().render(self.data, indented))
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_parses_what_rest_framework_parses(self):
+        body = '{"remarks": "Café", "odm_reading": 1000, "location": {"lat": 40.5}}'.encode()
+        expected = JSONParser().parse(io.BytesIO(body))
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), expected)
+        with mock.patch("truck.renderers.orjson", None):
+            self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), expected)
+
+        for parser in (FastJSONParser(), JSONParser()):
+            with self.subTest(parser=parser), self.assertRaises(ParseError):
+                parser.parse(io.BytesIO(b'{"remarks": '))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionTests(SimpleTestCase):
+    body = b'{"results": [' + b",".join(b'{"category": "Driving", "odm_reading": %d}' % i for i in range(50)) + b"]}"
+
+    def respond(self, response=None, accept="gzip, br", **headers):
+        def get_response(request):
+            return response or HttpResponse(self.body, content_type="application/json", headers=headers)
+
+        request = RequestFactory().get("/api/v1/trips/", headers={"Accept-Encoding": accept})
+        return CompressionMiddleware(get_response)(request)
+
+    def test_negotiation(self):
+        self.assertEqual(negotiate_encoding("gzip, deflate, br"), "br")
+        self.assertEqual(negotiate_encoding("gzip, br;q=0"), "gzip")
+        self.assertEqual(negotiate_encoding("*"), "br")
+        self.assertEqual(negotiate_encoding("*, br;q=0, gzip;q=0"), None)
+        self.assertEqual(negotiate_encoding("identity"), None)
+        self.assertEqual(negotiate_encoding(""), None)
+        with mock.patch("truck.middleware.brotli", None):
+            self.assertEqual(negotiate_encoding("br, gzip"), "gzip")
+
+    def test_large_bodies_are_compressed(self):
+        response = self.respond(ETag='"abc"')
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), self.body)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        # The compressed bytes are not the ones the strong ETag was computed from.
+        self.assertEqual(response["ETag"], 'W/"abc"')
+
+        response = self.respond(accept="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+        response = self.respond(accept="identity")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, self.body)
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_other_responses_are_left_alone(self):
+        responses = {
+            "small": HttpResponse(b'{"results": []}', content_type="application/json"),
+            "binary": HttpResponse(self.body, content_type="image/png"),
+            "encoded": HttpResponse(self.body, content_type="application/json", headers={"Content-Encoding": "gzip"}),
+            "export": HttpResponse(self.body, content_type="text/csv"),
+            "streamed": StreamingHttpResponse(iter([self.body]), content_type="application/json"),
+        }
+        for name, response in responses.items():
+            with self.subTest(response=name):
+                response = self.respond(response)
+                self.assertNotEqual(response.get("Content-Encoding"), "br")
+                self.assertFalse(response.has_header("Vary"))
@@ -17,10 +17,13 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .views import EndpointMetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("o/", include("oauth2_provider.urls", namespace="oauth2_provider")),
     path('api/v1/', include('app_user.urls')),
     path('api/v1/', include('company.urls')),
     path('api/v1/', include('trip.urls')),
+    path('api/v1/metrics/', EndpointMetricsView.as_view(), name='endpoint-metrics'),
 ]
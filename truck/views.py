@@ -0,0 +1,17 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import metrics
+
+
+class EndpointMetricsView(APIView):
+    """Per-endpoint query counts and latencies recorded by this process. DELETE resets them."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
+
+    def delete(self, request):
+        metrics.reset()
+        return Response(status=204)